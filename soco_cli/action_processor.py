@@ -5,22 +5,32 @@ and needs to be converted to a Class.
 """
 
 import logging
-import pprint
 import time
 from collections import OrderedDict
 from datetime import datetime, timedelta
+from importlib import import_module
 from os import get_terminal_size
 from random import randint
 
 import soco  # type: ignore
-import tabulate  # type: ignore
 from soco.exceptions import NotSupportedException, SoCoUPnPException  # type: ignore
 from soco.plugins.sharelink import ShareLinkPlugin  # type: ignore
-from xmltodict import parse  # type: ignore
 
-from soco_cli import alarms
-from soco_cli.play_local_file import play_local_file
-from soco_cli.play_local_file_lists import play_directory_files, play_m3u_file
+from soco_cli.capabilities import (
+    capability_cache,
+    create_profile,
+    get_capabilities,
+    has_capability,
+)
+from soco_cli.output_capture import emit_result, result_requested
+from soco_cli.properties import INFO_PROPERTIES, PROPERTIES, read_properties
+from soco_cli.read_cache import (
+    current_track_info,
+    group_coordinator,
+    invalidate_reads,
+    queue_size,
+    read_cache_scope,
+)
 from soco_cli.speaker_info import print_speaker_table
 from soco_cli.utils import (
     convert_to_seconds,
@@ -53,7 +63,6 @@ from soco_cli.utils import (
 )
 from soco_cli.wait_actions import process_wait
 
-pp = pprint.PrettyPrinter(width=120)
 SONOS_MAX_ITEMS = 66000
 
 
@@ -102,7 +111,7 @@ def get_current_queue_position(speaker, tracks=None):
     track_title = None
 
     try:
-        track_info = speaker.get_current_track_info()
+        track_info = current_track_info(speaker)
         qp = int(track_info["playlist_position"])
         track_title = track_info["title"]
     except Exception:
@@ -131,61 +140,86 @@ def get_current_queue_position(speaker, tracks=None):
     return qp, is_playing
 
 
-def print_tracks(tracks, speaker=None, single_track=False, track_number=None):
+# Keys and labels of the track details that are printed, in order
+TRACK_DETAIL_LABELS = [
+    ("artist", "Artist"),
+    ("album", "Album"),
+    ("title", "Title"),
+    ("podcast_episode", "Podcast Episode"),
+]
+
+
+def track_details(tracks, speaker=None, first_number=1):
+    """Describe a list of tracks, numbered from 'first_number'.
+
+    If a speaker is supplied, the track at its current queue position is
+    marked as current, and as playing if playback is in progress.
+
+    Returns:
+        list: An OrderedDict for each track, containing its number, the
+            available track details, and 'current' and 'playing' flags.
+    """
     qp = None
     is_playing = None
     if speaker:
         qp, is_playing = get_current_queue_position(speaker, tracks)
-    if single_track:
-        item_number = track_number
-    else:
-        item_number = 1
 
-    for track in tracks:
+    details = []
+    for number, track in enumerate(tracks, first_number):
         # Assemble available track data
-        info_items = OrderedDict()
-        try:
-            info_items["Artist"] = track.creator
-        except AttributeError:
-            pass
-        try:
-            info_items["Album"] = track.album
-        except AttributeError:
-            pass
-        try:
-            info_items["Title"] = track.title
-        except AttributeError:
-            pass
+        info = OrderedDict([("number", number)])
+        for key, attribute in [
+            ("artist", "creator"),
+            ("album", "album"),
+            ("title", "title"),
+        ]:
+            try:
+                info[key] = getattr(track, attribute)
+            except AttributeError:
+                pass
         try:
             if track.item_class == "object.item.audioItem.podcast":
-                info_items["Podcast Episode"] = info_items.pop("Title")
+                info["podcast_episode"] = info.pop("title")
         except (AttributeError, KeyError):
             pass
+        info["current"] = qp == number
+        info["playing"] = bool(qp == number and is_playing)
+        details.append(info)
 
-        # Assemble the info string to be printed
-        info_string = ""
-        first = True
-        for item, info in info_items.items():
-            if first:
-                first = False
-            else:
-                info_string += " | "
-            info_string += "{}: {}".format(item, info)
+    return details
+
+
+def print_track_details(details):
+    for info in details:
+        info_string = " | ".join(
+            "{}: {}".format(label, info[key])
+            for key, label in TRACK_DETAIL_LABELS
+            if key in info
+        )
 
         # Print the information; show position and play state if available
         prefix = "    "
-        if qp == item_number:
-            if is_playing:
+        if info["current"]:
+            if info["playing"]:
                 prefix = " *> "
             else:
                 prefix = " *  "
-        print("{}{:3d}: {}".format(prefix, item_number, info_string))
+        print("{}{:3d}: {}".format(prefix, info["number"], info_string))
 
-        item_number += 1
 
+def print_tracks(tracks, speaker=None, single_track=False, track_number=None):
+    first_number = track_number if single_track else 1
+    print_track_details(track_details(tracks, speaker, first_number))
     return True
 
 
+def print_numbered_list(things):
+    print()
+    for index, thing in enumerate(things, 1):
+        print("{:5d}: {}".format(index, thing))
+    print()
+
+
 def print_albums(albums, omit_first=False):
     item_number = 1
     for album in albums:
@@ -223,8 +257,10 @@ def on_off_action(speaker, action, args, soco_function, use_local_speaker_list):
         soco_function = "mute"
     np = len(args)
     if np == 0:
-        state = "on" if getattr(speaker, soco_function) else "off"
-        print(state)
+        emit_result(
+            bool(getattr(speaker, soco_function)),
+            lambda state: print("on" if state else "off"),
+        )
     elif np == 1:
         arg = args[0].lower()
         if arg == "on":
@@ -240,8 +276,10 @@ def on_off_action(speaker, action, args, soco_function, use_local_speaker_list):
 @zero_parameters
 def true_false_action(speaker, action, args, soco_function, use_local_speaker_list):
     """Method to deal with status actions that have 'true|false semantics"""
-    state = "yes" if getattr(speaker, soco_function) else "no"
-    print(state)
+    emit_result(
+        bool(getattr(speaker, soco_function)),
+        lambda state: print("yes" if state else "no"),
+    )
     return True
 
 
@@ -255,9 +293,8 @@ def no_args_no_output(speaker, action, args, soco_function, use_local_speaker_li
 def no_args_one_output(speaker, action, args, soco_function, use_local_speaker_list):
     result = getattr(speaker, soco_function)
     if callable(result):
-        print(getattr(speaker, soco_function)())
-    else:
-        print(result)
+        result = result()
+    emit_result(result, print)
     return True
 
 
@@ -266,6 +303,7 @@ def list_queue(speaker, action, args, soco_function, use_local_speaker_list):
     queue = speaker.get_queue(max_items=SONOS_MAX_ITEMS)
     if len(queue) == 0:
         # print("Queue is empty")
+        emit_result([])
         return True
     if len(args) == 1:
         try:
@@ -279,6 +317,10 @@ def list_queue(speaker, action, args, soco_function, use_local_speaker_list):
         except ValueError:
             parameter_type_error(action, "integer")
             return False
+    if result_requested():
+        first_number = track_number if len(args) == 1 else 1
+        emit_result(track_details(queue, speaker, first_number))
+        return True
     print()
     if len(args) == 1:
         print_tracks(queue, speaker, single_track=True, track_number=track_number)
@@ -301,12 +343,7 @@ def list_numbered_things(speaker, action, args, soco_function, use_local_speaker
         things = getattr(speaker, soco_function)(complete_result=True)
     things_list = [thing.title for thing in things]
     things_list.sort()
-    print()
-    index = 0
-    for thing in things_list:
-        index += 1
-        print("{:5d}: {}".format(index, thing))
-    print()
+    emit_result(things_list, print_numbered_list)
     return True
 
 
@@ -318,7 +355,7 @@ def volume_actions(speaker, action, args, soco_function, use_local_speaker_list)
 
     np = len(args)
     if np == 0:
-        print(speaker.volume)
+        emit_result(speaker.volume, print)
         return True
     if np == 1:
         try:
@@ -365,10 +402,14 @@ def print_info(speaker, action, args, soco_function, use_local_speaker_list):
 
 @zero_parameters
 def track(speaker, action, args, soco_function, use_local_speaker_list):
+    from xmltodict import parse  # type: ignore
+
     state = speaker.get_current_transport_info()["current_transport_state"]
 
     if speaker.is_playing_line_in:
-        print("Using Line In (state: {})".format(state))
+        emit_result(
+            {"state": state, "line_in": True, "details": OrderedDict()}, print_track
+        )
         return True
 
     def title_not_useful(title):
@@ -380,7 +421,6 @@ def track(speaker, action, args, soco_function, use_local_speaker_list):
 
     stream = False
 
-    print(" Playback is {}:".format(playback_state(state)))
     track_info = speaker.get_current_track_info()
     logging.info("Current track info:\n{}".format(track_info))
 
@@ -467,8 +507,9 @@ def track(speaker, action, args, soco_function, use_local_speaker_list):
         # Audio book
         elif (
             metadata
-            and "object.item.audioItem.audioBook"
-            in metadata["DIDL-Lite"]["item"]["upnp:class"]
+            and "object.item.audioItem.audioBook" in metadata["DIDL-Lite"]["item"][
+                "upnp:class"
+            ]
         ):
             logging.info("Track is an audio book")
             try:
@@ -569,10 +610,20 @@ def track(speaker, action, args, soco_function, use_local_speaker_list):
     ordered_elements.update(elements)
 
     logging.info("Items to be printed: {}".format(ordered_elements))
-    pretty_print_values(ordered_elements, indent=3, spacing=5, sort_by_key=False)
+    emit_result(
+        {"state": state, "line_in": False, "details": ordered_elements}, print_track
+    )
     return True
 
 
+def print_track(track_result):
+    if track_result["line_in"]:
+        print("Using Line In (state: {})".format(track_result["state"]))
+        return
+    print(" Playback is {}:".format(playback_state(track_result["state"])))
+    pretty_print_values(track_result["details"], indent=3, spacing=5, sort_by_key=False)
+
+
 @zero_or_one_parameter
 def playback_mode(speaker, action, args, soco_function, use_local_speaker_list):
     np = len(args)
@@ -640,7 +691,7 @@ def repeat(speaker, action, args, soco_function, use_local_speaker_list):
 
 @zero_parameters
 def transport_state(speaker, action, args, soco_function, use_local_speaker_list):
-    print(speaker.get_current_transport_info()["current_transport_state"])
+    emit_result(speaker.get_current_transport_info()["current_transport_state"], print)
     return True
 
 
@@ -1315,6 +1366,9 @@ def line_in_core(speaker, action, args, start_playback, use_local_speaker_list):
             speaker.stop()
         elif source.lower() in ["on", "left_input"]:
             # Switch to the speaker's own line_in
+            if has_capability(speaker, "has_line_in", local_only=True) is False:
+                error_report("Speaker '{}' has no Line-In".format(speaker.player_name))
+                return False
             logging.info("Switching to the speaker's own Line-In")
             try:
                 speaker.switch_to_line_in()
@@ -1464,45 +1518,48 @@ def is_indexing(speaker, action, args, soco_function, use_local_speaker_list):
 
 @zero_parameters
 def info(speaker, action, args, soco_function, use_local_speaker_list):
-    info = speaker.get_speaker_info()
-    model = info["model_name"].lower()
-    if not ("boost" in model or "bridge" in model):
-        info["volume"] = speaker.volume
-        info["mute"] = speaker.mute
-        info["title"] = speaker.get_current_track_info()["title"]
-        info["player_name"] = speaker.player_name
-        info["ip_address"] = speaker.ip_address
-        info["household_id"] = speaker.household_id
-        info["status_light"] = speaker.status_light
-        info["is_coordinator"] = speaker.is_coordinator
-        info["grouped_or_paired"] = len(speaker.group.members) > 1
-        info["loudness"] = speaker.loudness
-        info["treble"] = speaker.treble
-        info["bass"] = speaker.bass
-        info["is_coordinator"] = speaker.is_coordinator
-        if speaker.is_coordinator:
-            info["cross_fade"] = speaker.cross_fade
-            info["state"] = speaker.get_current_transport_info()[
-                "current_transport_state"
-            ]
-        else:
-            info["cross_fade"] = speaker.group.coordinator.cross_fade
-            info["state"] = speaker.group.coordinator.get_current_transport_info()[
-                "current_transport_state"
-            ]
-        info["balance"] = speaker.balance
-        info["night_mode"] = speaker.night_mode
-        info["is_soundbar"] = speaker.is_soundbar
-        info["is_playing_line_in"] = speaker.is_playing_line_in
-        info["is_playing_radio"] = speaker.is_playing_radio
-        info["is_playing_tv"] = speaker.is_playing_tv
-        info["is_visible"] = speaker.is_visible
-        info["sub_gain"] = speaker.sub_gain
-    for item in sorted(info):
-        print("  {} = {}".format(item, info[item]))
+    info = dict(speaker.get_speaker_info(refresh=True))
+    try:
+        infrastructure = create_profile(info).is_infrastructure
+    except (KeyError, ValueError):
+        infrastructure = False
+    if not infrastructure:
+        info.update(read_properties(speaker, INFO_PROPERTIES))
+    emit_result(
+        OrderedDict((item, info[item]) for item in sorted(info)), print_properties
+    )
+    return True
+
+
+@one_or_more_parameters
+def get_properties(speaker, action, args, soco_function, use_local_speaker_list):
+    names = []
+    for arg in args:
+        for name in arg.split(","):
+            name = name.strip().lower()
+            if name != "" and name not in names:
+                names.append(name)
+    unknown = [name for name in names if name not in PROPERTIES]
+    if unknown or not names:
+        error_report(
+            "Unknown property(ies) {}: use one or more of: {}".format(
+                unknown, ", ".join(sorted(PROPERTIES))
+            )
+        )
+        return False
+    values = read_properties(speaker, names)
+    if len(values) == 1:
+        emit_result(values, lambda values: print(values[names[0]]))
+    else:
+        emit_result(values, print_properties)
     return True
 
 
+def print_properties(values):
+    for item, value in values.items():
+        print("  {} = {}".format(item, value))
+
+
 @zero_parameters
 def groups(speaker, action, args, soco_function, use_local_speaker_list):
     for group in speaker.all_groups:
@@ -1874,7 +1931,7 @@ def if_stopped_or_playing(speaker, action, args, soco_function, use_local_speake
     """
     # If this is not the coordinator speaker, we need to check the state
     # of the coordinator instead
-    state_speaker = speaker if speaker.is_coordinator else speaker.group.coordinator
+    state_speaker = group_coordinator(speaker)
     logging.info(
         "Checking playback state of coordinator speaker: '{}'".format(
             state_speaker.player_name
@@ -1908,8 +1965,9 @@ def if_coordinator(speaker, action, args, soco_function, use_local_speaker_list)
     Perform the action only if the target speaker is (or is not) a coordinator.
     """
 
-    if (speaker.is_coordinator and action == "if_not_coordinator") or (
-        not speaker.is_coordinator and action == "if_coordinator"
+    is_coordinator = group_coordinator(speaker) is speaker
+    if (is_coordinator and action == "if_not_coordinator") or (
+        not is_coordinator and action == "if_coordinator"
     ):
         logging.info("Action suppressed")
         return True
@@ -1931,18 +1989,17 @@ def if_queue(speaker, action, args, soco_function, use_local_speaker_list):
     """
     # If this is not the coordinator speaker, we need to check the state
     # of the coordinator instead
-    queue_speaker = speaker if speaker.is_coordinator else speaker.group.coordinator
+    queue_speaker = group_coordinator(speaker)
     logging.info(
         "Checking queue of coordinator speaker: '{}'".format(queue_speaker.player_name)
     )
+    size = queue_size(queue_speaker)
     logging.info(
         "Condition: '{}': Speaker '{}' has {} item(s) in the queue".format(
-            action, queue_speaker.player_name, queue_speaker.queue_size
+            action, queue_speaker.player_name, size
         )
     )
-    if (queue_speaker.queue_size == 0 and action == "if_queue") or (
-        queue_speaker.queue_size > 0 and action == "if_no_queue"
-    ):
+    if (size == 0 and action == "if_queue") or (size > 0 and action == "if_no_queue"):
         logging.info("Action suppressed")
         return True
 
@@ -2048,7 +2105,7 @@ def get_queue_insertion_position(speaker, insertion_point, action):
     """
     try:
         position = int(insertion_point)
-        if not 1 <= position <= speaker.queue_size + 1:
+        if not 1 <= position <= queue_size(speaker) + 1:
             logging.info(
                 "Position {} is out of range ... will be constrained".format(
                     insertion_point
@@ -2056,8 +2113,8 @@ def get_queue_insertion_position(speaker, insertion_point, action):
             )
         if position < 1:
             position = 1
-        elif position > speaker.queue_size + 1:
-            position = speaker.queue_size + 1
+        elif position > queue_size(speaker) + 1:
+            position = queue_size(speaker) + 1
         logging.info("Setting position to {}".format(position))
         return position
     except ValueError:
@@ -2069,7 +2126,7 @@ def get_queue_insertion_position(speaker, insertion_point, action):
         if (
             speaker.get_current_transport_info()["current_transport_state"]
             == "PLAYING"  # noqa: W503
-            and speaker.get_current_track_info()["position"]  # noqa: W503
+            and current_track_info(speaker)["position"]  # noqa: W503
             != "NOT_IMPLEMENTED"  # noqa: W503
         ):
             logging.info("Currently playing from queue; add as next track")
@@ -2080,11 +2137,11 @@ def get_queue_insertion_position(speaker, insertion_point, action):
                 "Not currently playing from queue; add at current queue position"
             )
             offset = 0
-        position = int(speaker.get_current_track_info()["playlist_position"]) + offset
+        position = int(current_track_info(speaker)["playlist_position"]) + offset
     elif insertion_point.lower() in ["first", "start"]:
         position = 1
     elif insertion_point.lower() in ["last", "end"]:
-        position = speaker.queue_size + 1
+        position = queue_size(speaker) + 1
     else:
         raise Exception(
             "Additional parameter for '{}' must be 'first/start', 'next/play_next',"
@@ -2111,16 +2168,17 @@ def queue_search_results(speaker, action, args, soco_function, use_local_speaker
     if len(args) == 2:
         insertion_position = get_queue_insertion_position(speaker, args[1], action)
     else:
-        insertion_position = speaker.queue_size + 1
+        insertion_position = queue_size(speaker) + 1
     save_queue_insertion_position(insertion_position)
     logging.info("Inserting at queue position: {}".format(insertion_position))
 
     current_position = insertion_position
     for index, item_number in enumerate(item_numbers):
-        current_queue_size = speaker.queue_size
+        current_queue_size = queue_size(speaker)
         speaker.add_to_queue(items[item_number - 1], current_position)
+        invalidate_reads(speaker, "queue_size")
         if index + 1 != len(item_numbers):
-            current_position += speaker.queue_size - current_queue_size
+            current_position += queue_size(speaker) - current_queue_size
             logging.info(
                 "Advancing queue insertion point to: {}".format(current_position)
             )
@@ -2137,6 +2195,9 @@ def cue_favourite_radio_station(
 
 @zero_parameters
 def battery(speaker, action, args, soco_function, use_local_speaker_list):
+    if has_capability(speaker, "has_battery", local_only=True) is False:
+        error_report("Battery status not supported by '{}'".format(speaker.player_name))
+        return False
     try:
         battery_status = speaker.get_battery_info()
     except NotSupportedException:
@@ -2162,6 +2223,9 @@ def rename(speaker, action, args, soco_function, use_local_speaker_list):
         error_report("Current and new names are identical")
         return False
     speaker.player_name = new_name
+    # The cached speaker info includes the old name
+    capability_cache().forget(speaker.uid)
+    capability_cache().save()
     rename_speaker_in_cache(
         old_name, new_name, use_local_speaker_list=use_local_speaker_list
     )
@@ -2171,6 +2235,7 @@ def rename(speaker, action, args, soco_function, use_local_speaker_list):
 @zero_parameters
 def album_art(speaker, action, args, soco_function, use_local_speaker_list):
     """Get a URL for the current album art"""
+    from xmltodict import parse  # type: ignore
 
     # Normal approach using track_info
     try:
@@ -2230,6 +2295,8 @@ def add_uri_to_queue(speaker, action, args, soco_function, use_local_speaker_lis
 
 @one_or_more_parameters
 def play_file(speaker, action, args, soco_function, use_local_speaker_list):
+    from soco_cli.play_local_file import play_local_file
+
     end_on_pause = True if "_end_on_pause_" in args else False
     for audio_file in args:
         if audio_file == "_end_on_pause_":
@@ -2242,6 +2309,8 @@ def play_file(speaker, action, args, soco_function, use_local_speaker_list):
 
 @one_or_two_parameters
 def play_m3u(speaker, action, args, soco_function, use_local_speaker_list):
+    from soco_cli.play_local_file_lists import play_m3u_file
+
     m3u_file = args[0]
     options = "" if len(args) == 1 else args[1]
     options = options.lower()
@@ -2252,6 +2321,8 @@ def play_m3u(speaker, action, args, soco_function, use_local_speaker_list):
 
 @one_or_two_parameters
 def play_directory(speaker, action, args, soco_function, use_local_speaker_list):
+    from soco_cli.play_local_file_lists import play_directory_files
+
     directory = args[0]
     options = "" if len(args) == 1 else args[1]
     options = options.lower()
@@ -2609,6 +2680,8 @@ def reboot_count(speaker, action, args, soco_function, use_local_speaker_list):
 
 @zero_parameters
 def switch_to_tv(speaker, action, args, soco_function, use_local_speaker_list):
+    # Pre-populates 'is_soundbar', if the speaker's profile is known
+    get_capabilities(speaker, local_only=True)
     if speaker.is_soundbar:
         speaker.switch_to_tv()
         return True
@@ -2619,6 +2692,8 @@ def switch_to_tv(speaker, action, args, soco_function, use_local_speaker_list):
 
 @zero_parameters
 def audio_format(speaker, action, args, soco_function, use_local_speaker_list):
+    # Pre-populates 'is_soundbar', if the speaker's profile is known
+    get_capabilities(speaker, local_only=True)
     if speaker.is_soundbar:
         audio_format = speaker.soundbar_audio_input_format
         if audio_format is None:
@@ -2649,6 +2724,8 @@ def mic_enabled(
 
 @zero_or_one_parameter
 def tv_audio_delay(speaker, action, args, soco_function, use_local_speaker_list):
+    # Pre-populates 'is_soundbar', if the speaker's profile is known
+    get_capabilities(speaker, local_only=True)
     if not speaker.is_soundbar:
         error_report("Speaker '{}' has no TV input".format(speaker.player_name))
         return False
@@ -2765,27 +2842,89 @@ def process_wait_action(speaker, action, args, soco_function, use_local_speaker_
     return True
 
 
+# Action processing functions that never change the state of the system
+READ_ONLY_FUNCTIONS = {
+    track,
+    transport_state,
+    info,
+    get_properties,
+    list_queue,
+    list_numbered_things,
+    groups,
+    zones,
+    true_false_action,
+    no_args_one_output,
+    list_libraries,
+    system_info,
+    get_uri,
+    get_channel,
+    is_indexing,
+}
+
+
+def _line_in_speakers(args):
+    # The first parameter is either an input or another speaker's name
+    if args and args[0].lower() not in ["on", "off", "left_input", "right_input"]:
+        return args[:1]
+    return []
+
+
+# Action processing functions whose parameters include speaker names, with
+# a function that returns the names from the parameters
+SPEAKER_PARAMETERS = {
+    group_or_pair: lambda args: args[:1],
+    multi_group: lambda args: args,
+    add_satellite_speakers: lambda args: args[:2],
+    transfer_playback: lambda args: args[:1],
+    line_in: _line_in_speakers,
+    cue_line_in: _line_in_speakers,
+}
+
+
+def speaker_parameters(action, args):
+    """Return the names of the speakers among an action's parameters."""
+    sonos_function = actions.get(action, None)
+    if sonos_function is None:
+        return []
+    names = SPEAKER_PARAMETERS.get(sonos_function.processing_function)
+    return list(names(args)) if names else []
+
+
 def process_action(speaker, action, args, use_local_speaker_list=False) -> bool:
     sonos_function = actions.get(action, None)
     if sonos_function:
-        if sonos_function.switch_to_coordinator:
-            if not speaker.is_coordinator:
-                speaker = speaker.group.coordinator
-                logging.info(
-                    "Switching to coordinator speaker '{}'".format(speaker.player_name)
+        with read_cache_scope() as cache:
+            try:
+                if sonos_function.switch_to_coordinator:
+                    coordinator = group_coordinator(speaker)
+                    if coordinator is not speaker:
+                        speaker = coordinator
+                        logging.info(
+                            "Switching to coordinator speaker '{}'".format(
+                                speaker.player_name
+                            )
+                        )
+                return sonos_function.processing_function(
+                    speaker,
+                    action,
+                    args,
+                    sonos_function.soco_function,
+                    use_local_speaker_list,
+                )
+            finally:
+                cache.end_action(
+                    sonos_function.processing_function in READ_ONLY_FUNCTIONS
                 )
-        return sonos_function.processing_function(
-            speaker,
-            action,
-            args,
-            sonos_function.soco_function,
-            use_local_speaker_list,
-        )
     return False
 
 
 class SonosFunction:
-    """Maps actions into processing functions."""
+    """Maps actions into processing functions.
+
+    The processing function can be supplied as a 'module:function' string,
+    in which case the module is only imported when the action is first
+    used.
+    """
 
     def __init__(self, function, soco_function=None, switch_to_coordinator=False):
         self._function = function
@@ -2794,6 +2933,10 @@ class SonosFunction:
 
     @property
     def processing_function(self):
+        if isinstance(self._function, str):
+            module_name, function_name = self._function.split(":")
+            logging.info("Loading action function '{}'".format(self._function))
+            self._function = getattr(import_module(module_name), function_name)
         return self._function
 
     @property
@@ -2987,6 +3130,7 @@ actions = {
     "balance": SonosFunction(balance, "balance"),
     "reindex": SonosFunction(reindex, "start_library_update"),
     "info": SonosFunction(info, "get_info"),
+    "get": SonosFunction(get_properties, ""),
     "groups": SonosFunction(groups, "groups"),
     "pair": SonosFunction(group_or_pair, "create_stereo_pair"),
     "unpair": SonosFunction(no_args_no_output, "separate_stereo_pair"),
@@ -3135,21 +3279,21 @@ actions = {
     "playpause": SonosFunction(pauseplay, "", True),
     "available_actions": SonosFunction(available_actions, "", True),
     "wait_end_track": SonosFunction(wait_end_track, "", True),
-    "alarms": SonosFunction(alarms.list_alarms, "get_alarms"),
-    "list_alarms": SonosFunction(alarms.list_alarms, "get_alarms"),
-    "remove_alarms": SonosFunction(alarms.remove_alarms, "", False),
-    "remove_alarm": SonosFunction(alarms.remove_alarms, "", False),
-    "add_alarm": SonosFunction(alarms.add_alarm, "", False),
-    "create_alarm": SonosFunction(alarms.add_alarm, "", False),
-    "enable_alarm": SonosFunction(alarms.enable_alarms, "", False),
-    "enable_alarms": SonosFunction(alarms.enable_alarms, "", False),
-    "disable_alarm": SonosFunction(alarms.disable_alarms, "", False),
-    "disable_alarms": SonosFunction(alarms.disable_alarms, "", False),
-    "modify_alarm": SonosFunction(alarms.modify_alarm, "", False),
-    "modify_alarms": SonosFunction(alarms.modify_alarm, "", False),
-    "copy_alarm": SonosFunction(alarms.copy_alarm, "", False),
-    "move_alarm": SonosFunction(alarms.move_alarm, "", False),
-    "snooze_alarm": SonosFunction(alarms.snooze_alarm, "", True),
+    "alarms": SonosFunction("soco_cli.alarms:list_alarms", "get_alarms"),
+    "list_alarms": SonosFunction("soco_cli.alarms:list_alarms", "get_alarms"),
+    "remove_alarms": SonosFunction("soco_cli.alarms:remove_alarms", "", False),
+    "remove_alarm": SonosFunction("soco_cli.alarms:remove_alarms", "", False),
+    "add_alarm": SonosFunction("soco_cli.alarms:add_alarm", "", False),
+    "create_alarm": SonosFunction("soco_cli.alarms:add_alarm", "", False),
+    "enable_alarm": SonosFunction("soco_cli.alarms:enable_alarms", "", False),
+    "enable_alarms": SonosFunction("soco_cli.alarms:enable_alarms", "", False),
+    "disable_alarm": SonosFunction("soco_cli.alarms:disable_alarms", "", False),
+    "disable_alarms": SonosFunction("soco_cli.alarms:disable_alarms", "", False),
+    "modify_alarm": SonosFunction("soco_cli.alarms:modify_alarm", "", False),
+    "modify_alarms": SonosFunction("soco_cli.alarms:modify_alarm", "", False),
+    "copy_alarm": SonosFunction("soco_cli.alarms:copy_alarm", "", False),
+    "move_alarm": SonosFunction("soco_cli.alarms:move_alarm", "", False),
+    "snooze_alarm": SonosFunction("soco_cli.alarms:snooze_alarm", "", True),
     "relative_bass": SonosFunction(eq_relative, "bass", False),
     "rel_bass": SonosFunction(eq_relative, "bass", False),
     "rb": SonosFunction(eq_relative, "bass", False),
@@ -3188,11 +3332,11 @@ actions = {
     "sub_enabled": SonosFunction(on_off_action, "sub_enabled", False),
     "surround_enabled": SonosFunction(on_off_action, "surround_enabled", False),
     "audio_format": SonosFunction(audio_format, "", True),
-    "copy_modify_alarm": SonosFunction(alarms.copy_modify_alarm, "", False),
+    "copy_modify_alarm": SonosFunction("soco_cli.alarms:copy_modify_alarm", "", False),
     "tv_audio_delay": SonosFunction(tv_audio_delay, "", True),
-    "alarms_zone": SonosFunction(alarms.list_alarms, "", False),
-    "alarms_spec": SonosFunction(alarms.list_alarms_spec, "", False),
-    "alarms_spec_zone": SonosFunction(alarms.list_alarms_spec, "", False),
+    "alarms_zone": SonosFunction("soco_cli.alarms:list_alarms", "", False),
+    "alarms_spec": SonosFunction("soco_cli.alarms:list_alarms_spec", "", False),
+    "alarms_spec_zone": SonosFunction("soco_cli.alarms:list_alarms_spec", "", False),
     "mic_enabled": SonosFunction(mic_enabled, "", False),
     "group_volume_equalise": SonosFunction(group_volume_equalise, "", True),
     "group_volume_equalize": SonosFunction(group_volume_equalise, "", True),
@@ -5,25 +5,32 @@ to be used in other programs.
 """
 
 import logging
-import sys
-from io import StringIO
 from signal import SIGINT, signal
-from typing import Tuple, Union
+from typing import Any, List, Optional, Tuple, Union
 
 from soco import SoCo  # type: ignore
 
 from soco_cli.action_processor import process_action
+from soco_cli.context_local import ContextLocal
+from soco_cli.output_capture import capture_output, capture_result
+from soco_cli.speaker_metadata import invalidate
 from soco_cli.speakers import Speakers
 from soco_cli.utils import (
+    SpeakerLookup,
+    clear_speaker_lookups,
     configure_logging,
     create_speaker_cache,
     get_speaker,
+    get_speaker_lookups,
     set_api,
     set_speaker_list,
     sig_handler,
     speaker_cache,
 )
 
+# The exception raised by the most recent command run in each thread or task
+_last_exception = ContextLocal("soco_cli_last_exception")
+
 
 def run_command(
     speaker_name: Union[str, SoCo],
@@ -63,76 +70,64 @@ def run_command(
     set_api()
 
     if redirect_io:
-        # Capture stdout and stderr for the duration of this command
-        output = StringIO()
-        sys.stdout = output
-        error = StringIO()
-        sys.stderr = error
+        # Capture the stdout and stderr of this thread or task for the
+        # duration of this command
+        with capture_output() as (output, error), capture_result(structured=False):
+            return_tuple = _run_command(
+                speaker_name, action, args, use_local_speaker_list, output, error
+            )
+    else:
+        with capture_result(structured=False):
+            return_tuple = _run_command(
+                speaker_name, action, args, use_local_speaker_list, None, None
+            )
 
-    speaker = None
-    exception_error = None
+    logging.info("Return value: {}".format(return_tuple))
 
-    # Can pass a SoCo object instead of the speaker name
-    if isinstance(speaker_name, SoCo):
-        speaker = speaker_name
+    return return_tuple
 
-    elif isinstance(speaker_name, str):
-        try:
-            speaker = _get_soco_object(
-                speaker_name, use_local_speaker_list=use_local_speaker_list
-            )
-        except Exception as e:
-            logging.info("Exception: {}".format(e))
-            exception_error = e
 
-    if speaker:
-        action_return = False
-        try:
-            action_return = process_action(
-                speaker, action, args, use_local_speaker_list=use_local_speaker_list
-            )
-        except Exception as e:
-            logging.info("Exception: {}".format(e))
-            exception_error = e
+def run_command_result(
+    speaker_name: Union[str, SoCo],
+    action: str,
+    *args: str,
+    use_local_speaker_list: bool = False,
+) -> Tuple[int, Any, str]:
+    """Use SoCo-CLI to run a sonos command, returning its result as a
+    structured value instead of as text.
 
-        if redirect_io:
-            output_msg = output.getvalue().rstrip()
-            error_out = error.getvalue().rstrip()
-        else:
-            output_msg = ""
-            error_out = ""
+    Actions that support structured results return Python values, e.g.,
+    an int for 'volume', a bool for 'mute', a list of dicts for
+    'list_queue', and a dict for 'track'. The result of any other action
+    is its text output, as returned by run_command().
 
-        if output_msg != "":
-            lines = output_msg.splitlines()
-            if len(lines) > 1 and lines[0] != "":
-                output_msg = "\n" + output_msg
-            if len(lines) > 1 and output_msg[len(lines) - 1] != "":
-                output_msg = output_msg + "\n"
+    Args:
+        speaker_name (str or SoCo): The name of the speaker, or its IP address.
+            Alternatively, a 'SoCo' object can be supplied.
+        action (str): The name of the SoCo-CLI action to perform.
+        *args (list[str]): The set of arguments that accompany the action.
+        use_local_speaker_list (bool, optional): Whether to use the local
+            speaker cache.
 
-        if exception_error:
-            if error_out:
-                error_out = error_out + "\nError: " + str(exception_error)
-            else:
-                error_out = "Error: " + str(exception_error)
+    Returns:
+        (int, Any, str): a three-tuple of exit_code, result and error_msg.
+        If the exit code is non-zero, the result will be None.
+    """
 
-        if action_return is False:
-            if error_out == "":
-                hint = " ... missing spaces around ':'?" if ":" in action else ""
-                error_out = "Error: Action '{}' not recognised{}".format(action, hint)
-            return_tuple = (1, output_msg, error_out)
-        else:
-            return_tuple = (0, output_msg, error_out)
-    else:
-        return_tuple = (
-            1,
-            "",
-            "Speaker '{}' not found: {}".format(speaker_name, exception_error),
+    set_api()
+
+    with capture_output() as (output, error), capture_result() as result:
+        exit_code, output_msg, error_msg = _run_command(
+            speaker_name, action, args, use_local_speaker_list, output, error
         )
 
-    if redirect_io:
-        # Restore stdout and stderr
-        sys.stdout = sys.__stdout__
-        sys.stderr = sys.__stderr__
+    if exit_code != 0:
+        value = None
+    elif result.emitted:
+        value = result.value
+    else:
+        value = output_msg
+    return_tuple = (exit_code, value, error_msg)
 
     logging.info("Return value: {}".format(return_tuple))
 
@@ -165,6 +160,13 @@ def rediscover_speakers() -> None:
     speaker_cache().discover(reset=True)
 
 
+def invalidate_speaker_metadata(ip_address: str = None) -> None:
+    """Forget the cached name, visibility, UID and household ID of the
+    speaker at 'ip_address', or of all speakers if no IP address is given,
+    so that they are read from the speaker when next required."""
+    invalidate(ip_address)
+
+
 def get_all_speakers(use_scan: bool = False) -> list:
     """Return all SoCo instances."""
     _check_for_speaker_cache()
@@ -177,6 +179,41 @@ def get_all_speaker_names(use_scan: bool = False) -> list:
     return speaker_cache().get_all_speaker_names(use_scan=use_scan)
 
 
+def get_lookup_stats() -> List[SpeakerLookup]:
+    """Return details of recent speaker name lookups, oldest first.
+
+    Each entry is a SpeakerLookup named tuple, containing the name looked
+    up, the strategy that found it (None if it wasn't found), the total
+    time taken in seconds, and a list of (strategy, seconds) tuples for
+    each strategy tried.
+    """
+    return get_speaker_lookups()
+
+
+def clear_lookup_stats() -> None:
+    """Clear the record of speaker name lookups."""
+    clear_speaker_lookups()
+
+
+def last_exception() -> Optional[Exception]:
+    """Return the exception raised by the most recent command run in the
+    current thread or task using run_command() or run_command_result(), or
+    None if it didn't raise an exception.
+
+    Exceptions are reported as text in the error message string; this allows
+    the type of failure to be checked, e.g., for a network error.
+    """
+    return _last_exception.get()
+
+
+def set_negative_lookup_ttl(ttl: float) -> None:
+    """Set how long, in seconds, a speaker name that couldn't be found is
+    remembered, so that repeated lookups fail immediately. Zero disables
+    this."""
+    _check_for_speaker_cache()
+    speaker_cache().negative_lookup_ttl = ttl
+
+
 def get_soco_object(
     speaker_name: str, use_local_speaker_list: bool = False
 ) -> Tuple[Union[SoCo, None], str]:
@@ -193,12 +230,8 @@ def get_soco_object(
     """
     set_api()
 
-    error = StringIO()
-    sys.stderr = error
-
-    speaker = _get_soco_object(speaker_name, use_local_speaker_list)
-
-    sys.stderr = sys.__stderr__
+    with capture_output() as (_, error):
+        speaker = _get_soco_object(speaker_name, use_local_speaker_list)
 
     error_msg = error.getvalue().rstrip()
     if not speaker and error_msg == "":
@@ -207,6 +240,73 @@ def get_soco_object(
     return speaker, error_msg
 
 
+def _run_command(speaker_name, action, args, use_local_speaker_list, output, error):
+    """Run a command, returning (exit_code, output_msg, error_msg). Output is
+    read from 'output' and 'error' if they're not None."""
+    speaker = None
+    exception_error = None
+
+    # Can pass a SoCo object instead of the speaker name
+    if isinstance(speaker_name, SoCo):
+        speaker = speaker_name
+
+    elif isinstance(speaker_name, str):
+        try:
+            speaker = _get_soco_object(
+                speaker_name, use_local_speaker_list=use_local_speaker_list
+            )
+        except Exception as e:
+            logging.info("Exception: {}".format(e))
+            exception_error = e
+
+    if speaker:
+        action_return = False
+        try:
+            action_return = process_action(
+                speaker, action, args, use_local_speaker_list=use_local_speaker_list
+            )
+        except Exception as e:
+            logging.info("Exception: {}".format(e))
+            exception_error = e
+
+        if output is not None:
+            output_msg = output.getvalue().rstrip()
+            error_out = error.getvalue().rstrip()
+        else:
+            output_msg = ""
+            error_out = ""
+
+        if output_msg != "":
+            lines = output_msg.splitlines()
+            if len(lines) > 1 and lines[0] != "":
+                output_msg = "\n" + output_msg
+            if len(lines) > 1 and output_msg[len(lines) - 1] != "":
+                output_msg = output_msg + "\n"
+
+        if exception_error:
+            if error_out:
+                error_out = error_out + "\nError: " + str(exception_error)
+            else:
+                error_out = "Error: " + str(exception_error)
+
+        if action_return is False:
+            if error_out == "":
+                hint = " ... missing spaces around ':'?" if ":" in action else ""
+                error_out = "Error: Action '{}' not recognised{}".format(action, hint)
+            return_tuple = (1, output_msg, error_out)
+        else:
+            return_tuple = (0, output_msg, error_out)
+    else:
+        return_tuple = (
+            1,
+            "",
+            "Speaker '{}' not found: {}".format(speaker_name, exception_error),
+        )
+
+    _last_exception.set(exception_error)
+    return return_tuple
+
+
 def _get_soco_object(speaker_name: str, use_local_speaker_list: bool = False) -> SoCo:
     """Internal helper version that doesn't redirect stderr."""
 
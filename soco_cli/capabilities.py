@@ -0,0 +1,245 @@
+"""Caches a capability profile for each Sonos device.
+
+A device's model determines whether it's a soundbar or a Sub, whether it
+has a battery, a line-in or a TV input, and whether it can have surround
+satellites. The profile is derived from the device's speaker info, which
+SoCo fetches over HTTP, and is saved between invocations keyed by the
+device's UID. Only the model and the capabilities derived from it are
+saved: details that can change, such as the zone name and software
+version, must be fetched from the device when needed. Applying a profile
+to a SoCo instance pre-populates SoCo's soundbar check, so that it also
+avoids the network.
+"""
+
+import logging
+import os
+import pickle
+import threading
+from collections import namedtuple
+
+from soco_cli.discovery_cache import write_pickle_atomically
+
+# Model name endings, as used by SoCo
+SOUNDBARS = (
+    "arc",
+    "arc sl",
+    "arc ultra",
+    "beam",
+    "beam ultra",
+    "playbase",
+    "playbar",
+    "ray",
+    "sonos amp",
+)
+BATTERY_MODELS = ("move", "move 2", "roam", "roam sl", "roam 2")
+# Models known not to have a line-in; other models are assumed to have one
+NO_LINE_IN_MODELS = (
+    "arc",
+    "arc sl",
+    "arc ultra",
+    "beam",
+    "beam ultra",
+    "boost",
+    "bridge",
+    "one",
+    "one sl",
+    "play:1",
+    "play:3",
+    "playbase",
+    "playbar",
+    "ray",
+    "roam",
+    "roam sl",
+    "roam 2",
+    "sub",
+    "sub mini",
+    "sub 4",
+)
+INFRASTRUCTURE_MODELS = ("boost", "bridge")
+
+CapabilityProfile = namedtuple(
+    "CapabilityProfile",
+    [
+        "uid",
+        "model_name",
+        "is_soundbar",
+        "is_sub",
+        "supports_satellites",
+        "has_battery",
+        "has_line_in",
+        "has_tv",
+        "is_infrastructure",
+    ],
+    rename=False,
+)
+
+
+def _model_is(model_name, models):
+    model_name = model_name.lower()
+    return any(model_name.endswith(model) for model in models)
+
+
+def create_profile(speaker_info):
+    """Create a CapabilityProfile from a SoCo speaker info dict."""
+    model_name = speaker_info["model_name"]
+    if not isinstance(model_name, str):
+        raise ValueError("Speaker info has no model name")
+    is_soundbar = _model_is(model_name, SOUNDBARS)
+    return CapabilityProfile(
+        uid=speaker_info["uid"],
+        model_name=model_name,
+        is_soundbar=is_soundbar,
+        is_sub=_model_is(model_name, ("sub", "sub mini", "sub 4")),
+        supports_satellites=is_soundbar,
+        has_battery=_model_is(model_name, BATTERY_MODELS),
+        has_line_in=not _model_is(model_name, NO_LINE_IN_MODELS),
+        has_tv=is_soundbar,
+        is_infrastructure=_model_is(model_name, INFRASTRUCTURE_MODELS),
+    )
+
+
+class CapabilityCache:
+    """Capability profiles keyed by device UID, saved to a file."""
+
+    def __init__(self, save_directory=None, save_file=None):
+        self._save_directory = (
+            save_directory
+            if save_directory
+            else os.path.expanduser("~") + "/.soco-cli/"
+        )
+        self._save_file = save_file if save_file else "capabilities.pickle"
+        self._profiles = None
+        self._changed = False
+        self._lock = threading.Lock()
+
+    @property
+    def save_pathname(self):
+        return self._save_directory + self._save_file
+
+    def _load(self):
+        # Called with the lock held
+        if self._profiles is not None:
+            return
+        self._profiles = {}
+        if not os.path.exists(self.save_pathname):
+            return
+        try:
+            with open(self.save_pathname, "rb") as f:
+                profiles = pickle.load(f)
+        except Exception as e:
+            logging.info("Failed to load capability profiles: {}".format(e))
+            return
+        if isinstance(profiles, dict):
+            self._profiles = profiles
+            logging.info("Loaded {} capability profile(s)".format(len(profiles)))
+
+    def get(self, uid):
+        """Return the profile for a UID, or None."""
+        with self._lock:
+            self._load()
+            return self._profiles.get(uid)
+
+    def record(self, speaker_info):
+        """Create and store the profile for a device from its speaker info
+        dict. Returns the profile."""
+        profile = create_profile(speaker_info)
+        with self._lock:
+            self._load()
+            if self._profiles.get(profile.uid) != profile:
+                self._profiles[profile.uid] = profile
+                self._changed = True
+        return profile
+
+    def forget(self, uid=None):
+        """Forget the profile for a UID, or all profiles."""
+        with self._lock:
+            self._load()
+            if uid is None:
+                self._changed = bool(self._profiles)
+                self._profiles = {}
+            elif self._profiles.pop(uid, None) is not None:
+                self._changed = True
+
+    def save(self):
+        """Save the profiles, if they have changed. Returns True if saved."""
+        with self._lock:
+            if not self._changed:
+                return False
+            try:
+                write_pickle_atomically(
+                    self._profiles, self._save_directory, self.save_pathname
+                )
+            except Exception as e:
+                logging.info("Failed to save capability profiles: {}".format(e))
+                return False
+            self._changed = False
+            logging.info(
+                "Saved {} capability profile(s) to {}".format(
+                    len(self._profiles), self.save_pathname
+                )
+            )
+            return True
+
+
+CAPABILITY_CACHE = None
+
+
+def capability_cache():
+    """Return the capability cache, creating it if necessary."""
+    global CAPABILITY_CACHE
+    if CAPABILITY_CACHE is None:
+        CAPABILITY_CACHE = CapabilityCache()
+    return CAPABILITY_CACHE
+
+
+def set_capability_cache(cache):
+    global CAPABILITY_CACHE
+    CAPABILITY_CACHE = cache
+
+
+def get_capabilities(speaker, local_only=False):
+    """Return the capability profile for a SoCo instance, from the cache if
+    possible, or from the device's speaker info (which is then cached).
+
+    The speaker's soundbar check is pre-populated from the profile, so
+    that SoCo doesn't need to fetch its speaker info. Returns None if the
+    device can't be profiled, or if 'local_only' is set and the speaker's
+    UID or its profile isn't already known, in which case the device isn't
+    contacted.
+    """
+    cache = capability_cache()
+    try:
+        if local_only:
+            # SoCo holds the UID if it's been read, or seeded from the
+            # speaker list or cache
+            uid = getattr(speaker, "_uid", None)
+            profile = cache.get(uid) if uid is not None else None
+            if profile is None:
+                return None
+        else:
+            uid = speaker.uid
+            profile = cache.get(uid)
+        if profile is None:
+            logging.info("No capability profile for {}".format(uid))
+            profile = cache.record(speaker.get_speaker_info())
+            cache.save()
+    except Exception as e:
+        logging.info("Unable to profile speaker: {}".format(e))
+        return None
+    apply_profile(speaker, profile)
+    return profile
+
+
+def has_capability(speaker, capability, local_only=False):
+    """Check a capability of a SoCo instance, e.g. 'has_battery'. Returns
+    None if the speaker can't be profiled (see get_capabilities())."""
+    profile = get_capabilities(speaker, local_only=local_only)
+    if profile is None:
+        return None
+    return getattr(profile, capability)
+
+
+def apply_profile(speaker, profile):
+    """Pre-populate SoCo's cached soundbar check from a capability profile."""
+    if getattr(speaker, "_is_soundbar", None) is None:
+        speaker._is_soundbar = profile.is_soundbar
@@ -1,5 +1,14 @@
 """Parse sequential command lines, using ':' as a command separator."""
 
+# Sequences that start and end a block of sequences to be run concurrently
+PARALLEL = "parallel"
+END_PARALLEL = "end_parallel"
+
+
+class ParallelBlock(list):
+    """The command sequences in a parallel block, which are run
+    concurrently."""
+
 
 class CLIParser:
     def __init__(self):
@@ -53,3 +62,53 @@ class CLIParser:
 
     def get_sequences(self):
         return self._sequences
+
+
+def group_parallel_blocks(sequences, excluded=()):
+    """Group the command sequences between each 'parallel' and
+    'end_parallel' sequence into a ParallelBlock.
+
+    Args:
+        sequences (list): The command sequences, as returned by
+            CLIParser.get_sequences().
+        excluded (iterable): The lower case first words of sequences that
+            can't be used in a parallel block, e.g., loop actions.
+
+    Returns:
+        list: The command sequences, with each parallel block replaced by a
+            single ParallelBlock.
+
+    Raises:
+        ValueError: If the parallel blocks are invalid.
+    """
+    grouped = []
+    block = None
+    for sequence in sequences:
+        first = sequence[0].lower() if sequence else None
+        if first in [PARALLEL, END_PARALLEL]:
+            if len(sequence) != 1:
+                raise ValueError("Action '{}' takes no parameters".format(first))
+            if first == PARALLEL:
+                if block is not None:
+                    raise ValueError("Parallel blocks can't be nested")
+                block = ParallelBlock()
+            else:
+                if block is None:
+                    raise ValueError(
+                        "'{}' without a matching '{}'".format(END_PARALLEL, PARALLEL)
+                    )
+                if not block:
+                    raise ValueError("Empty parallel block")
+                grouped.append(block)
+                block = None
+        elif block is not None:
+            if first in excluded:
+                raise ValueError(
+                    "'{}' can't be used in a parallel block".format(sequence[0])
+                )
+            block.append(sequence)
+        else:
+            grouped.append(sequence)
+    if block is not None:
+        raise ValueError("Missing '{}' after '{}'".format(END_PARALLEL, PARALLEL))
+    return grouped
@@ -0,0 +1,35 @@
+"""Values local to the current asyncio task or thread.
+
+Uses the 'contextvars' module where available (Python 3.7+), falling back
+to thread-local storage otherwise.
+"""
+
+import threading
+
+try:
+    from contextvars import ContextVar
+except ImportError:  # Python < 3.7
+    ContextVar = None
+
+
+class ContextLocal:
+    """A value local to the current asyncio task or thread, defaulting to
+    None."""
+
+    def __init__(self, name):
+        if ContextVar is not None:
+            self._var = ContextVar(name, default=None)
+        else:
+            self._var = None
+            self._local = threading.local()
+
+    def get(self):
+        if self._var is not None:
+            return self._var.get()
+        return getattr(self._local, "value", None)
+
+    def set(self, value):
+        if self._var is not None:
+            self._var.set(value)
+        else:
+            self._local.value = value
@@ -0,0 +1,347 @@
+"""The 'sonos' daemon, started using 'sonos --daemon'.
+
+The daemon is a resident process that keeps SoCo-CLI's modules loaded and
+its speaker cache populated. Commands are forwarded to it over a Unix
+socket by the 'sonos' command (see daemon_client.py).
+
+Each command is run in a process forked from the daemon, so it starts
+with the daemon's loaded modules and speakers, but has its own arguments,
+environment, working directory and standard streams, exactly as if it had
+been run by the 'sonos' command itself. A first child process receives the
+request, forks the process that runs the command, forwards signals to it
+from the client, and returns its exit code to the client. The daemon
+itself only ever accepts connections, so it's never affected by the
+commands it runs.
+"""
+
+import logging
+import os
+import signal
+import socket
+import struct
+import sys
+import threading
+from importlib import import_module
+from time import monotonic
+
+from soco_cli.daemon_client import (
+    DAEMON_SOCKET,
+    FORWARDED_SIGNALS,
+    STD_FDS,
+    daemon_supported,
+    receive_int,
+    receive_request,
+    send_int,
+)
+from soco_cli.utils import error_report, speaker_cache
+
+# Modules that are otherwise only loaded when first used by a command
+PRELOAD_MODULES = [
+    "soco_cli.alarms",
+    "soco_cli.play_local_file",
+    "soco_cli.play_local_file_lists",
+    "soco_cli.track_follow",
+    "tabulate",
+    "xmltodict",
+]
+
+# How often the daemon checks whether it's been asked to stop (seconds)
+ACCEPT_TIMEOUT = 0.5
+
+# How long a client has to send its request after connecting (seconds)
+REQUEST_TIMEOUT = 10.0
+
+
+def preload_modules():
+    for name in PRELOAD_MODULES:
+        try:
+            import_module(name)
+        except ImportError as error:
+            logging.info("Unable to preload module '{}': {}".format(name, error))
+
+
+def exit_code_from_status(status):
+    """Convert a status returned by os.waitpid() into an exit code,
+    following the shell convention for processes killed by a signal."""
+    if os.WIFSIGNALED(status):
+        return 128 + os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def peer_uid(conn):
+    """Return the user ID of the process at the other end of a Unix socket
+    connection, or None if the platform can't report it."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    credentials = struct.Struct("3i")
+    _, uid, _ = credentials.unpack(
+        conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, credentials.size)
+    )
+    return uid
+
+
+def run_sonos(argv):
+    """Run a 'sonos' command in the current process."""
+    from soco_cli.sonos import main
+
+    sys.argv = ["sonos"] + argv
+    main()
+
+
+def run_request(request, fds, run=run_sonos):
+    """Run a command with the client's arguments, environment, working
+    directory and standard streams. Called in the forked command process.
+
+    Returns:
+        int: The command's exit code.
+    """
+    for fd, std_fd in zip(fds, STD_FDS):
+        os.dup2(fd, std_fd)
+        os.close(fd)
+    sys.stdin = os.fdopen(STD_FDS[0], "r", closefd=False)
+    sys.stdout = os.fdopen(STD_FDS[1], "w", buffering=1, closefd=False)
+    sys.stderr = os.fdopen(STD_FDS[2], "w", buffering=1, closefd=False)
+
+    for sig in FORWARDED_SIGNALS:
+        signal.signal(sig, signal.SIG_DFL)
+
+    # Let the command configure logging for itself
+    logging.disable(logging.NOTSET)
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+
+    os.environ.clear()
+    os.environ.update(request["env"])
+
+    exit_code = 0
+    try:
+        os.chdir(request["cwd"])
+        run(request["argv"])
+    except SystemExit as error:
+        if error.code is None:
+            exit_code = 0
+        elif isinstance(error.code, int):
+            exit_code = error.code
+        else:
+            print(error.code, file=sys.stderr)
+            exit_code = 1
+    except Exception as error:
+        print("Error:", str(error), file=sys.stderr)
+        exit_code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    return exit_code
+
+
+class DaemonServer:
+    """Accepts connections from 'sonos' clients, and runs their commands.
+
+    Args:
+        socket_path (str): The Unix socket to listen on.
+        run (function): Runs a command, given its arguments.
+        refresh (function): Called every 'refresh_interval' seconds, between
+            commands, to refresh the daemon's state.
+        refresh_interval (float): The interval between refreshes (seconds).
+    """
+
+    def __init__(
+        self, socket_path=DAEMON_SOCKET, run=run_sonos, refresh=None, refresh_interval=0
+    ):
+        self._socket_path = socket_path
+        self._run = run
+        self._refresh = refresh
+        self._refresh_interval = refresh_interval
+        self._sock = None
+        self._children = set()
+        self._stopped = False
+
+    @property
+    def socket_path(self):
+        return self._socket_path
+
+    def _in_use(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self._socket_path)
+            return True
+        except OSError:
+            return False
+        finally:
+            sock.close()
+
+    def bind(self):
+        """Create the socket, replacing any left behind by a daemon that
+        didn't exit cleanly.
+
+        Returns:
+            bool: False if another daemon is using the socket.
+        """
+        if self._in_use():
+            return False
+        if os.path.exists(self._socket_path):
+            logging.info("Removing stale socket '{}'".format(self._socket_path))
+            os.remove(self._socket_path)
+        directory = os.path.dirname(self._socket_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, mode=0o700)
+
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Only the user running the daemon can use it: the socket is created
+        # with these permissions, so it's never accessible to anyone else
+        old_umask = os.umask(0o177)
+        try:
+            self._sock.bind(self._socket_path)
+        finally:
+            os.umask(old_umask)
+        self._sock.listen(16)
+        self._sock.settimeout(ACCEPT_TIMEOUT)
+        logging.info("Daemon listening on '{}'".format(self._socket_path))
+        return True
+
+    def stop(self):
+        """Stop serving, at the next opportunity. Can be called from a signal
+        handler or another thread."""
+        self._stopped = True
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            os.remove(self._socket_path)
+        self._reap_children()
+
+    def serve(self):
+        """Accept connections until stop() is called."""
+        last_refresh = monotonic()
+        while not self._stopped:
+            if self._refresh and monotonic() - last_refresh >= self._refresh_interval:
+                logging.info("Refreshing the daemon's state")
+                self._refresh()
+                last_refresh = monotonic()
+            try:
+                conn, _ = self._sock.accept()
+            except socket.timeout:
+                self._reap_children()
+                continue
+            try:
+                pid = os.fork()
+            except OSError as error:
+                logging.info("Unable to fork: {}".format(error))
+                conn.close()
+                continue
+            if pid == 0:
+                # Never return into the daemon's own code
+                exit_code = 1
+                try:
+                    self._sock.close()
+                    conn.settimeout(REQUEST_TIMEOUT)
+                    self._handle(conn)
+                    exit_code = 0
+                finally:
+                    os._exit(exit_code)
+            conn.close()
+            self._children.add(pid)
+            self._reap_children()
+
+    def _reap_children(self):
+        for pid in list(self._children):
+            try:
+                finished, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                finished = pid
+            if finished == pid:
+                self._children.discard(pid)
+
+    def _handle(self, conn):
+        """Handle a connection. Called in the forked request process."""
+        uid = peer_uid(conn)
+        if uid is not None and uid != os.getuid():
+            logging.info("Refusing connection from user ID {}".format(uid))
+            return
+        try:
+            request, fds = receive_request(conn)
+        except (ConnectionError, ValueError, socket.timeout) as error:
+            logging.info("Invalid request: {}".format(error))
+            return
+        conn.settimeout(None)
+        if len(fds) != len(STD_FDS):
+            logging.info("Request has {} file descriptors".format(len(fds)))
+            return
+
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 1
+            try:
+                conn.close()
+                exit_code = run_request(request, fds, run=self._run)
+            finally:
+                os._exit(exit_code)
+        for fd in fds:
+            os.close(fd)
+
+        finished = threading.Event()
+        forwarder = threading.Thread(
+            target=self._forward_signals, args=(conn, pid, finished), daemon=True
+        )
+        forwarder.start()
+        _, status = os.waitpid(pid, 0)
+        finished.set()
+        send_int(conn, exit_code_from_status(status))
+
+    @staticmethod
+    def _forward_signals(conn, pid, finished):
+        while True:
+            signum = receive_int(conn)
+            if finished.is_set():
+                return
+            if signum is None:
+                # The client has gone away
+                logging.info("Client disconnected: terminating command")
+                os.kill(pid, signal.SIGTERM)
+                return
+            if signum in FORWARDED_SIGNALS:
+                logging.info("Forwarding signal {} to command".format(signum))
+                os.kill(pid, signum)
+
+
+def run_daemon(use_local_speaker_list=False, refresh_interval=3600):
+    """Run the daemon until it receives SIGINT or SIGTERM.
+
+    Args:
+        use_local_speaker_list (bool): Whether the local speaker list is in
+            use. If it isn't, the speaker cache is populated at start-up,
+            and refreshed every 'refresh_interval' seconds (if > 0).
+        refresh_interval (float): The interval between refreshes (seconds).
+    """
+    if not daemon_supported():
+        error_report("The sonos daemon is not supported on this platform")
+
+    preload_modules()
+
+    def refresh():
+        speaker_cache().discover(reset=True)
+
+    if use_local_speaker_list:
+        refresh_interval = 0
+    else:
+        logging.info("Populating the speaker cache")
+        speaker_cache().discover()
+
+    server = DaemonServer(
+        refresh=refresh if refresh_interval > 0 else None,
+        refresh_interval=refresh_interval,
+    )
+    if not server.bind():
+        error_report(
+            "A sonos daemon is already running, using '{}'".format(server.socket_path)
+        )
+    for sig in [signal.SIGINT, signal.SIGTERM]:
+        signal.signal(sig, lambda signum, frame: server.stop())
+
+    print("Sonos daemon running: use CTRL-C or SIGTERM to stop", flush=True)
+    try:
+        server.serve()
+    finally:
+        server.close()
+    print("Sonos daemon stopped", flush=True)
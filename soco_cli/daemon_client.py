@@ -0,0 +1,165 @@
+"""The entry point for the 'sonos' command, which forwards the command to
+the 'sonos' daemon if one is running (see daemon.py), and otherwise runs
+it in this process.
+
+This module must be quick to load, so it only uses the standard library.
+
+The client connects to the daemon's Unix socket and sends a request
+containing the command line arguments, the working directory and the
+environment, with its stdin, stdout and stderr file descriptors attached.
+The daemon runs the command using these descriptors, so its output is
+written directly to the client's terminal, files or pipes. Signals
+received by the client (e.g., CTRL-C) are forwarded to the daemon, which
+finally returns the command's exit code.
+"""
+
+import array
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+
+# The daemon's socket
+DAEMON_SOCKET = os.path.join(os.path.expanduser("~"), ".soco-cli", "daemon.sock")
+
+# Options that are always handled by the 'sonos' command itself
+LOCAL_OPTIONS = ["--daemon", "--no-daemon", "--interactive", "-i", "--sk"]
+
+# Signals forwarded from the client to the command running in the daemon
+FORWARDED_SIGNALS = [signal.SIGINT, signal.SIGTERM]
+if hasattr(signal, "SIGHUP"):
+    FORWARDED_SIGNALS.append(signal.SIGHUP)
+
+# The stdin, stdout and stderr file descriptors
+STD_FDS = (0, 1, 2)
+
+# Requests are sent as a length followed by a JSON object; signal numbers
+# and exit codes are sent as single integers
+_INT = struct.Struct("!i")
+
+
+def daemon_supported():
+    """Whether the daemon can be used on this platform."""
+    return hasattr(socket, "AF_UNIX") and hasattr(socket.socket, "sendmsg")
+
+
+def _receive_exactly(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed")
+        data += chunk
+    return data
+
+
+def send_int(sock, value):
+    sock.sendall(_INT.pack(value))
+
+
+def receive_int(sock):
+    """Receive an integer.
+
+    Returns:
+        int: The integer, or None if the connection was closed first.
+    """
+    try:
+        return _INT.unpack(_receive_exactly(sock, _INT.size))[0]
+    except ConnectionError:
+        return None
+
+
+def send_request(sock, request, fds):
+    """Send a request, with a list of file descriptors attached."""
+    body = json.dumps(request).encode("utf-8")
+    sock.sendmsg(
+        [_INT.pack(len(body)) + body],
+        [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))],
+    )
+
+
+def receive_request(sock, max_fds=len(STD_FDS)):
+    """Receive a request sent using send_request().
+
+    Returns:
+        dict, list: The request, and the attached file descriptors.
+
+    Raises:
+        ConnectionError: If the connection was closed before the complete
+            request was received.
+    """
+    fds = array.array("i")
+    header, ancdata, _, _ = sock.recvmsg(
+        _INT.size, socket.CMSG_SPACE(max_fds * fds.itemsize)
+    )
+    for level, message_type, data in ancdata:
+        if level == socket.SOL_SOCKET and message_type == socket.SCM_RIGHTS:
+            fds.frombytes(data[: len(data) - (len(data) % fds.itemsize)])
+    if not header:
+        raise ConnectionError("Connection closed")
+    header += _receive_exactly(sock, _INT.size - len(header))
+    body = _receive_exactly(sock, _INT.unpack(header)[0])
+    return json.loads(body.decode("utf-8")), list(fds)
+
+
+def use_daemon(argv):
+    """Whether a command with these arguments can be run by the daemon."""
+    return daemon_supported() and not any(arg in LOCAL_OPTIONS for arg in argv)
+
+
+def forward(argv, socket_path=DAEMON_SOCKET, fds=STD_FDS, forward_signals=False):
+    """Run a 'sonos' command in the daemon.
+
+    Args:
+        argv (list): The command line arguments, excluding the program name.
+        socket_path (str): The daemon's socket.
+        fds (tuple): The stdin, stdout and stderr file descriptors to be used
+            by the command.
+        forward_signals (bool): Whether to forward signals received while
+            the command is running. Only possible in the main thread.
+
+    Returns:
+        int: The command's exit code, or None if the daemon is not running.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return None
+
+        request = {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}
+        send_request(sock, request, fds)
+
+        handlers = {}
+        if forward_signals:
+            for sig in FORWARDED_SIGNALS:
+                handlers[sig] = signal.signal(
+                    sig, lambda signum, frame: send_int(sock, signum)
+                )
+        try:
+            exit_code = receive_int(sock)
+        finally:
+            for sig, handler in handlers.items():
+                signal.signal(sig, handler)
+
+        if exit_code is None:
+            print("Error: Lost connection to the sonos daemon", file=sys.stderr)
+            return 1
+        return exit_code
+    finally:
+        sock.close()
+
+
+def main():
+    argv = sys.argv[1:]
+    if use_daemon(argv):
+        exit_code = forward(argv, forward_signals=True)
+        if exit_code is not None:
+            sys.exit(exit_code)
+
+    from soco_cli.sonos import main as sonos_main
+
+    sonos_main()
@@ -0,0 +1,191 @@
+"""Manages an on-disk cache of speakers found using SoCo discovery.
+
+The cache is shared between invocations of 'sonos' when the local speaker
+list is not in use, so that each invocation does not need to repeat the
+discovery process. Entries are only trusted within a TTL, and a speaker is
+only used if the device at its IP address responds with the same UID, so
+that a cached IP address that now belongs to a different device (e.g.,
+after DHCP leases have changed) is never used.
+"""
+
+import logging
+import os
+import pickle
+import socket
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+
+SONOS_PORT = 1400
+
+# The device description, which includes the device's UID
+DEVICE_DESCRIPTION = "/xml/device_description.xml"
+
+# Maximum number of cached speakers verified at once
+VERIFY_THREADS = 32
+
+
+class DiscoveryCache:
+    """A file containing (ip_address, speaker_name, uid) records from the
+    most recent discovery, with the time at which they were saved.
+    """
+
+    def __init__(
+        self,
+        save_directory=None,
+        save_file=None,
+        ttl=3600,
+        probe_timeout=0.5,
+    ):
+        self._save_directory = (
+            save_directory
+            if save_directory
+            else os.path.expanduser("~") + "/.soco-cli/"
+        )
+        self._save_file = save_file if save_file else "discovery_cache.pickle"
+        self._ttl = ttl
+        self._probe_timeout = probe_timeout
+
+    @property
+    def save_pathname(self):
+        return self._save_directory + self._save_file
+
+    @property
+    def ttl(self):
+        return self._ttl
+
+    @ttl.setter
+    def ttl(self, ttl):
+        self._ttl = ttl
+
+    @property
+    def probe_timeout(self):
+        return self._probe_timeout
+
+    def _read(self):
+        if not os.path.exists(self.save_pathname):
+            logging.info("No discovery cache file at {}".format(self.save_pathname))
+            return None
+        try:
+            with open(self.save_pathname, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            logging.info("Failed to load discovery cache: {}".format(e))
+            return None
+
+    def load(self):
+        """Return the list of cached (ip_address, speaker_name, uid) records,
+        or None if there is no cache file or it is older than the TTL."""
+        contents = self._read()
+        if contents is None:
+            return None
+        try:
+            age = time.time() - contents["timestamp"]
+            records = [tuple(record) for record in contents["speakers"]]
+            if not all(len(record) == 3 for record in records):
+                raise ValueError
+        except (KeyError, TypeError, ValueError):
+            logging.info("Discovery cache file has an unexpected format")
+            return None
+        if age > self._ttl:
+            logging.info(
+                "Discovery cache is stale ({:.0f}s old, TTL = {}s)".format(
+                    age, self._ttl
+                )
+            )
+            return None
+        logging.info(
+            "Loaded {} speaker(s) from discovery cache ({:.0f}s old)".format(
+                len(records), age
+            )
+        )
+        return records
+
+    def save(self, records):
+        """Save a list of (ip_address, speaker_name, uid) records."""
+        if not records:
+            return False
+        try:
+            write_pickle_atomically(
+                {"timestamp": time.time(), "speakers": list(records)},
+                self._save_directory,
+                self.save_pathname,
+            )
+        except Exception as e:
+            logging.info("Failed to save discovery cache: {}".format(e))
+            return False
+        logging.info(
+            "Saved {} speaker(s) to discovery cache at {}".format(
+                len(records), self.save_pathname
+            )
+        )
+        return True
+
+    def remove(self):
+        """Remove the cache file, if it exists."""
+        try:
+            os.remove(self.save_pathname)
+            logging.info("Removed discovery cache {}".format(self.save_pathname))
+        except OSError:
+            pass
+
+    def probe(self, ip_address, uid):
+        """Check that the device with this UID is still at 'ip_address'."""
+        return probe_device(ip_address, uid, timeout=self._probe_timeout)
+
+    def verify(self, records):
+        """Probe the devices in a list of records concurrently. Returns the
+        records whose device is still at the cached IP address."""
+        if not records:
+            return []
+        with ThreadPoolExecutor(
+            max_workers=min(VERIFY_THREADS, len(records))
+        ) as executor:
+            results = list(
+                executor.map(lambda record: self.probe(record[0], record[2]), records)
+            )
+        return [record for record, verified in zip(records, results) if verified]
+
+
+def write_pickle_atomically(contents, directory, pathname):
+    """Pickle 'contents' to a file, using a temporary file and a rename, so
+    that concurrent readers never see a partially written file."""
+    if not os.path.exists(directory):
+        os.mkdir(directory)
+    fd, temp_pathname = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(contents, f)
+        os.replace(temp_pathname, pathname)
+    except Exception:
+        os.remove(temp_pathname)
+        raise
+
+
+def probe_port(ip_address, port=SONOS_PORT, timeout=0.5):
+    """Return True if a TCP connection can be made to ip_address:port."""
+    try:
+        with socket.create_connection((ip_address, port), timeout=timeout):
+            logging.info("Device at {}:{} is responding".format(ip_address, port))
+            return True
+    except OSError:
+        logging.info("Device at {}:{} is not responding".format(ip_address, port))
+        return False
+
+
+def probe_device(ip_address, uid, port=SONOS_PORT, timeout=0.5):
+    """Return True if the Sonos device at ip_address:port has this UID,
+    read from its device description."""
+    url = "http://{}:{}{}".format(ip_address, port, DEVICE_DESCRIPTION)
+    try:
+        with urlopen(url, timeout=timeout) as response:
+            description = response.read()
+    except Exception as e:
+        logging.info("Device at {} is not responding: {}".format(ip_address, e))
+        return False
+    if "<UDN>uuid:{}</UDN>".format(uid).encode("utf-8") not in description:
+        logging.info("Device at {} is no longer '{}'".format(ip_address, uid))
+        return False
+    logging.info("Device '{}' is still at {}".format(uid, ip_address))
+    return True
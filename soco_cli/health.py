@@ -0,0 +1,238 @@
+"""Probes the health of the devices in the local speaker list.
+
+Each device is sent two lightweight requests per round: an HTTP request
+for '/status/info' on port 1400, and a SOAP call to read its household ID.
+All devices are probed concurrently, using a bounded number of threads,
+and the latencies and errors are collected over a number of rounds.
+"""
+
+import json
+import logging
+import math
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+
+import soco  # type: ignore
+import tabulate  # type: ignore
+
+from soco_cli.discovery_cache import SONOS_PORT
+
+HEALTH_TIMEOUT = 2.0
+HEALTH_ROUNDS = 3
+
+PROBE_STATUS = "status"
+PROBE_SOAP = "soap"
+
+HealthReport = namedtuple(
+    "HealthReport",
+    [
+        "device",
+        "firmware",
+        "status_latencies",
+        "status_errors",
+        "soap_latencies",
+        "soap_errors",
+    ],
+    rename=False,
+)
+
+
+def probe_status(ip_address, timeout=HEALTH_TIMEOUT):
+    """Request '/status/info' from a device.
+
+    Returns:
+        float, str: The latency in seconds, and the device's software
+            version, or None if it couldn't be read from the response.
+    """
+    start = time.time()
+    with urlopen(
+        "http://{}:{}/status/info".format(ip_address, SONOS_PORT), timeout=timeout
+    ) as response:
+        body = response.read()
+    latency = time.time() - start
+    try:
+        firmware = json.loads(body.decode("utf-8"))["device"]["softwareVersion"]
+    except (ValueError, KeyError, TypeError):
+        firmware = None
+    return latency, firmware
+
+
+def probe_soap(ip_address, timeout=HEALTH_TIMEOUT):
+    """Make a lightweight SOAP call to a device. Returns the latency in
+    seconds."""
+    start = time.time()
+    soco.SoCo(ip_address).deviceProperties.GetHouseholdID(timeout=timeout)
+    return time.time() - start
+
+
+def percentile(values, fraction):
+    """The nearest-rank percentile of a list of values, or None if the list
+    is empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+def probe_devices(
+    devices, rounds=HEALTH_ROUNDS, timeout=HEALTH_TIMEOUT, max_threads=64
+):
+    """Probe a list of SonosDevice records concurrently over a number of
+    rounds.
+
+    All probes in a round run at the same time, using up to 'max_threads'
+    threads, so that a round takes about as long as the slowest device.
+
+    Returns:
+        list: A HealthReport for each device, in the order supplied.
+    """
+    results = {
+        device.ip_address: {
+            "firmware": None,
+            "latencies": {PROBE_STATUS: [], PROBE_SOAP: []},
+            "errors": {PROBE_STATUS: 0, PROBE_SOAP: 0},
+        }
+        for device in devices
+    }
+    probes = [
+        (device.ip_address, probe)
+        for device in devices
+        for probe in [PROBE_STATUS, PROBE_SOAP]
+    ]
+    if not probes:
+        return []
+
+    def run_probe(ip_address, probe):
+        try:
+            if probe == PROBE_STATUS:
+                return probe_status(ip_address, timeout)
+            return probe_soap(ip_address, timeout), None
+        except Exception as e:
+            logging.info(
+                "Health probe '{}' failed for {}: {}".format(probe, ip_address, e)
+            )
+            return None, None
+
+    max_workers = max(1, min(max_threads, len(probes)))
+    logging.info(
+        "Probing {} device(s) for {} round(s) using {} thread(s)".format(
+            len(devices), rounds, max_workers
+        )
+    )
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for index in range(rounds):
+            futures = [
+                (ip_address, probe, executor.submit(run_probe, ip_address, probe))
+                for ip_address, probe in probes
+            ]
+            for ip_address, probe, future in futures:
+                latency, firmware = future.result()
+                result = results[ip_address]
+                if latency is None:
+                    result["errors"][probe] += 1
+                else:
+                    result["latencies"][probe].append(latency)
+                if firmware is not None:
+                    result["firmware"] = firmware
+            logging.info("Completed health probe round {}".format(index + 1))
+
+    reports = []
+    for device in devices:
+        result = results[device.ip_address]
+        reports.append(
+            HealthReport(
+                device,
+                result["firmware"] or device.display_version,
+                result["latencies"][PROBE_STATUS],
+                result["errors"][PROBE_STATUS],
+                result["latencies"][PROBE_SOAP],
+                result["errors"][PROBE_SOAP],
+            )
+        )
+    return reports
+
+
+def _summary(latencies, errors):
+    attempts = len(latencies) + errors
+    return {
+        "p50_ms": _milliseconds(percentile(latencies, 0.5)),
+        "p95_ms": _milliseconds(percentile(latencies, 0.95)),
+        "max_ms": _milliseconds(max(latencies) if latencies else None),
+        "errors": errors,
+        "error_rate": round(errors / attempts, 3) if attempts else None,
+    }
+
+
+def _milliseconds(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def health_summary(reports):
+    """Return a list of dicts summarising a list of HealthReports, suitable
+    for output as JSON."""
+    return [
+        {
+            "speaker_name": report.device.speaker_name,
+            "ip_address": report.device.ip_address,
+            "household_id": report.device.household_id,
+            "model_name": report.device.model_name,
+            "firmware": report.firmware,
+            PROBE_STATUS: _summary(report.status_latencies, report.status_errors),
+            PROBE_SOAP: _summary(report.soap_latencies, report.soap_errors),
+        }
+        for report in reports
+    ]
+
+
+def print_health_json(reports):
+    print(json.dumps(health_summary(reports), indent=2))
+
+
+def print_health_table(reports):
+    def latency(value):
+        return "-" if value is None else "{:.0f}".format(value)
+
+    rows = []
+    for report, summary in zip(reports, health_summary(reports)):
+        status = summary[PROBE_STATUS]
+        soap = summary[PROBE_SOAP]
+        attempts = (
+            len(report.status_latencies)
+            + report.status_errors
+            + len(report.soap_latencies)
+            + report.soap_errors
+        )
+        rows.append(
+            (
+                summary["speaker_name"],
+                summary["ip_address"],
+                summary["model_name"].replace("Sonos ", ""),
+                summary["firmware"],
+                latency(status["p50_ms"]),
+                latency(status["p95_ms"]),
+                latency(soap["p50_ms"]),
+                latency(soap["p95_ms"]),
+                "{}/{}".format(status["errors"] + soap["errors"], attempts),
+            )
+        )
+    headers = [
+        "Room/Zone Name",
+        "IP Address",
+        "Device Model",
+        "Firmware",
+        "HTTP p50 (ms)",
+        "HTTP p95 (ms)",
+        "SOAP p50 (ms)",
+        "SOAP p95 (ms)",
+        "Errors",
+    ]
+    print()
+    print(
+        tabulate.tabulate(
+            sorted(rows), headers, numalign="right", disable_numparse=True
+        )
+    )
+    print()
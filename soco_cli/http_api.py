@@ -24,12 +24,15 @@ from soco_cli.api import get_all_speaker_names
 from soco_cli.api import get_soco_object as get_speaker
 from soco_cli.api import rescan_speakers
 from soco_cli.api import run_command as sc_run
+from soco_cli.api import run_command_result as sc_run_result
 from soco_cli.play_local_file import is_supported_type
+from soco_cli.speaker_metadata import cached_player_name
 from soco_cli.speakers import Speakers
 from soco_cli.utils import version as print_version
 
 # Globals
 USE_LOCAL = False
+STRUCTURED = False
 PORT = 8000
 INFO = "SoCo-CLI HTTP API Server v" + version
 PREFIX = "SoCo-CLI: "
@@ -101,11 +104,14 @@ def command_core(
 ) -> Dict:
     device, error_msg = get_speaker(speaker, use_local_speaker_list=use_local)
     if device:
-        speaker = device.player_name
+        speaker = cached_player_name(device)
         if not action.startswith(ASYNC_PREFIX):
-            exit_code, result, error_msg = sc_run(
+            run = sc_run_result if STRUCTURED else sc_run
+            exit_code, result, error_msg = run(
                 device, action, *args, use_local_speaker_list=use_local
             )
+            if result is None:
+                result = ""
         else:
             action = action.replace(ASYNC_PREFIX, "")
             try:
@@ -517,6 +523,16 @@ def args_processor() -> None:
         type=str,
         help="Only with '-l': specify the networks or IP addresses to search",
     )
+    parser.add_argument(
+        "--structured-results",
+        "-s",
+        action="store_true",
+        default=False,
+        help=(
+            "Return JSON values instead of text as the 'result' of actions that"
+            " support them"
+        ),
+    )
 
     args = parser.parse_args()
 
@@ -537,6 +553,9 @@ def args_processor() -> None:
     if not USE_LOCAL and args.subnets is not None:
         print(PREFIX + "Option '--subnets' ignored; only valid with local cache")
 
+    global STRUCTURED
+    STRUCTURED = args.structured_results
+
     global MACRO_FILE
     MACRO_FILE = abspath(args.macros)
 
@@ -1,6 +1,7 @@
 """Matches a supplied speaker name to a stored name."""
 
 import logging
+from bisect import bisect_left
 
 
 def speaker_name_matches(name_supplied, name_stored):
@@ -62,3 +63,92 @@ def speaker_name_matches(name_supplied, name_stored):
 
     # Not found
     return False, False
+
+
+def normalise_speaker_name(name):
+    """Lower-case a speaker name and normalise its apostrophes."""
+    return name.lower().replace("’", "'")
+
+
+class SpeakerNameIndex:
+    """An index of speaker names, matched using the same rules as
+    speaker_name_matches(), but without comparing the supplied name
+    against every stored name.
+
+    Exact, case-insensitive and apostrophe-normalised names are held in
+    dicts. Partial matches use a sorted list of the suffixes of every
+    normalised name: the names that contain the supplied name are those
+    with a suffix that starts with it.
+    """
+
+    def __init__(self, entries, source=None):
+        """Build the index.
+
+        Args:
+            entries: An iterable of (speaker_name, item) pairs.
+            source: The collection the entries were built from, used
+                to check whether the index is still current.
+        """
+        self._entries = list(entries)
+        self._source = source
+        self._source_size = None if source is None else len(source)
+        self._exact = {}
+        self._case_insensitive = {}
+        self._normalised = {}
+        self._suffixes = []
+        for position, (name, _) in enumerate(self._entries):
+            self._exact.setdefault(name, position)
+            self._case_insensitive.setdefault(name.lower(), position)
+            normalised = normalise_speaker_name(name)
+            self._normalised.setdefault(normalised, position)
+            for start in range(len(normalised)):
+                self._suffixes.append((normalised[start:], position))
+        self._suffixes.sort()
+
+    def indexes(self, source):
+        """Check whether the index was built from this collection, in its
+        current state. Changes that don't alter the size of the collection
+        are not detected, and require a new index to be built."""
+        return self._source is source and self._source_size == len(source)
+
+    def match(self, name):
+        """Find the entries matching a speaker name.
+
+        Returns:
+            list, bool: The matching (speaker_name, item) entries, in the
+                order supplied, and whether the match is exact. An exact
+                match returns a single entry.
+        """
+        for names, key, match_type in [
+            (self._exact, name, "exact"),
+            (self._case_insensitive, name.lower(), "case-insensitive exact"),
+            (
+                self._normalised,
+                normalise_speaker_name(name),
+                "apostrophe-normalised exact",
+            ),
+        ]:
+            position = names.get(key)
+            if position is not None:
+                logging.info(
+                    "Found {} speaker name match for '{}' as '{}'".format(
+                        match_type, name, self._entries[position][0]
+                    )
+                )
+                return [self._entries[position]], True
+
+        key = normalise_speaker_name(name)
+        positions = set()
+        for index in range(bisect_left(self._suffixes, (key,)), len(self._suffixes)):
+            suffix, position = self._suffixes[index]
+            if not suffix.startswith(key):
+                break
+            positions.add(position)
+        matches = [self._entries[position] for position in sorted(positions)]
+        if matches:
+            logging.info(
+                "Found partial speaker name match(es) for '{}' as {}".format(
+                    name, [speaker_name for speaker_name, _ in matches]
+                )
+            )
+        return matches, False
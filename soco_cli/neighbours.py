@@ -0,0 +1,133 @@
+"""Uses the kernel's neighbour (ARP) table to prioritise network scans.
+
+Hosts in the neighbour table are known to exist, and those whose MAC
+address has a Sonos OUI are very likely to be Sonos players, so probing
+them first usually finds the Sonos system after a handful of probes.
+The neighbour table is only available on Linux; elsewhere, scans proceed
+in address order.
+"""
+
+import ipaddress
+import logging
+import subprocess
+
+PROC_NET_ARP = "/proc/net/arp"
+
+# MAC address prefixes (OUIs) registered to Sonos, Inc.
+SONOS_OUIS = {
+    "00:0e:58",
+    "34:7e:5c",
+    "38:42:0b",
+    "48:a6:b8",
+    "54:2a:1b",
+    "5c:aa:fd",
+    "74:ca:60",
+    "78:28:ca",
+    "94:9f:3e",
+    "b8:e9:37",
+    "c4:38:75",
+    "f0:f6:c1",
+}
+
+# 'ip neigh' states for which the MAC address is not known to be valid
+INVALID_NEIGHBOUR_STATES = {"FAILED", "INCOMPLETE", "NOARP"}
+
+
+def _valid_mac(mac):
+    return len(mac) == 17 and mac != "00:00:00:00:00:00"
+
+
+def parse_proc_net_arp(text):
+    """Parse the contents of /proc/net/arp into a dict of IPv4 address to
+    lower case MAC address, omitting incomplete entries."""
+    neighbours = {}
+    for line in text.splitlines()[1:]:
+        fields = line.split()
+        if len(fields) < 4:
+            continue
+        ip_address, flags, mac = fields[0], fields[2], fields[3].lower()
+        # ATF_COM (0x2) is set for completed entries
+        if int(flags, 16) & 0x2 and _valid_mac(mac):
+            neighbours[ip_address] = mac
+    return neighbours
+
+
+def parse_ip_neigh(text):
+    """Parse the output of 'ip -4 neigh show' into a dict of IPv4 address
+    to lower case MAC address, omitting failed and incomplete entries."""
+    neighbours = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if "lladdr" not in fields or fields[-1] in INVALID_NEIGHBOUR_STATES:
+            continue
+        mac = fields[fields.index("lladdr") + 1].lower()
+        if _valid_mac(mac):
+            neighbours[fields[0]] = mac
+    return neighbours
+
+
+def read_neighbour_table():
+    """Return the kernel's IPv4 neighbour table as a dict of IP address to
+    MAC address. Returns an empty dict if the table can't be read."""
+    try:
+        with open(PROC_NET_ARP, "r") as f:
+            neighbours = parse_proc_net_arp(f.read())
+        logging.info(
+            "Read {} neighbour(s) from {}".format(len(neighbours), PROC_NET_ARP)
+        )
+        return neighbours
+    except OSError as e:
+        logging.info("Can't read {}: {}".format(PROC_NET_ARP, e))
+    try:
+        output = subprocess.run(
+            ["ip", "-4", "neigh", "show"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            timeout=2.0,
+            check=True,
+        ).stdout.decode("utf-8", errors="replace")
+        neighbours = parse_ip_neigh(output)
+        logging.info("Read {} neighbour(s) using 'ip neigh'".format(len(neighbours)))
+        return neighbours
+    except (OSError, subprocess.SubprocessError) as e:
+        logging.info("Can't run 'ip neigh': {}".format(e))
+    return {}
+
+
+def is_sonos_mac(mac):
+    """Check whether a MAC address has a Sonos OUI."""
+    return mac.lower()[:8] in SONOS_OUIS
+
+
+def order_by_neighbours(ip_addresses, neighbours=None):
+    """Split a list of IP addresses into those to probe first and the rest.
+
+    Addresses in the neighbour table with a Sonos OUI come first, followed
+    by the other addresses in the neighbour table, each in address order.
+
+    Returns:
+        list, list: The addresses to probe first, and the remaining
+            addresses, in their original order.
+    """
+    if neighbours is None:
+        neighbours = read_neighbour_table()
+    candidates = set(ip_addresses)
+    sonos = []
+    alive = []
+    for ip_address, mac in neighbours.items():
+        if ip_address not in candidates:
+            continue
+        if is_sonos_mac(mac):
+            sonos.append(ip_address)
+        else:
+            alive.append(ip_address)
+    sonos.sort(key=ipaddress.IPv4Address)
+    alive.sort(key=ipaddress.IPv4Address)
+    logging.info(
+        "Probing {} Sonos and {} other neighbour(s) first".format(
+            len(sonos), len(alive)
+        )
+    )
+    first = sonos + alive
+    probed = set(first)
+    return first, [ip for ip in ip_addresses if ip not in probed]
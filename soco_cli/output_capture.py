@@ -0,0 +1,151 @@
+"""Captures the output written to stdout and stderr by each thread or
+asyncio task, and the structured results of commands.
+
+While capturing, sys.stdout and sys.stderr are replaced by router streams.
+Output written from a context that is capturing goes to that context's
+buffers; output from any other context goes to the original stream. This
+allows commands to be run concurrently, each with its own captured output.
+
+Action handlers report their results using emit_result(). The result is
+rendered as text, unless the caller has asked for the structured value
+using capture_result().
+
+Capture is context-local where the 'contextvars' module is available
+(Python 3.7+), and thread-local otherwise (see context_local.py).
+"""
+
+import sys
+import threading
+from contextlib import contextmanager
+from io import StringIO
+
+from soco_cli.context_local import ContextLocal
+
+STDOUT = "stdout"
+STDERR = "stderr"
+
+_install_lock = threading.Lock()
+
+_buffers = ContextLocal("soco_cli_output_buffers")
+_result = ContextLocal("soco_cli_result")
+
+
+class _Router:
+    """A stream that writes to the current context's capture buffer, or to
+    the stream it replaced."""
+
+    def __init__(self, name, stream):
+        self._name = name
+        self._stream = stream
+
+    def _target(self):
+        buffers = _buffers.get()
+        if buffers is None:
+            return self._stream
+        return buffers[self._name]
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+
+def install():
+    """Replace sys.stdout and sys.stderr with router streams, if they
+    haven't already been replaced."""
+    with _install_lock:
+        if not isinstance(sys.stdout, _Router):
+            sys.stdout = _Router(STDOUT, sys.stdout)
+        if not isinstance(sys.stderr, _Router):
+            sys.stderr = _Router(STDERR, sys.stderr)
+
+
+@contextmanager
+def capture_output():
+    """Capture the output written to stdout and stderr by the current
+    thread or task, for the duration of the context.
+
+    Yields:
+        StringIO, StringIO: The captured stdout and stderr.
+    """
+    install()
+    previous = _buffers.get()
+    buffers = {STDOUT: StringIO(), STDERR: StringIO()}
+    _buffers.set(buffers)
+    try:
+        yield buffers[STDOUT], buffers[STDERR]
+    finally:
+        _buffers.set(previous)
+
+
+def release_output():
+    """Stop capturing output in the current thread or task, so that it is
+    written to the original streams, e.g. when user interaction is
+    required. Capture resumes when the enclosing capture_output() context
+    exits."""
+    _buffers.set(None)
+
+
+class CapturedResult:
+    """The structured result emitted by a command."""
+
+    def __init__(self):
+        self._value = None
+        self._emitted = False
+
+    @property
+    def value(self):
+        return self._value
+
+    @property
+    def emitted(self):
+        """Whether the command emitted a structured result."""
+        return self._emitted
+
+    def set(self, value):
+        self._value = value
+        self._emitted = True
+
+
+@contextmanager
+def capture_result(structured=True):
+    """Capture the structured result emitted by a command in the current
+    thread or task, instead of rendering it as text.
+
+    If 'structured' is False, results are rendered as text, even if an
+    enclosing context is capturing structured results.
+
+    Yields:
+        CapturedResult: The captured result, or None if 'structured' is
+            False.
+    """
+    previous = _result.get()
+    result = CapturedResult() if structured else None
+    _result.set(result)
+    try:
+        yield result
+    finally:
+        _result.set(previous)
+
+
+def result_requested():
+    """Whether the structured result of the current command is being
+    captured."""
+    return _result.get() is not None
+
+
+def emit_result(value, render=None):
+    """Emit the result of a command.
+
+    If the structured result is being captured, 'value' is recorded as the
+    result. Otherwise, 'render(value)' is called to print it as text.
+    """
+    result = _result.get()
+    if result is not None:
+        result.set(value)
+    elif render is not None:
+        render(value)
@@ -12,6 +12,7 @@ from typing import List
 from soco import SoCo  # type: ignore
 
 from soco_cli.m3u_parser import parse_m3u
+from soco_cli.output_capture import release_output
 from soco_cli.play_local_file import is_supported_type, play_local_file
 from soco_cli.utils import error_report
 
@@ -74,8 +75,8 @@ def play_file_list(speaker: SoCo, tracks: List[str], options: str = "") -> bool:
         return False
 
     if options != "":
-        # Grab back stdout from api.run_command()
-        sys.stdout = sys.__stdout__
+        # Release stdout from api.run_command()
+        release_output()
 
     if "r" in options:
         # Choose a single random track
@@ -0,0 +1,171 @@
+"""Reads speaker properties concurrently.
+
+Each property is read either directly from the speaker, or from a source:
+a single service call whose response covers several properties, such as
+the transport info or the current track info. Each source is read only
+once, however many of its properties are requested, and all the reads run
+at the same time, so that reading many properties costs about one round
+trip.
+"""
+
+import logging
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from soco.core import MUSIC_SRC_LINE_IN, MUSIC_SRC_RADIO, MUSIC_SRC_TV  # type: ignore
+
+from soco_cli.speaker_metadata import cached_is_visible, cached_player_name
+
+PROPERTY_THREADS = 16
+
+# 'read' is applied to the speaker if 'source' is None, otherwise to the
+# value read from the source. Properties 'from_coordinator' are read from
+# the speaker's group coordinator.
+Property = namedtuple("Property", ["source", "read", "from_coordinator"], rename=False)
+
+SOURCES = {
+    "speaker_info": lambda speaker: speaker.get_speaker_info(),
+    "track_info": lambda speaker: speaker.get_current_track_info(),
+    "transport_info": lambda speaker: speaker.get_current_transport_info(),
+    "music_source": lambda speaker: speaker.music_source,
+}
+
+
+def _attribute(name, from_coordinator=False):
+    return Property(None, lambda speaker: getattr(speaker, name), from_coordinator)
+
+
+def _field(source, key, from_coordinator=False):
+    return Property(source, lambda value: value[key], from_coordinator)
+
+
+def _music_source_is(music_source):
+    return Property("music_source", lambda value: value == music_source, False)
+
+
+PROPERTIES = {
+    # Rendering control
+    "volume": _attribute("volume"),
+    "mute": _attribute("mute"),
+    "bass": _attribute("bass"),
+    "treble": _attribute("treble"),
+    "loudness": _attribute("loudness"),
+    "balance": _attribute("balance"),
+    "night_mode": _attribute("night_mode"),
+    "dialog_mode": _attribute("dialog_mode"),
+    "sub_gain": _attribute("sub_gain"),
+    # Device
+    "player_name": Property(None, cached_player_name, False),
+    "ip_address": _attribute("ip_address"),
+    "uid": _attribute("uid"),
+    "household_id": _attribute("household_id"),
+    "status_light": _attribute("status_light"),
+    "is_soundbar": _attribute("is_soundbar"),
+    "is_visible": Property(None, cached_is_visible, False),
+    "model_name": _field("speaker_info", "model_name"),
+    "model_number": _field("speaker_info", "model_number"),
+    "software_version": _field("speaker_info", "software_version"),
+    "hardware_version": _field("speaker_info", "hardware_version"),
+    "display_version": _field("speaker_info", "display_version"),
+    "serial_number": _field("speaker_info", "serial_number"),
+    "mac_address": _field("speaker_info", "mac_address"),
+    # Grouping
+    "is_coordinator": _attribute("is_coordinator"),
+    "grouped_or_paired": Property(
+        None, lambda speaker: len(speaker.group.members) > 1, False
+    ),
+    # Playback
+    "state": _field("transport_info", "current_transport_state", True),
+    "cross_fade": _attribute("cross_fade", True),
+    "title": _field("track_info", "title"),
+    "artist": _field("track_info", "artist"),
+    "album": _field("track_info", "album"),
+    "duration": _field("track_info", "duration"),
+    "position": _field("track_info", "position"),
+    "playlist_position": _field("track_info", "playlist_position"),
+    "music_source": Property("music_source", lambda value: value, False),
+    "is_playing_line_in": _music_source_is(MUSIC_SRC_LINE_IN),
+    "is_playing_radio": _music_source_is(MUSIC_SRC_RADIO),
+    "is_playing_tv": _music_source_is(MUSIC_SRC_TV),
+}
+
+# The properties added to the speaker info by the 'info' action
+INFO_PROPERTIES = [
+    "volume",
+    "mute",
+    "title",
+    "player_name",
+    "ip_address",
+    "household_id",
+    "status_light",
+    "is_coordinator",
+    "grouped_or_paired",
+    "loudness",
+    "treble",
+    "bass",
+    "cross_fade",
+    "state",
+    "balance",
+    "night_mode",
+    "is_soundbar",
+    "is_playing_line_in",
+    "is_playing_radio",
+    "is_playing_tv",
+    "is_visible",
+    "sub_gain",
+]
+
+
+def read_properties(speaker, names, max_threads=PROPERTY_THREADS):
+    """Read a list of speaker properties concurrently.
+
+    Args:
+        speaker (SoCo): The speaker.
+        names (list): The property names, each a key of PROPERTIES.
+        max_threads (int): The maximum number of concurrent reads.
+
+    Returns:
+        OrderedDict: The property values, in the order requested.
+
+    Raises:
+        The exception raised by the first failing read, in the order
+        requested.
+    """
+    properties = [(name, PROPERTIES[name]) for name in names]
+    if not properties:
+        return OrderedDict()
+
+    coordinator = speaker
+    if any(prop.from_coordinator for _, prop in properties):
+        if not speaker.is_coordinator:
+            coordinator = speaker.group.coordinator
+
+    # Properties read from the same source share a call
+    calls = OrderedDict()
+    for name, prop in properties:
+        target = coordinator if prop.from_coordinator else speaker
+        if prop.source is None:
+            calls[name] = partial(prop.read, target)
+        else:
+            key = (prop.source, prop.from_coordinator)
+            if key not in calls:
+                calls[key] = partial(SOURCES[prop.source], target)
+
+    logging.info(
+        "Reading {} properties using {} concurrent calls".format(
+            len(properties), len(calls)
+        )
+    )
+    with ThreadPoolExecutor(max_workers=min(max_threads, len(calls))) as executor:
+        futures = {key: executor.submit(call) for key, call in calls.items()}
+
+    values = OrderedDict()
+    for name, prop in properties:
+        if prop.source is None:
+            values[name] = futures[name].result()
+        else:
+            values[name] = prop.read(
+                futures[(prop.source, prop.from_coordinator)].result()
+            )
+    return values
@@ -0,0 +1,138 @@
+"""Caches speaker reads for the duration of a command sequence.
+
+Some values are read from a speaker repeatedly while a sequence of actions
+runs, e.g., the queue size when adding several items to the queue, or the
+group coordinator before each action that operates on the coordinator.
+Within a read cache scope, each value is read from the speaker once, and
+then reused until it's invalidated.
+
+Values are invalidated by writes: actions that may change the state of the
+system clear the cache when they complete, and action handlers that write
+and then re-read a value within the same action invalidate it explicitly.
+Values that change over time, such as the current track info, are only
+cached for the duration of a single action.
+
+The cache is local to the current thread or asyncio task. Outside a read
+cache scope, every read goes to the speaker.
+"""
+
+import logging
+from contextlib import contextmanager
+
+from soco_cli.context_local import ContextLocal
+
+_cache = ContextLocal("soco_cli_read_cache")
+
+
+class ReadCache:
+    """Values read from speakers, keyed by IP address and value name."""
+
+    def __init__(self):
+        self._values = {}
+        self._per_action = set()
+
+    def read(self, speaker, name, read, per_action=False):
+        key = (speaker.ip_address, name)
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        value = read()
+        self._values[key] = value
+        if per_action:
+            self._per_action.add(key)
+        return value
+
+    def invalidate(self, speaker=None, name=None):
+        """Forget the cached values for a speaker, or for all speakers, with
+        a given name, or with any name."""
+        for key in list(self._values):
+            if (speaker is None or key[0] == speaker.ip_address) and (
+                name is None or key[1] == name
+            ):
+                del self._values[key]
+                self._per_action.discard(key)
+
+    def end_action(self, read_only):
+        """Called when an action completes. Values cached only for the
+        action are forgotten, and if the action may have changed the state
+        of the system, so are all other values."""
+        if not read_only:
+            logging.info("Clearing the read cache after a write")
+            self._values.clear()
+            self._per_action.clear()
+            return
+        for key in self._per_action:
+            self._values.pop(key, None)
+        self._per_action.clear()
+
+
+def use_read_cache():
+    """Start caching reads in the current thread or task, if not already
+    doing so, until stop_read_cache() is called.
+
+    Returns:
+        ReadCache: The cache in use.
+    """
+    cache = _cache.get()
+    if cache is None:
+        cache = ReadCache()
+        _cache.set(cache)
+    return cache
+
+
+def stop_read_cache():
+    _cache.set(None)
+
+
+@contextmanager
+def read_cache_scope():
+    """Cache reads in the current thread or task for the duration of the
+    context. If a scope is already active, it's used instead.
+
+    Yields:
+        ReadCache: The cache in use.
+    """
+    if _cache.get() is not None:
+        yield _cache.get()
+        return
+    cache = use_read_cache()
+    try:
+        yield cache
+    finally:
+        stop_read_cache()
+
+
+def cached_read(speaker, name, read, per_action=False):
+    """Return the cached value of 'name' for the speaker, calling 'read()'
+    to read it if it's not cached, or if no read cache scope is active."""
+    cache = _cache.get()
+    if cache is None:
+        return read()
+    return cache.read(speaker, name, read, per_action)
+
+
+def invalidate_reads(speaker=None, name=None):
+    """Forget cached values: see ReadCache.invalidate()."""
+    cache = _cache.get()
+    if cache is not None:
+        cache.invalidate(speaker, name)
+
+
+def queue_size(speaker):
+    return cached_read(speaker, "queue_size", lambda: speaker.queue_size)
+
+
+def current_track_info(speaker):
+    return cached_read(
+        speaker, "track_info", speaker.get_current_track_info, per_action=True
+    )
+
+
+def group_coordinator(speaker):
+    """The coordinator of the speaker's group, which may be the speaker."""
+    return cached_read(
+        speaker,
+        "coordinator",
+        lambda: speaker if speaker.is_coordinator else speaker.group.coordinator,
+    )
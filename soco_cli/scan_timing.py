@@ -0,0 +1,128 @@
+"""Learns network round trip times for adaptive scan timeouts.
+
+A smoothed RTT and RTT variance are kept for each /24 subnet, updated from
+every connection attempt that gets a response (accepted or refused), in
+the same way as TCP's retransmission timer. The estimates are saved between
+runs, alongside the speaker caches, so that each scan starts with the
+timeouts learned by the previous one.
+"""
+
+import ipaddress
+import logging
+import os
+import pickle
+import socket
+import threading
+import time
+
+from soco_cli.discovery_cache import SONOS_PORT, write_pickle_atomically
+
+# Timeout used for a subnet with no RTT estimate
+DEFAULT_FIRST_TIMEOUT = 0.25
+MIN_TIMEOUT = 0.02
+SUBNET_PREFIX = 24
+
+
+class ScanTimings:
+    """Per-subnet RTT estimates, and the timeouts derived from them."""
+
+    def __init__(self, save_directory=None, save_file=None):
+        self._save_directory = (
+            save_directory
+            if save_directory
+            else os.path.expanduser("~") + "/.soco-cli/"
+        )
+        self._save_file = save_file if save_file else "scan_timing.pickle"
+        # Maps subnet to (smoothed RTT, RTT variance)
+        self._estimates = {}
+        self._lock = threading.Lock()
+
+    @property
+    def save_pathname(self):
+        return self._save_directory + self._save_file
+
+    @property
+    def estimates(self):
+        return dict(self._estimates)
+
+    def load(self):
+        """Load the saved estimates, if any. Returns True if loaded."""
+        try:
+            with open(self.save_pathname, "rb") as f:
+                estimates = pickle.load(f)
+        except Exception as e:
+            logging.info("No scan timings loaded: {}".format(e))
+            return False
+        if not isinstance(estimates, dict):
+            return False
+        self._estimates = estimates
+        logging.info("Loaded scan timings: {}".format(self._estimates))
+        return True
+
+    def save(self):
+        if not self._estimates:
+            return False
+        try:
+            write_pickle_atomically(
+                self._estimates, self._save_directory, self.save_pathname
+            )
+        except Exception as e:
+            logging.info("Failed to save scan timings: {}".format(e))
+            return False
+        logging.info("Saved scan timings: {}".format(self._estimates))
+        return True
+
+    @staticmethod
+    def subnet(ip_address):
+        return str(
+            ipaddress.IPv4Network(
+                "{}/{}".format(ip_address, SUBNET_PREFIX), strict=False
+            )
+        )
+
+    def record(self, ip_address, rtt):
+        """Update the estimates for the subnet of 'ip_address' with a
+        measured round trip time."""
+        subnet = self.subnet(ip_address)
+        with self._lock:
+            estimate = self._estimates.get(subnet)
+            if estimate is None:
+                self._estimates[subnet] = (rtt, rtt / 2)
+            else:
+                srtt, rttvar = estimate
+                rttvar = 0.75 * rttvar + 0.25 * abs(srtt - rtt)
+                srtt = 0.875 * srtt + 0.125 * rtt
+                self._estimates[subnet] = (srtt, rttvar)
+
+    def timeout(self, ip_address, max_timeout):
+        """The timeout to use for a first attempt to connect to
+        'ip_address', no greater than 'max_timeout'."""
+        estimate = self._estimates.get(self.subnet(ip_address))
+        if estimate is None:
+            timeout = DEFAULT_FIRST_TIMEOUT
+        else:
+            srtt, rttvar = estimate
+            timeout = srtt + 4 * rttvar
+        return min(max(timeout, MIN_TIMEOUT), max_timeout)
+
+
+def timed_probe(ip_address, port=SONOS_PORT, timeout=0.1):
+    """Attempt a TCP connection to ip_address:port.
+
+    Returns:
+        bool, float: Whether the port is open, or None if the attempt timed
+            out; and the round trip time, or None if there was no response.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        start = time.time()
+        try:
+            sock.connect((ip_address, port))
+            return True, time.time() - start
+        except socket.timeout:
+            return None, None
+        except ConnectionRefusedError:
+            # The host responded, so the RTT is still useful
+            return False, time.time() - start
+        except OSError:
+            return False, None
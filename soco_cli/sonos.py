@@ -2,20 +2,20 @@
 
 import argparse
 import logging
-import pprint
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from os import environ as env
 from signal import SIGINT, SIGTERM, signal
 
-from soco_cli.action_processor import list_actions
+from soco_cli.action_processor import list_actions, speaker_parameters
 from soco_cli.aliases import AliasManager
 from soco_cli.api import get_all_speakers, run_command
 from soco_cli.check_for_update import print_update_status
-from soco_cli.cmd_parser import CLIParser
-from soco_cli.interactive import interactive_loop
+from soco_cli.cmd_parser import CLIParser, ParallelBlock, group_parallel_blocks
+from soco_cli.read_cache import invalidate_reads, use_read_cache
+from soco_cli.speaker_metadata import cached_is_visible, cached_player_name
 from soco_cli.speakers import Speakers
-from soco_cli.track_follow import track_follow
 from soco_cli.utils import (
     RewindableList,
     check_args,
@@ -30,13 +30,13 @@ from soco_cli.utils import (
     seconds_until,
     set_speaker_list,
     sig_handler,
+    speaker_cache,
     version,
 )
 
 from .wait_actions import process_wait
 
 # Globals
-pp = pprint.PrettyPrinter(width=100)
 
 
 # Speaker name environment variable
@@ -45,8 +45,192 @@ ENV_SPKR = "SPKR"
 # Local speaker cache environment variable
 ENV_LOCAL = "USE_LOCAL_CACHE"
 
+# Sequence actions during which time passes
+LOOP_AND_WAIT_ACTIONS = [
+    "loop",
+    "loop_for",
+    "loop_until",
+    "loop_to_start",
+    "wait",
+    "wait_for",
+    "wait_until",
+]
+
+# Maximum number of speakers on which an '_all_' action is run at once
+ALL_SPEAKERS_THREADS = 16
+
+# Maximum number of sequences in a parallel block that are run at once
+PARALLEL_THREADS = 16
+
+# The options the speaker cache was created with. Commands run in the
+# daemon inherit its cache, which is only reused if their options match.
+SPEAKER_CACHE_OPTIONS = None
+
+
+def run_on_all_speakers(speakers, action, args, use_local_speaker_list):
+    """Run an action on all visible speakers concurrently, using up to
+    ALL_SPEAKERS_THREADS threads.
+
+    Yields:
+        str, (int, str, str): The name of each visible speaker, in name order,
+            and the result of running the action on it, as soon as it and the
+            results for all preceding speakers are available.
+    """
+    speakers = sorted(
+        speakers, key=lambda speaker: (cached_player_name(speaker), speaker.ip_address)
+    )
+    if not speakers:
+        return
+
+    def run(speaker):
+        if not cached_is_visible(speaker):
+            return None
+        logging.info(
+            "Performing action '{}' on speaker '{}'".format(
+                action, cached_player_name(speaker)
+            )
+        )
+        return run_command(
+            speaker, action, *args, use_local_speaker_list=use_local_speaker_list
+        )
+
+    executor = ThreadPoolExecutor(max_workers=min(ALL_SPEAKERS_THREADS, len(speakers)))
+    futures = [(speaker, executor.submit(run, speaker)) for speaker in speakers]
+    try:
+        for speaker, future in futures:
+            result = future.result()
+            if result is not None:
+                yield cached_player_name(speaker), result
+    finally:
+        for _, future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def sequence_speakers(sequences, env_speaker=None):
+    """Collect the names of the speakers used by a list of command sequences,
+    including speakers named in action parameters. Names given to speakers
+    by a 'rename' action are excluded, because those speakers can't be
+    found by name until the action has run.
+
+    Args:
+        sequences (list): The command sequences, with parallel blocks
+            grouped.
+        env_speaker (str): The speaker name from the 'SPKR' environment
+            variable, if set; it's the speaker for every sequence.
+
+    Returns:
+        list: The speaker names, in order of first use, without repeats.
+    """
+    names = []
+    new_names = set()
+
+    def add(name):
+        if name not in names:
+            names.append(name)
+
+    def collect(sequences):
+        for sequence in sequences:
+            if isinstance(sequence, ParallelBlock):
+                collect(sequence)
+                continue
+            if not sequence or sequence[0].lower() in LOOP_AND_WAIT_ACTIONS:
+                continue
+            if env_speaker:
+                sequence = [env_speaker] + sequence
+            if len(sequence) < 2:
+                continue
+            action = sequence[1].lower()
+            if action == "rename" and len(sequence) > 2:
+                new_names.add(sequence[2].lower())
+            if sequence[0].lower() != "_all_":
+                add(sequence[0])
+            for name in speaker_parameters(action, sequence[2:]):
+                add(name)
+
+    collect(sequences)
+    return [name for name in names if name.lower() not in new_names]
+
+
+def resolve_speakers(names, use_local_speaker_list):
+    """Look up a list of speakers, one at a time. Discovery is only performed
+    for the first name not found in the speaker cache, after which the
+    remaining names are found in the cache.
+
+    Returns:
+        dict, list: The speakers found, keyed by name, and the names of the
+            speakers not found.
+    """
+    speakers = {}
+    not_found = []
+    for name in names:
+        speaker = get_speaker(name, use_local_speaker_list)
+        if speaker:
+            speakers[name] = speaker
+        else:
+            not_found.append(name)
+    return speakers, not_found
+
+
+def run_parallel_block(block, use_local_speaker_list, speakers=None):
+    """Run the command sequences in a parallel block concurrently, using up
+    to PARALLEL_THREADS threads. Speakers not in 'speakers' (a dict of
+    speakers keyed by name) are looked up first, one at a time.
+
+    Yields:
+        (int, str, str): The result of each command sequence, in block
+            order, as soon as it and the results for all preceding sequences
+            are available.
+    """
+    speakers = speakers or {}
+    block_speakers = []
+    for sequence in block:
+        speaker = None
+        if len(sequence) >= 2:
+            speaker = speakers.get(sequence[0]) or get_speaker(
+                sequence[0], use_local_speaker_list
+            )
+        block_speakers.append(speaker)
+
+    def run(sequence, speaker):
+        if len(sequence) < 2:
+            return (
+                1,
+                "",
+                "Error: At least 2 parameters required in action sequence '{}';"
+                " did you supply a speaker name?".format(sequence),
+            )
+        if not speaker:
+            return 1, "", "Error: Speaker '{}' not found".format(sequence[0])
+        logging.info(
+            "Performing action '{}' on speaker '{}' in parallel block".format(
+                sequence[1], sequence[0]
+            )
+        )
+        return run_command(
+            speaker,
+            sequence[1].lower(),
+            *sequence[2:],
+            use_local_speaker_list=use_local_speaker_list,
+        )
+
+    executor = ThreadPoolExecutor(max_workers=min(PARALLEL_THREADS, len(block)))
+    futures = [
+        executor.submit(run, sequence, speaker)
+        for sequence, speaker in zip(block, block_speakers)
+    ]
+    try:
+        for future in futures:
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
 
 def main():
+    global SPEAKER_CACHE_OPTIONS
+
     # Create the argument parser
     parser = argparse.ArgumentParser(
         prog="sonos",
@@ -72,6 +256,25 @@ def main():
         default=False,
         help="Refresh the local speaker list",
     )
+    parser.add_argument(
+        "--discovery-cache-ttl",
+        "--discovery_cache_ttl",
+        type=float,
+        default=3600,
+        help=(
+            "Maximum age (seconds) of the on-disk discovery cache used when not"
+            " using the local speaker list; 0 disables the cache"
+        ),
+    )
+    parser.add_argument(
+        "--household",
+        type=str,
+        default=None,
+        help=(
+            "Only use speakers in the Sonos household with this ID, for speaker"
+            " name lookups and '_all_'"
+        ),
+    )
     parser.add_argument(
         "--actions",
         action="store_true",
@@ -127,6 +330,21 @@ def main():
             " exit"
         ),
     )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        default=False,
+        help=(
+            "Run as a resident daemon, which runs the commands forwarded to it by"
+            " the 'sonos' command"
+        ),
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        default=False,
+        help="Don't forward this command to the daemon, even if it's running",
+    )
     # The rest of the optional args are common
     configure_common_args(parser)
 
@@ -203,7 +421,7 @@ def main():
             )
         exit(0)
 
-    if len(args.parameters) == 0 and not args.interactive:
+    if len(args.parameters) == 0 and not (args.interactive or args.daemon):
         print(
             "No parameters supplied. Use 'sonos --help' for usage information.",
             flush=True,
@@ -213,6 +431,8 @@ def main():
     message = check_args(args)
     if message:
         error_report(message)
+    if args.discovery_cache_ttl < 0:
+        error_report("Option 'discovery_cache_ttl' must be >= 0")
 
     use_local_speaker_list = args.use_local_speaker_list
     env_local = env.get(ENV_LOCAL)
@@ -229,19 +449,39 @@ def main():
             network_threads=args.network_discovery_threads,
             network_timeout=args.network_discovery_timeout,
             min_netmask=args.min_netmask,
+            neighbours_first=args.neighbours_first,
+            stop_early=args.stop_early,
+            adaptive_timeout=args.adaptive_timeout,
+            household=args.household,
         )
         if args.refresh_local_speaker_list or not speaker_list.load():
             logging.info("Start speaker discovery")
             speaker_list.discover()
             speaker_list.save()
+        if args.household and args.household not in speaker_list.households():
+            error_report(
+                "Household '{}' is not in the local speaker list".format(args.household)
+            )
         set_speaker_list(speaker_list)
     else:
-        # Create the local speaker cache in the utils module
-        create_speaker_cache(
+        options = dict(
             max_threads=args.network_discovery_threads,
             scan_timeout=args.network_discovery_timeout,
             min_netmask=args.min_netmask,
+            disk_cache_ttl=args.discovery_cache_ttl,
+            neighbours_first=args.neighbours_first,
+            stop_early=args.stop_early,
+            adaptive_timeout=args.adaptive_timeout,
+            household=args.household,
         )
+        # Create the local speaker cache in the utils module, unless running
+        # in the daemon, which has already populated it using the same
+        # discovery options
+        if speaker_cache() is None or options != SPEAKER_CACHE_OPTIONS:
+            if speaker_cache() is not None:
+                logging.info("Discovery options differ from the daemon's")
+            create_speaker_cache(**options)
+            SPEAKER_CACHE_OPTIONS = options
 
     # Is $SPKR set in the environment?
     env_speaker = None
@@ -252,7 +492,18 @@ def main():
         else:
             logging.info("No 'SPKR' environment variable set")
 
+    if args.daemon:
+        from soco_cli.daemon import run_daemon
+
+        run_daemon(
+            use_local_speaker_list=use_local_speaker_list,
+            refresh_interval=args.discovery_cache_ttl,
+        )
+        exit(0)
+
     if args.interactive:
+        from soco_cli.interactive import interactive_loop
+
         sk = bool(args.sk)
         speaker_name = None
         if len(args.parameters):
@@ -268,7 +519,28 @@ def main():
 
     cli_parser = CLIParser()
     cli_parser.parse(args.parameters)
-    sequences = cli_parser.get_sequences()
+    try:
+        sequences = group_parallel_blocks(
+            cli_parser.get_sequences(), excluded=LOOP_AND_WAIT_ACTIONS + ["_all_"]
+        )
+    except ValueError as error:
+        error_report(str(error))
+
+    # Look up all the speakers before running any commands, so that any
+    # discovery is done up front, and unknown speakers are reported before
+    # anything happens
+    try:
+        planned_speakers, not_found = resolve_speakers(
+            sequence_speakers(sequences, env_speaker), use_local_speaker_list
+        )
+    except Exception as error:
+        error_report("Unable to look up speakers: {}".format(error))
+    if not_found:
+        error_report(
+            "Speaker(s) not found: {}".format(
+                ", ".join("'{}'".format(name) for name in not_found)
+            )
+        )
 
     cumulative_exit_code = 0
 
@@ -288,10 +560,41 @@ def main():
     # when looping
     env_spkr_inserted = [False for i in range(len(rewindable_sequences))]
 
+    # Keep track of the (name, speaker) used by each sequence, to avoid
+    # repeating speaker lookups when looping
+    resolved_speakers = [None for i in range(len(rewindable_sequences))]
+
+    # Cache speaker reads across the command sequences
+    use_read_cache()
+
     for sequence in rewindable_sequences:
         try:
+            # Special case: a parallel block
+            if isinstance(sequence, ParallelBlock):
+                if env_speaker and env_spkr_inserted[sequence_pointer] is False:
+                    for block_sequence in sequence:
+                        block_sequence.insert(0, env_speaker)
+                    env_spkr_inserted[sequence_pointer] = True
+                logging.info("Running {} sequence(s) in parallel".format(len(sequence)))
+                for exit_code, output_msg, error_msg in run_parallel_block(
+                    sequence, use_local_speaker_list, planned_speakers
+                ):
+                    if exit_code == 0 and len(output_msg) != 0:
+                        print(output_msg, flush=True)
+                    elif len(error_msg) != 0:
+                        print(error_msg, file=sys.stderr, flush=True)
+                    cumulative_exit_code += exit_code
+                # The actions were run outside this sequence's read cache
+                invalidate_reads()
+                sequence_pointer += 1
+                continue
+
             speaker_name = sequence[0]
 
+            # Time passes during loops and waits, so cached reads may be stale
+            if speaker_name.lower() in LOOP_AND_WAIT_ACTIONS:
+                invalidate_reads()
+
             # Special case: the 'loop_to_start' action
             if speaker_name.lower() == "loop_to_start":
                 if len(sequence) != 1:
@@ -438,37 +741,37 @@ def main():
                     "Performing action '{}' on all visible speakers".format(action)
                 )
                 last_line_was_single_line = False
-                for speaker in speakers:
-                    if speaker.is_visible:
-                        logging.info(
-                            "Performing action '{}' on speaker '{}'".format(
-                                action, speaker.player_name
-                            )
-                        )
-                        exit_code, output_msg, error_msg = run_command(
-                            speaker,
-                            action,
-                            *args,
-                            use_local_speaker_list=use_local_speaker_list,
-                        )
-                        if exit_code == 0:
-                            if len(output_msg) != 0:
-                                num_lines = len(output_msg.splitlines())
-                                if num_lines > 1 and last_line_was_single_line:
-                                    print()
-                                    last_line_was_single_line = False
-                                if num_lines == 1:
-                                    last_line_was_single_line = True
-                            else:
-                                output_msg = "OK"
-                            print(speaker.player_name + ": ", end="", flush=True)
-                            print(output_msg, flush=True)
-                        elif len(error_msg) != 0:
-                            print(speaker.player_name + ": ", end="", flush=True)
-                            print(error_msg, file=sys.stderr, flush=True)
-                        cumulative_exit_code += exit_code
+                for player_name, result in run_on_all_speakers(
+                    speakers, action, args, use_local_speaker_list
+                ):
+                    exit_code, output_msg, error_msg = result
+                    if exit_code == 0:
+                        if len(output_msg) != 0:
+                            num_lines = len(output_msg.splitlines())
+                            if num_lines > 1 and last_line_was_single_line:
+                                print()
+                                last_line_was_single_line = False
+                            if num_lines == 1:
+                                last_line_was_single_line = True
+                        else:
+                            output_msg = "OK"
+                        print(player_name + ": ", end="", flush=True)
+                        print(output_msg, flush=True)
+                    elif len(error_msg) != 0:
+                        print(player_name + ": ", end="", flush=True)
+                        print(error_msg, file=sys.stderr, flush=True)
+                    cumulative_exit_code += exit_code
             else:
-                speaker = get_speaker(speaker_name, use_local_speaker_list)
+                resolved = resolved_speakers[sequence_pointer]
+                if resolved is not None and resolved[0] == speaker_name:
+                    speaker = resolved[1]
+                else:
+                    speaker = planned_speakers.get(speaker_name) or get_speaker(
+                        speaker_name, use_local_speaker_list
+                    )
+                    if speaker:
+                        resolved_speakers[sequence_pointer] = (speaker_name, speaker)
+                        planned_speakers[speaker_name] = speaker
                 if not speaker:
                     print(
                         "Error: Speaker '{}' not found".format(speaker_name),
@@ -487,6 +790,8 @@ def main():
                             )
                             continue
                         # Does not return
+                        from soco_cli.track_follow import track_follow
+
                         compact = action in ["track_follow_compact", "tfc"]
                         track_follow(
                             speaker,
@@ -512,6 +817,19 @@ def main():
                         print(error_msg, file=sys.stderr, flush=True)
                     cumulative_exit_code += exit_code
 
+                    # Look the speaker up again before its next use if the
+                    # action failed, in case the speaker has moved or changed
+                    if exit_code != 0:
+                        logging.info(
+                            "Speaker '{}' failed: will look it up again".format(
+                                speaker_name
+                            )
+                        )
+                        for index, resolved in enumerate(resolved_speakers):
+                            if resolved is not None and resolved[0] == speaker_name:
+                                resolved_speakers[index] = None
+                        planned_speakers.pop(speaker_name, None)
+
         except Exception as e:
             print("Error:", str(e), flush=True)
             cumulative_exit_code += 1
@@ -3,7 +3,14 @@
 import argparse
 
 from soco_cli.check_for_update import print_update_status
-from soco_cli.speakers import Speakers
+from soco_cli.health import (
+    HEALTH_ROUNDS,
+    print_health_json,
+    print_health_table,
+    probe_devices,
+)
+from soco_cli.speaker_watch import SpeakerWatcher
+from soco_cli.speakers import SCANNER_THREADS, SCANNERS, Speakers
 from soco_cli.utils import (
     check_args,
     configure_common_args,
@@ -36,6 +43,16 @@ def main():
         default=False,
         help="Delete the local speaker cache, if it exists",
     )
+    parser.add_argument(
+        "--refresh",
+        "-r",
+        action="store_true",
+        default=False,
+        help=(
+            "Incrementally refresh the current speaker information file instead of"
+            " performing full discovery, and report what changed"
+        ),
+    )
     parser.add_argument(
         "--subnets",
         type=str,
@@ -44,6 +61,58 @@ def main():
             " format"
         ),
     )
+    parser.add_argument(
+        "--scanner",
+        type=str,
+        choices=SCANNERS,
+        default=SCANNER_THREADS,
+        help=(
+            "The network scanner to use: 'threads' (default) or 'async' (faster for"
+            " large networks)"
+        ),
+    )
+    parser.add_argument(
+        "--topology",
+        action="store_true",
+        default=False,
+        help=(
+            "Find devices using the Sonos system topology from one device per"
+            " household, only scanning the network if this fails"
+        ),
+    )
+    parser.add_argument(
+        "--watch",
+        "-w",
+        action="store_true",
+        default=False,
+        help=(
+            "Keep running, and update the speaker information file whenever"
+            " speakers join or leave the network, or the Sonos system changes"
+        ),
+    )
+    parser.add_argument(
+        "--health",
+        action="store_true",
+        default=False,
+        help=(
+            "Probe every device in the current speaker information file, and report"
+            " response times, error counts and firmware versions"
+        ),
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=HEALTH_ROUNDS,
+        help="The number of rounds of health probes (default: {})".format(
+            HEALTH_ROUNDS
+        ),
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        default=False,
+        help="Print the health report as JSON",
+    )
     # The rest of the optional args are common
     configure_common_args(parser)
 
@@ -94,11 +163,58 @@ def main():
     speaker_list._network_threads = args.network_discovery_threads
     speaker_list._network_timeout = args.network_discovery_timeout
     speaker_list._min_netmask = args.min_netmask
+    speaker_list.scanner = args.scanner
+    speaker_list.use_topology = args.topology
+    speaker_list.neighbours_first = args.neighbours_first
+    speaker_list.stop_early = args.stop_early
+    speaker_list.adaptive_timeout = args.adaptive_timeout
     if args.subnets is not None:
         speaker_list.subnets = args.subnets.split(",")
 
+    if args.health:
+        if args.rounds < 1:
+            error_report("The number of rounds must be at least 1")
+        try:
+            if not speaker_list.load():
+                speaker_list.discover()
+                speaker_list.save()
+            if not speaker_list.speakers:
+                error_report("No speakers to probe")
+            reports = probe_devices(
+                speaker_list.speakers,
+                rounds=args.rounds,
+                max_threads=args.network_discovery_threads,
+            )
+            if args.json:
+                print_health_json(reports)
+            else:
+                print_health_table(reports)
+            exit(0)
+        except Exception as e:
+            error_report(str(e))
+
+    if args.watch:
+        try:
+            if not speaker_list.load():
+                speaker_list.discover()
+                speaker_list.save()
+            print("Watching for speaker changes (CTRL-C to exit)\n", flush=True)
+            SpeakerWatcher(speaker_list).run()
+        except KeyboardInterrupt:
+            exit(0)
+        except Exception as e:
+            error_report(str(e))
+
     try:
-        speaker_list.discover()
+        if args.refresh or args.topology:
+            # Existing speakers can be used as topology seeds
+            speaker_list.load()
+        if args.refresh:
+            changes = speaker_list.refresh()
+            print()
+            speaker_list.print_changes(changes)
+        else:
+            speaker_list.discover()
         saved = speaker_list.save()
         speaker_list.print()
         if saved:
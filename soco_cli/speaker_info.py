@@ -2,8 +2,6 @@
 
 import datetime
 
-import tabulate  # type: ignore
-
 # Collect speaker information from each speaker in turn
 headers = [
     "Zone Name",
@@ -36,9 +34,10 @@ def print_speaker_table(device):
         )
 
     for sco in device.all_zones:
-        # Load the speaker info
+        # Always fetch the speaker info: the software version and zone name
+        # can change
         try:
-            sco.get_speaker_info()
+            sco.get_speaker_info(refresh=True)
         except BaseException as e:
             add_err_and_exc(sco.player_name, sco.ip_address, e)
             continue
@@ -104,6 +103,9 @@ def print_speaker_table(device):
     )
 
     # Print the speaker information table in a nice format
+    # (tabulate is imported here because it's slow to load)
+    import tabulate  # type: ignore
+
     print()
     print(tabulate.tabulate(sorted(speakers), headers, numalign="center"))
 
@@ -0,0 +1,93 @@
+"""Pre-populates SoCo instances with speaker metadata that is already known.
+
+Reading 'player_name', 'is_visible', 'uid' or 'household_id' from a newly
+created SoCo instance costs at least one network round trip, even when the
+local speaker list or the speaker cache already holds the answer. Metadata
+recorded here using hydrate() is returned by cached_player_name() and
+cached_is_visible() without contacting the speaker, until it's invalidated.
+"""
+
+import logging
+import threading
+from collections import namedtuple
+
+# Fields are None where the value is not known
+SpeakerMetadata = namedtuple(
+    "SpeakerMetadata",
+    ["player_name", "is_visible", "uid", "household_id"],
+    rename=False,
+)
+
+# Maps IP address to (SoCo instance, SpeakerMetadata)
+_metadata = {}
+_lock = threading.Lock()
+
+
+def hydrate(speaker, player_name=None, is_visible=None, uid=None, household_id=None):
+    """Record the known metadata for a SoCo instance.
+
+    SoCo never re-reads a speaker's UID or household ID once it knows
+    them, so these are also seeded directly into the SoCo instance, if
+    it doesn't already know them.
+
+    Returns:
+        SoCo: The speaker, for convenience.
+    """
+    seeded = {}
+    for attribute, value in [("_uid", uid), ("_household_id", household_id)]:
+        if value is not None and getattr(speaker, attribute, None) is None:
+            setattr(speaker, attribute, value)
+            seeded[attribute] = value
+    metadata = SpeakerMetadata(player_name, is_visible, uid, household_id)
+    with _lock:
+        previous = _metadata.get(speaker.ip_address)
+        if previous is not None and previous[0] is speaker:
+            # Remember values seeded earlier, so they can be invalidated
+            seeded = dict(previous[2], **seeded)
+        _metadata[speaker.ip_address] = (speaker, metadata, seeded)
+    return speaker
+
+
+def get_metadata(speaker):
+    """Return the SpeakerMetadata recorded for a SoCo instance, or None."""
+    entry = _metadata.get(speaker.ip_address)
+    if entry is None or entry[0] is not speaker:
+        return None
+    return entry[1]
+
+
+def cached_player_name(speaker):
+    """The speaker's name, from the recorded metadata if available."""
+    metadata = get_metadata(speaker)
+    if metadata is not None and metadata.player_name is not None:
+        return metadata.player_name
+    return speaker.player_name
+
+
+def cached_is_visible(speaker):
+    """Whether the speaker is visible, from the recorded metadata if
+    available."""
+    metadata = get_metadata(speaker)
+    if metadata is not None and metadata.is_visible is not None:
+        return metadata.is_visible
+    return speaker.is_visible
+
+
+def invalidate(ip_address=None):
+    """Forget the recorded metadata for the speaker at 'ip_address', or for
+    all speakers if no IP address is given. Any UID or household ID seeded
+    into the SoCo instance is cleared, so that it will be read from the
+    speaker when next required."""
+    with _lock:
+        if ip_address is None:
+            entries = list(_metadata.values())
+            _metadata.clear()
+        else:
+            entry = _metadata.pop(ip_address, None)
+            entries = [entry] if entry is not None else []
+    for speaker, _, seeded in entries:
+        for attribute, value in seeded.items():
+            if getattr(speaker, attribute, None) == value:
+                setattr(speaker, attribute, None)
+    if entries:
+        logging.info("Invalidated metadata for {} speaker(s)".format(len(entries)))
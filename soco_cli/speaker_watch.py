@@ -0,0 +1,231 @@
+"""Keeps the local speaker list up to date in the background.
+
+Listens for Sonos SSDP 'alive' and 'byebye' announcements, and for zone group
+topology events from one speaker in each household, and incrementally
+refreshes and saves the local speaker list when something changes.
+"""
+
+import logging
+import select
+import socket
+import sys
+import time
+from datetime import datetime
+from queue import Empty
+from urllib.parse import urlparse
+
+import soco  # type: ignore
+
+from soco_cli.topology_discovery import (
+    MCAST_GRP,
+    MCAST_PORT,
+    find_ipv4_addresses,
+    parse_ssdp_headers,
+)
+from soco_cli.utils import event_unsubscribe, forget_event_sub, remember_event_sub
+
+ZONE_PLAYER = "urn:schemas-upnp-org:device:ZonePlayer:1"
+
+
+def parse_ssdp_notify(data):
+    """Parse an SSDP NOTIFY message from a Sonos player.
+
+    Returns:
+        (str, str, str): The notification type ('ssdp:alive' or
+            'ssdp:byebye'), the player UID and the player IP address, or
+            None if this isn't a Sonos player notification.
+    """
+    if not data.startswith(b"NOTIFY"):
+        return None
+    headers = parse_ssdp_headers(data)
+    if headers is None or headers.get("NT") != ZONE_PLAYER:
+        return None
+    # USN is of the form 'uuid:RINCON_XXXXXXXXXXXX01400::urn:...'
+    usn = headers.get("USN", "")
+    if not usn.startswith("uuid:"):
+        return None
+    uid = usn.split("::")[0][len("uuid:") :]
+    ip_address = urlparse(headers.get("LOCATION", "")).hostname
+    return headers.get("NTS"), uid, ip_address
+
+
+class SpeakerWatcher:
+    """Watches for changes to the Sonos system and keeps a Speakers object,
+    and its save file, up to date."""
+
+    def __init__(self, speaker_list, debounce=2.0):
+        self._speaker_list = speaker_list
+        # Wait for announcements to settle before refreshing
+        self._debounce = debounce
+        self._change_time = None
+        self._socket = None
+        # Topology event subscriptions, keyed by household ID
+        self._subs = {}
+        # Players announced since the last refresh that weren't in the
+        # speaker list, and those that a refresh didn't add (e.g., players in
+        # another household, or excluded from the list), keyed by UID
+        self._announced = {}
+        self._rejected = {}
+
+    @property
+    def refresh_pending(self):
+        return self._change_time is not None
+
+    def change_detected(self, reason):
+        logging.info("Change detected: {}".format(reason))
+        if self._change_time is None:
+            self._change_time = time.time()
+
+    def handle_ssdp_message(self, data):
+        """Check an SSDP message for a change to the known speakers."""
+        notification = parse_ssdp_notify(data)
+        if notification is None:
+            return
+        nts, uid, ip_address = notification
+        known = {
+            device.uid: device.ip_address for device in self._speaker_list.speakers
+        }
+        if nts == "ssdp:byebye" and uid in known:
+            self.change_detected("'{}' has left the network".format(uid))
+        elif nts == "ssdp:alive" and known.get(uid) != ip_address:
+            if uid not in known:
+                if self._rejected.get(uid) == ip_address:
+                    return
+                self._announced[uid] = ip_address
+            self.change_detected("'{}' is at new address {}".format(uid, ip_address))
+
+    def check_topology_events(self):
+        """Check for topology events from any household."""
+        for household_id, sub in self._subs.items():
+            try:
+                while True:
+                    sub.events.get(block=False)
+                    self.change_detected(
+                        "Topology event from household '{}'".format(household_id)
+                    )
+            except Empty:
+                pass
+
+    def refresh(self):
+        """Refresh and save the speaker list, and report any changes."""
+        self._change_time = None
+        announced, self._announced = self._announced, {}
+        changes = self._speaker_list.refresh()
+        known = {device.uid for device in self._speaker_list.speakers}
+        for uid, ip_address in announced.items():
+            if uid not in known:
+                logging.info(
+                    "Ignoring announcements from '{}' at {}".format(uid, ip_address)
+                )
+                self._rejected[uid] = ip_address
+        if any(changes):
+            self._speaker_list.save()
+            print(
+                "{}: Speaker list updated".format(
+                    datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                ),
+                flush=True,
+            )
+            self._speaker_list.print_changes(changes)
+            print(flush=True)
+        self.update_subscriptions()
+
+    def try_refresh(self):
+        """Refresh, reporting any failure instead of raising it, so that
+        watching can continue."""
+        try:
+            self.refresh()
+        except Exception as e:
+            logging.info("Speaker list refresh failed: {}".format(e))
+            print(
+                "{}: Speaker list refresh failed: {}".format(
+                    datetime.now().strftime("%Y-%m-%d %H:%M:%S"), e
+                ),
+                file=sys.stderr,
+                flush=True,
+            )
+
+    def update_subscriptions(self):
+        """Subscribe to topology events from one device in each household,
+        replacing subscriptions to devices that have gone away."""
+        households = {}
+        for device in self._speaker_list.speakers:
+            households.setdefault(device.household_id, []).append(device.ip_address)
+
+        for household_id, sub in list(self._subs.items()):
+            if (
+                household_id not in households
+                or sub.service.soco.ip_address not in households[household_id]
+                or not sub.is_subscribed
+            ):
+                self._unsubscribe(household_id)
+
+        for household_id, ip_addresses in households.items():
+            if household_id in self._subs:
+                continue
+            for ip_address in ip_addresses:
+                try:
+                    sub = soco.SoCo(ip_address).zoneGroupTopology.subscribe(
+                        auto_renew=True
+                    )
+                except Exception as e:
+                    logging.info(
+                        "Failed to subscribe to topology events from {}: {}".format(
+                            ip_address, e
+                        )
+                    )
+                    continue
+                remember_event_sub(sub)
+                self._subs[household_id] = sub
+                break
+
+    def _unsubscribe(self, household_id):
+        sub = self._subs.pop(household_id)
+        event_unsubscribe(sub)
+        forget_event_sub(sub)
+
+    def _open_socket(self):
+        """Open a socket to receive SSDP multicast notifications."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            except OSError:
+                pass
+        sock.bind(("", MCAST_PORT))
+        for address in find_ipv4_addresses():
+            try:
+                sock.setsockopt(
+                    socket.IPPROTO_IP,
+                    socket.IP_ADD_MEMBERSHIP,
+                    socket.inet_aton(MCAST_GRP) + socket.inet_aton(address),
+                )
+            except OSError as e:
+                logging.info("Can't join multicast group on {}: {}".format(address, e))
+        self._socket = sock
+
+    def process(self, timeout=0.5):
+        """Process any SSDP messages and topology events received within
+        the timeout, and refresh if a change has settled."""
+        if self._socket is not None:
+            ready, _, _ = select.select([self._socket], [], [], timeout)
+            if ready:
+                data, _ = self._socket.recvfrom(4096)
+                self.handle_ssdp_message(data)
+        self.check_topology_events()
+        if self.refresh_pending and time.time() - self._change_time >= self._debounce:
+            self.try_refresh()
+
+    def run(self):
+        """Watch for changes until interrupted."""
+        self._open_socket()
+        try:
+            self.try_refresh()
+            while True:
+                self.process()
+        finally:
+            self._socket.close()
+            self._socket = None
+            for household_id in list(self._subs):
+                self._unsubscribe(household_id)
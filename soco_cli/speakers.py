@@ -1,15 +1,26 @@
 """Manages speaker information for Cached Discovery mode."""
 
+import asyncio
+import errno
 import ipaddress
 import logging
 import os
 import pickle
+import socket
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from time import monotonic
 
+import ifaddr  # type: ignore
 import soco  # type: ignore
-import tabulate  # type: ignore
 
-from soco_cli.match_speaker_names import speaker_name_matches
+from soco_cli.capabilities import capability_cache
+from soco_cli.discovery_cache import SONOS_PORT, write_pickle_atomically
+from soco_cli.match_speaker_names import SpeakerNameIndex
+from soco_cli.neighbours import order_by_neighbours, read_neighbour_table
+from soco_cli.scan_timing import ScanTimings, timed_probe
+from soco_cli.speaker_metadata import hydrate, invalidate
+from soco_cli.topology_discovery import topology_discover
 
 # Type for holding speaker details
 SonosDevice = namedtuple(
@@ -21,9 +32,286 @@ SonosDevice = namedtuple(
         "is_visible",
         "model_name",
         "display_version",
+        "uid",
     ],
     rename=False,
 )
+# Records saved by earlier versions have no 'uid'
+SonosDevice.__new__.__defaults__ = (None,)
+
+# Type for reporting changes between two speaker lists
+SpeakerChanges = namedtuple(
+    "SpeakerChanges", ["added", "removed", "moved", "renamed"], rename=False
+)
+
+# Network scanner engines: SoCo's threaded scanner, or a single-threaded
+# asyncio scanner
+SCANNER_THREADS = "threads"
+SCANNER_ASYNC = "async"
+SCANNERS = [SCANNER_THREADS, SCANNER_ASYNC]
+
+# The number of requests made when querying a device: its speaker info,
+# household ID, and zone group topology (for visibility)
+DEVICE_QUERY_REQUESTS = 3
+
+
+def find_ipv4_networks(min_netmask):
+    """Return the set of private IPv4 networks to which this host is
+    attached, excluding loopback and link local networks, and constraining
+    the netmask to be at least 'min_netmask' bits."""
+    networks = set()
+    for adapter in ifaddr.get_adapters():
+        for adapter_ip in adapter.ips:
+            if not isinstance(adapter_ip.ip, str):
+                continue  # IPv6 addresses are tuples
+            ip_address = ipaddress.IPv4Address(adapter_ip.ip)
+            if (
+                not ip_address.is_private
+                or ip_address.is_loopback
+                or ip_address.is_link_local
+            ):
+                continue
+            netmask = max(adapter_ip.network_prefix, min_netmask)
+            networks.add(
+                ipaddress.IPv4Network(
+                    "{}/{}".format(adapter_ip.ip, netmask), strict=False
+                )
+            )
+    logging.info("Attached networks to scan: {}".format(networks))
+    return networks
+
+
+# Back-off when out of file handles (seconds)
+OUT_OF_FILES_BACKOFF = 0.05
+OUT_OF_FILES_MAX_BACKOFF = 1.0
+
+
+async def _open_port_worker(ip_addresses, open_ip_addresses, port, timeout, workers):
+    """Take IP addresses from the list and try to connect to 'port'.
+    'workers' is a one-item list holding the number of running workers."""
+    backoff = OUT_OF_FILES_BACKOFF
+    while ip_addresses:
+        ip_address = ip_addresses.pop()
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(ip_address, port), timeout
+            )
+        except asyncio.TimeoutError:
+            continue
+        except OSError as e:
+            if e.errno in [errno.EMFILE, errno.ENFILE]:
+                # Out of file handles: put the address back, and reduce the
+                # number of concurrent connections by stopping this worker.
+                # The last worker backs off and retries instead, so that
+                # every address is scanned.
+                ip_addresses.append(ip_address)
+                if workers[0] > 1:
+                    workers[0] -= 1
+                    logging.info("Out of file handles: stopping scan worker")
+                    return
+                logging.info("Out of file handles: retrying in {}s".format(backoff))
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, OUT_OF_FILES_MAX_BACKOFF)
+            continue
+        backoff = OUT_OF_FILES_BACKOFF
+        logging.info("Found open port {}:{}".format(ip_address, port))
+        open_ip_addresses.append(ip_address)
+        writer.close()
+    workers[0] -= 1
+
+
+def scan_for_open_port(ip_addresses, port=SONOS_PORT, timeout=0.1, max_connections=256):
+    """Scan a list of IP addresses for those accepting connections on
+    'port', using non-blocking connections from a single asyncio event
+    loop. At most 'max_connections' connection attempts are in progress at
+    once. Returns the list of IP addresses with the port open."""
+    ip_addresses = list(ip_addresses)
+    open_ip_addresses = []
+    num_workers = max(1, min(max_connections, len(ip_addresses)))
+    workers = [num_workers]
+
+    async def scan():
+        await asyncio.gather(
+            *[
+                _open_port_worker(
+                    ip_addresses, open_ip_addresses, port, timeout, workers
+                )
+                for _ in range(num_workers)
+            ]
+        )
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(scan())
+    finally:
+        loop.close()
+    logging.info(
+        "Found {} address(es) with port {} open".format(len(open_ip_addresses), port)
+    )
+    return sorted(open_ip_addresses)
+
+
+def iter_concurrently(function, items, max_threads=256):
+    """Call 'function' on each item using a pool of threads, yielding each
+    result that isn't None as soon as it's available. Closing the generator
+    early abandons the calls that haven't started."""
+    items = list(items)
+    if not items:
+        return
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_threads, len(items))))
+    futures = [executor.submit(function, item) for item in items]
+    try:
+        for future in as_completed(futures):
+            result = future.result()
+            if result is not None:
+                yield result
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def wait_for_query(future, started, allowance):
+    """Wait for a query to finish, allowing it 'allowance' seconds from
+    when it starts running. 'started' is a function returning the query's
+    start time, or None while the query is still queued.
+
+    Returns:
+        bool: Whether the query finished in time.
+    """
+    while not future.done():
+        start_time = started()
+        if start_time is None:
+            # Queued behind other queries, each of which is itself limited
+            wait([future], timeout=allowance)
+            continue
+        remaining = start_time + allowance - monotonic()
+        if remaining <= 0:
+            return False
+        wait([future], timeout=remaining)
+    return True
+
+
+def port_is_open(ip_address, port=SONOS_PORT, timeout=0.1):
+    """Return True if a TCP connection can be made to ip_address:port."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        return sock.connect_ex((ip_address, port)) == 0
+
+
+def iter_open_ports(ip_addresses, port=SONOS_PORT, timeout=0.1, max_threads=256):
+    """Yield each of the IP addresses accepting connections on 'port' as
+    soon as it's found, using up to 'max_threads' threads."""
+    return iter_concurrently(
+        lambda ip_address: (
+            ip_address if port_is_open(ip_address, port, timeout) else None
+        ),
+        ip_addresses,
+        max_threads,
+    )
+
+
+# Adaptive scans probe addresses in waves, starting with this many and
+# doubling each time, so that each wave's timeouts are learned from the
+# responses to the waves before it
+FIRST_WAVE_SIZE = 16
+
+# The most timed out addresses retried if the neighbour table is
+# unavailable, so that a sparse network isn't probed twice
+MAX_UNCONFIRMED_STRAGGLERS = 16
+
+
+def iter_open_ports_adaptive(
+    ip_addresses, timings, port=SONOS_PORT, max_timeout=1.0, max_threads=256
+):
+    """Yield each of the IP addresses accepting connections on 'port' as
+    soon as it's found, using per-subnet timeouts learned from the responses
+    received (see ScanTimings). The addresses are probed in waves of
+    increasing size, so that the timeouts adapt during the scan. Addresses
+    that time out are retried once with 'max_timeout' if they're in the
+    neighbour table, i.e., the host exists but is slow to respond; if the
+    neighbour table is unavailable, up to MAX_UNCONFIRMED_STRAGGLERS are
+    retried."""
+    ip_addresses = list(ip_addresses)
+    stragglers = []
+
+    def probe(ip_address, timeout=None):
+        first_attempt = timeout is None
+        if first_attempt:
+            timeout = timings.timeout(ip_address, max_timeout)
+        is_open, rtt = timed_probe(ip_address, port, timeout)
+        if rtt is not None:
+            timings.record(ip_address, rtt)
+        elif is_open is None and first_attempt and timeout < max_timeout:
+            stragglers.append(ip_address)
+        return ip_address if is_open else None
+
+    start = 0
+    wave_size = FIRST_WAVE_SIZE
+    while start < len(ip_addresses):
+        wave = ip_addresses[start : start + wave_size]
+        for ip_address in iter_concurrently(probe, wave, max_threads):
+            yield ip_address
+        start += len(wave)
+        wave_size *= 2
+
+    neighbours = read_neighbour_table() if stragglers else {}
+    if neighbours:
+        stragglers = [
+            ip_address for ip_address in stragglers if ip_address in neighbours
+        ]
+    elif len(stragglers) > MAX_UNCONFIRMED_STRAGGLERS:
+        logging.info(
+            "No neighbour table: retrying {} of {} straggler(s)".format(
+                MAX_UNCONFIRMED_STRAGGLERS, len(stragglers)
+            )
+        )
+        stragglers = sorted(stragglers, key=ipaddress.IPv4Address)
+        stragglers = stragglers[:MAX_UNCONFIRMED_STRAGGLERS]
+    if not stragglers:
+        return
+    logging.info(
+        "Retrying {} straggler(s) with timeout = {}s".format(
+            len(stragglers), max_timeout
+        )
+    )
+    for ip_address in iter_concurrently(
+        lambda ip_address: probe(ip_address, max_timeout), stragglers, max_threads
+    ):
+        yield ip_address
+
+
+def compare_speaker_lists(old_speakers, new_speakers):
+    """Compare two lists of SonosDevice records, keyed on UID (or on IP
+    address, for records without a UID).
+
+    Returns:
+        SpeakerChanges: Lists of added and removed devices, and lists of
+            (old, new) device pairs for moved and renamed devices.
+    """
+
+    def by_key(speakers):
+        return {
+            device.uid if device.uid else device.ip_address: device
+            for device in speakers
+        }
+
+    old_by_key = by_key(old_speakers)
+    new_by_key = by_key(new_speakers)
+    changes = SpeakerChanges([], [], [], [])
+    for key, device in sorted(new_by_key.items()):
+        old_device = old_by_key.get(key)
+        if old_device is None:
+            changes.added.append(device)
+            continue
+        if old_device.ip_address != device.ip_address:
+            changes.moved.append((old_device, device))
+        if old_device.speaker_name != device.speaker_name:
+            changes.renamed.append((old_device, device))
+    for key, device in sorted(old_by_key.items()):
+        if key not in new_by_key:
+            changes.removed.append(device)
+    return changes
 
 
 class Speakers:
@@ -39,6 +327,13 @@ class Speakers:
         network_timeout=0.1,
         min_netmask=24,
         subnets=None,
+        device_timeout=3.0,
+        scanner=SCANNER_THREADS,
+        use_topology=False,
+        neighbours_first=False,
+        stop_early=False,
+        adaptive_timeout=False,
+        household=None,
     ):
         self._save_directory = (
             save_directory
@@ -50,7 +345,18 @@ class Speakers:
         self._network_threads = network_threads
         self._network_timeout = network_timeout
         self._min_netmask = min_netmask
+        self._device_timeout = device_timeout
+        self.scanner = scanner  # Calls the setter
+        self._use_topology = use_topology
+        self._neighbours_first = neighbours_first
+        self._stop_early = stop_early
+        self._adaptive_timeout = adaptive_timeout
+        self._scan_timings = None
+        # If set, lookups and '_all_' are restricted to this household
+        self._household = household
         self._speakers = []
+        # Name indexes for visible and all speakers, built on demand
+        self._name_indexes = {}
         self.subnets = subnets  # Calls the setter
 
     def remove_deprecated_pickle_files(self):
@@ -118,6 +424,76 @@ class Speakers:
     def min_netmask(self, min_netmask):
         self._min_netmask = min_netmask
 
+    @property
+    def device_timeout(self):
+        return self._device_timeout
+
+    @device_timeout.setter
+    def device_timeout(self, timeout):
+        self._device_timeout = timeout
+
+    @property
+    def use_topology(self):
+        return self._use_topology
+
+    @use_topology.setter
+    def use_topology(self, use_topology):
+        self._use_topology = use_topology
+
+    @property
+    def neighbours_first(self):
+        return self._neighbours_first
+
+    @neighbours_first.setter
+    def neighbours_first(self, neighbours_first):
+        self._neighbours_first = neighbours_first
+
+    @property
+    def stop_early(self):
+        return self._stop_early
+
+    @stop_early.setter
+    def stop_early(self, stop_early):
+        self._stop_early = stop_early
+
+    @property
+    def adaptive_timeout(self):
+        return self._adaptive_timeout
+
+    @adaptive_timeout.setter
+    def adaptive_timeout(self, adaptive_timeout):
+        self._adaptive_timeout = adaptive_timeout
+
+    @property
+    def household(self):
+        return self._household
+
+    @household.setter
+    def household(self, household_id):
+        self._household = household_id
+        self._name_indexes = {}
+
+    @property
+    def scan_timings(self):
+        """The RTT estimates used for adaptive timeouts, loaded from the
+        save directory on first use."""
+        if self._scan_timings is None:
+            self._scan_timings = ScanTimings(save_directory=self._save_directory)
+            self._scan_timings.load()
+        return self._scan_timings
+
+    @property
+    def scanner(self):
+        return self._scanner
+
+    @scanner.setter
+    def scanner(self, scanner):
+        if scanner not in SCANNERS:
+            raise ValueError(
+                "Scanner must be one of {}, not '{}'".format(SCANNERS, scanner)
+            )
+        self._scanner = scanner
+
     @property
     def subnets(self):
         return self._subnets
@@ -149,12 +525,12 @@ class Speakers:
         self._subnets = subnets
 
     def save(self):
-        """Saves the speaker list as a pickle file."""
+        """Saves the speaker list as a pickle file. The file is replaced
+        atomically, so it can be read safely while being updated."""
         if self._speakers:
-            if not os.path.exists(self._save_directory):
-                os.mkdir(self._save_directory)
-            with open(self.save_pathname, "wb") as f:
-                pickle.dump(self._speakers, f)
+            write_pickle_atomically(
+                self._speakers, self._save_directory, self.save_pathname
+            )
             return True
         return False
 
@@ -166,12 +542,14 @@ class Speakers:
                     self._speakers = pickle.load(f)
             except:
                 return False
+            invalidate()
             return True
         return False
 
     def clear(self):
         """Clears the in-memory speaker list"""
         self._speakers = []
+        invalidate()
 
     def remove_save_file(self):
         """Removes the saved speaker list file"""
@@ -185,6 +563,8 @@ class Speakers:
                 new_speaker = speaker._replace(speaker_name=new_name)
                 del self._speakers[index]
                 self._speakers.append(new_speaker)
+                self._name_indexes = {}
+                invalidate(speaker.ip_address)
                 logging.info(
                     "Renamed speaker in cache: '{}' to '{}'".format(old_name, new_name)
                 )
@@ -204,13 +584,14 @@ class Speakers:
             return False
 
     @staticmethod
-    def get_sonos_device_data(ip_addr):
+    def get_sonos_device_data(ip_addr, timeout=3.0):
         """Get information from a Sonos device"""
         try:
             speaker = soco.SoCo(str(ip_addr))
             logging.info("Querying device at {}".format(str(ip_addr)))
-            info = speaker.get_speaker_info(refresh=True, timeout=3.0)
+            info = speaker.get_speaker_info(refresh=True, timeout=timeout)
             if info is not None:
+                capability_cache().record(info)
                 return SonosDevice(
                     speaker.household_id,
                     str(ip_addr),
@@ -218,6 +599,7 @@ class Speakers:
                     speaker.is_visible,
                     info["model_name"],
                     info["display_version"],
+                    info["uid"],
                 )
             else:
                 raise Exception
@@ -228,69 +610,391 @@ class Speakers:
     def discover(self):
         """Discover the Sonos speakers on the network(s) to which
         this host is attached."""
+        seed_ips = [device.ip_address for device in self._speakers]
         self.clear()
-        devices = None
-        if not (self._subnets_arg and len(self.subnets) == 0):
-            devices = soco.discovery.scan_network(
-                include_invisible=True,
-                multi_household=True,
-                scan_timeout=self._network_timeout,
-                max_threads=self._network_threads,
-                min_netmask=self._min_netmask,
-                networks_to_scan=self._subnets,
-            )
-
-        if devices is None:
+        ip_addresses = None
+        if self._use_topology:
+            ip_addresses = self.topology_scan(seed_ips)
+        if not ip_addresses:
+            ip_addresses = self.scan_network()
+        if not ip_addresses:
             logging.info("No devices discovered")
         else:
             # Populate the device information for each speaker
-            for device in devices:
-                speaker_data = self.get_sonos_device_data(device.ip_address)
-                if speaker_data is not None:
-                    self._speakers.append(speaker_data)
+            self._speakers.extend(self.get_sonos_devices_data(ip_addresses))
 
-    def find(self, speaker_name, require_visible=True):
-        """Find a speaker by name and return its SoCo object."""
+    @staticmethod
+    def topology_scan(seed_ips):
+        """Find the IP addresses of all devices in all households from the
+        zone group topology, seeded from 'seed_ips' and by multicast. Returns
+        None if no devices were found."""
+        zones = topology_discover(seed_ips=seed_ips, include_invisible=True)
+        if not zones:
+            return None
+        return [zone.ip_address for zone in zones]
+
+    def scan_network(self):
+        """Scan the network(s) using the selected scanner. Returns a list of
+        the IP addresses of possible Sonos devices."""
+        if self._subnets_arg and len(self.subnets) == 0:
+            return []
+        if self._neighbours_first or self._adaptive_timeout:
+            if self._neighbours_first:
+                ip_addresses = self.neighbours_first_scan()
+            else:
+                ip_addresses = sorted(self.probe_addresses(self.ip_addresses_to_scan()))
+            if self._adaptive_timeout:
+                self.scan_timings.save()
+            return ip_addresses
+        if self._scanner == SCANNER_ASYNC:
+            return self.async_scan_network()
+        devices = soco.discovery.scan_network(
+            include_invisible=True,
+            multi_household=True,
+            scan_timeout=self._network_timeout,
+            max_threads=self._network_threads,
+            min_netmask=self._min_netmask,
+            networks_to_scan=self._subnets,
+        )
+        if not devices:
+            return []
+        return [device.ip_address for device in devices]
 
-        speaker_names = set()
-        return_speaker = None
+    def refresh(self):
+        """Incrementally refresh the loaded speaker list, keyed on player UID.
+
+        Cached IP addresses are probed, and the zone group topology is read
+        from one responding device in each household to pick up renamed,
+        moved and new devices. Only devices not previously known are queried
+        in full. A network scan is performed only if every device in a
+        household has stopped responding. If the speaker list is empty or
+        was saved without UIDs, full discovery is performed instead.
+
+        Returns:
+            SpeakerChanges: The devices added, removed, moved and renamed.
+        """
+        old_speakers = list(self._speakers)
+        if not old_speakers or any(device.uid is None for device in old_speakers):
+            logging.info("No UID-keyed speaker list: performing full discovery")
+            self.discover()
+            return compare_speaker_lists(old_speakers, self._speakers)
+
+        responding = set(
+            scan_for_open_port(
+                [device.ip_address for device in old_speakers],
+                timeout=self._network_timeout,
+                max_connections=self._network_threads,
+            )
+        )
+
+        # Read the topology of each household from any responding device,
+        # for all households concurrently
+        old_households = {}
+        for device in old_speakers:
+            if device.ip_address in responding:
+                old_households.setdefault(device.household_id, []).append(
+                    device.ip_address
+                )
+            else:
+                old_households.setdefault(device.household_id, [])
+        household_ids = sorted(old_households)
+        with ThreadPoolExecutor(max_workers=len(household_ids)) as executor:
+            all_household_zones = list(
+                executor.map(
+                    lambda household_id: self.get_household_zones(
+                        old_households[household_id]
+                    ),
+                    household_ids,
+                )
+            )
+        zones = {}
+        unreachable_households = set()
+        for household_id, household_zones in zip(household_ids, all_household_zones):
+            if household_zones is None:
+                logging.info("Household '{}' is not responding".format(household_id))
+                unreachable_households.add(household_id)
+                continue
+            for zone in household_zones:
+                zones[zone.uid] = zone
 
-        for speaker in self._speakers:
-            if require_visible and not speaker.is_visible:
+        old_speakers_by_uid = {device.uid: device for device in old_speakers}
+        new_speakers = []
+        to_query = []
+        for uid, zone in zones.items():
+            old_device = old_speakers_by_uid.get(uid)
+            if old_device is None:
+                to_query.append(zone.ip_address)
                 continue
+            new_speakers.append(
+                old_device._replace(
+                    ip_address=zone.ip_address,
+                    speaker_name=zone.player_name,
+                    is_visible=zone.is_visible,
+                )
+            )
+
+        if unreachable_households:
+            logging.info("Scanning for devices in unreachable households")
+            known = {device.ip_address for device in new_speakers}.union(to_query)
+            to_query.extend(ip for ip in self.scan_network() if ip not in known)
 
-            match, exact = speaker_name_matches(speaker_name, speaker.speaker_name)
+        known_uids = {device.uid for device in new_speakers}
+        for device in self.get_sonos_devices_data(to_query):
+            if device.uid not in known_uids:
+                known_uids.add(device.uid)
+                new_speakers.append(device)
 
-            if match and exact:
-                speaker_names.add(speaker.speaker_name)
-                return soco.SoCo(speaker.ip_address)
+        self._speakers = new_speakers
+        invalidate()
+        return compare_speaker_lists(old_speakers, self._speakers)
 
-            if match and not exact:
-                speaker_names.add(speaker.speaker_name)
-                if not return_speaker:
-                    return_speaker = soco.SoCo(speaker.ip_address)
+    @staticmethod
+    def get_household_zones(ip_addresses):
+        """Return the set of all zones in a household, read from the zone group
+        topology of the first of 'ip_addresses' that responds, or None."""
+        for ip_address in ip_addresses:
+            try:
+                return soco.SoCo(ip_address).all_zones
+            except Exception as e:
+                logging.info(
+                    "Failed to read topology from {}: {}".format(ip_address, e)
+                )
+        return None
 
-        if len(speaker_names) > 1:
+    def networks_to_scan(self):
+        """The list of networks to scan: either the networks supplied as
+        'subnets', or the networks to which this host is attached."""
+        if self._subnets_arg:
+            return [
+                ipaddress.IPv4Network(subnet, strict=False) for subnet in self._subnets
+            ]
+        return find_ipv4_networks(self._min_netmask)
+
+    def ip_addresses_to_scan(self):
+        """The sorted list of IP addresses in the networks to scan."""
+        ip_addresses = set()
+        for network in self.networks_to_scan():
+            ip_addresses.update(str(ip_address) for ip_address in network)
+        return sorted(ip_addresses)
+
+    def neighbours_first_scan(self):
+        """Probe the hosts in the neighbour table first, those with a Sonos
+        MAC OUI before the others, then the rest of the network(s). If
+        'stop_early' is set and devices are found among the neighbours, the
+        rest of the network is covered using the zone group topology of the
+        devices found, instead of being probed. Returns a list of IP
+        addresses."""
+        first, rest = order_by_neighbours(self.ip_addresses_to_scan())
+        found = self.probe_addresses(first)
+        if found and self._stop_early:
+            logging.info("Found {} device(s) among neighbours".format(len(found)))
+            ip_addresses = self.topology_scan(found)
+            if ip_addresses:
+                return sorted(set(found).union(ip_addresses))
+        return sorted(set(found).union(self.probe_addresses(rest)))
+
+    def probe_addresses(self, ip_addresses):
+        """Probe a list of IP addresses for the Sonos port using the selected
+        scanner, or using adaptive timeouts, in which case 'network_timeout'
+        is the maximum timeout. Returns the list of addresses with the port
+        open."""
+        if self._adaptive_timeout:
+            return list(
+                iter_open_ports_adaptive(
+                    ip_addresses,
+                    self.scan_timings,
+                    max_timeout=self._network_timeout,
+                    max_threads=self._network_threads,
+                )
+            )
+        if self._scanner == SCANNER_ASYNC:
+            return scan_for_open_port(
+                ip_addresses,
+                timeout=self._network_timeout,
+                max_connections=self._network_threads,
+            )
+        return list(
+            iter_open_ports(
+                ip_addresses,
+                timeout=self._network_timeout,
+                max_threads=self._network_threads,
+            )
+        )
+
+    def async_scan_network(self):
+        """Scan for devices with the Sonos port open using the asyncio
+        scanner, with at most 'network_threads' connections in progress
+        at once. Returns a list of IP addresses."""
+        ip_addresses = self.ip_addresses_to_scan()
+        logging.info(
+            "Scanning {} address(es) using asyncio, max {} connections".format(
+                len(ip_addresses), self._network_threads
+            )
+        )
+        return scan_for_open_port(
+            ip_addresses,
+            timeout=self._network_timeout,
+            max_connections=self._network_threads,
+        )
+
+    def iter_discover(self):
+        """Scan the network(s), yielding a SonosDevice record for each device
+        as soon as it responds, so that callers can stop when they've found
+        what they need. The speaker list is not updated. Closing the
+        generator early abandons the rest of the scan."""
+        if self._subnets_arg and len(self.subnets) == 0:
+            return iter(())
+
+        def query_device(ip_address):
+            if not port_is_open(ip_address, timeout=self._network_timeout):
+                return None
+            return self.get_sonos_device_data(ip_address, self._device_timeout)
+
+        return iter_concurrently(
+            query_device, self.ip_addresses_to_scan(), self._network_threads
+        )
+
+    def get_sonos_devices_data(self, ip_addresses):
+        """Get information from multiple Sonos devices concurrently, using up
+        to 'network_threads' threads. Each device is allowed 'device_timeout'
+        seconds for each of its requests, timed from when its own query
+        starts; devices that don't respond in time are omitted.
+        """
+        ip_addresses = sorted(set(ip_addresses))
+        if not ip_addresses:
+            return []
+        max_workers = max(1, min(self._network_threads, len(ip_addresses)))
+        logging.info(
+            "Querying {} device(s) using {} thread(s)".format(
+                len(ip_addresses), max_workers
+            )
+        )
+        started = {}
+
+        def query_device(ip_addr):
+            started[ip_addr] = monotonic()
+            return self.get_sonos_device_data(ip_addr, self._device_timeout)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = [executor.submit(query_device, ip_addr) for ip_addr in ip_addresses]
+        allowance = self._device_timeout * DEVICE_QUERY_REQUESTS
+        devices_data = []
+        for ip_addr, future in zip(ip_addresses, futures):
+            if not wait_for_query(future, lambda: started.get(ip_addr), allowance):
+                logging.info("Device at {} did not respond in time".format(ip_addr))
+                future.cancel()
+                continue
+            speaker_data = future.result()
+            if speaker_data is not None:
+                devices_data.append(speaker_data)
+        # Don't wait for any stalled queries to finish
+        executor.shutdown(wait=False)
+        capability_cache().save()
+        return devices_data
+
+    @staticmethod
+    def print_changes(changes):
+        """Print a SpeakerChanges tuple."""
+        for device in changes.added:
+            print("Added:   {} ({})".format(device.speaker_name, device.ip_address))
+        for device in changes.removed:
+            print("Removed: {} ({})".format(device.speaker_name, device.ip_address))
+        for old_device, new_device in changes.moved:
+            print(
+                "Moved:   {} ({} -> {})".format(
+                    new_device.speaker_name,
+                    old_device.ip_address,
+                    new_device.ip_address,
+                )
+            )
+        for old_device, new_device in changes.renamed:
             print(
-                "Speaker name '{}' is ambiguous within {}".format(
-                    speaker_name, speaker_names
+                "Renamed: {} -> {} ({})".format(
+                    old_device.speaker_name,
+                    new_device.speaker_name,
+                    new_device.ip_address,
                 )
             )
+        if not any(changes):
+            print("No changes")
+
+    def households(self):
+        """Return a dict mapping each household ID to the list of its
+        devices."""
+        households = {}
+        for device in self._speakers:
+            households.setdefault(device.household_id, []).append(device)
+        return households
+
+    def members(self):
+        """The devices in the selected household, or all devices if no
+        household is selected."""
+        if self._household is None:
+            return self._speakers
+        return [
+            device
+            for device in self._speakers
+            if device.household_id == self._household
+        ]
+
+    def name_index(self, require_visible=True):
+        """Return the name index for the speaker list, building it if the
+        list has changed."""
+        index = self._name_indexes.get(require_visible)
+        if index is None or not index.indexes(self._speakers):
+            index = SpeakerNameIndex(
+                (
+                    (speaker.speaker_name, speaker)
+                    for speaker in self.members()
+                    if speaker.is_visible or not require_visible
+                ),
+                source=self._speakers,
+            )
+            self._name_indexes[require_visible] = index
+        return index
+
+    def find(self, speaker_name, require_visible=True):
+        """Find a speaker by name and return its SoCo object."""
+
+        matches, exact = self.name_index(require_visible).match(speaker_name)
+        if not matches:
             return None
 
-        return return_speaker
+        if not exact:
+            speaker_names = {name for name, _ in matches}
+            if len(speaker_names) > 1:
+                print(
+                    "Speaker name '{}' is ambiguous within {}".format(
+                        speaker_name, speaker_names
+                    )
+                )
+                return None
+
+        return self.hydrated_soco(matches[0][1])
+
+    @staticmethod
+    def hydrated_soco(device):
+        """Return the SoCo instance for a SonosDevice, pre-populated with the
+        device's name, visibility, UID and household ID."""
+        return hydrate(
+            soco.SoCo(device.ip_address),
+            player_name=device.speaker_name,
+            is_visible=device.is_visible,
+            uid=device.uid,
+            household_id=device.household_id,
+        )
 
     def get_all_speakers(self):
         soco_speakers = []
-        for speaker in self._speakers:
-            soco_speakers.append(soco.SoCo(speaker.ip_address))
+        for speaker in self.members():
+            soco_speakers.append(self.hydrated_soco(speaker))
         if soco_speakers:
             return soco_speakers
         return None
 
     def get_all_speaker_names(self, include_invisible=False):
         soco_speaker_names = []
-        for speaker in self._speakers:
+        for speaker in self.members():
             if speaker.is_visible:
                 soco_speaker_names.append(speaker.speaker_name)
         soco_speaker_names.sort()
@@ -326,6 +1030,9 @@ class Speakers:
             "Visibility",
             "SW Version",
         ]
+        # Imported here because it's slow to load, and only needed here
+        import tabulate  # type: ignore
+
         for household in households:
             print()
             print("Sonos Household: {}\n".format(household))
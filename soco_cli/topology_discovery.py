@@ -0,0 +1,222 @@
+"""Discovers Sonos households using the zone group topology.
+
+A single reachable speaker can supply the names, IP addresses, UIDs and
+visibility of every player in its household. Speakers are found from a
+list of 'seed' IP addresses (e.g., from a cache), and by collecting SSDP
+multicast responses from every household, and are then expanded to the
+full set of players in each household. This avoids a network scan in
+most cases.
+"""
+
+import ipaddress
+import logging
+import select
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from textwrap import dedent
+
+import ifaddr  # type: ignore
+import soco  # type: ignore
+
+MCAST_GRP = "239.255.255.250"
+MCAST_PORT = 1900
+
+PLAYER_SEARCH = dedent("""\
+    M-SEARCH * HTTP/1.1
+    HOST: 239.255.255.250:1900
+    MAN: "ssdp:discover"
+    MX: 1
+    ST: urn:schemas-upnp-org:device:ZonePlayer:1
+    """).encode("utf-8")
+
+# Once a player has responded, stop waiting for more responses after this
+# long without one
+QUIET_TIME = 0.25
+
+
+def find_ipv4_addresses():
+    """Return the set of IPv4 addresses of this host, excluding loopback
+    and link local addresses."""
+    addresses = set()
+    for adapter in ifaddr.get_adapters():
+        for adapter_ip in adapter.ips:
+            if not isinstance(adapter_ip.ip, str):
+                continue  # IPv6 addresses are tuples
+            ip_address = ipaddress.IPv4Address(adapter_ip.ip)
+            if not (ip_address.is_loopback or ip_address.is_link_local):
+                addresses.add(adapter_ip.ip)
+    return addresses
+
+
+def parse_ssdp_headers(data):
+    """Return the headers of an SSDP message as a dict with upper case keys,
+    or None if the message isn't from a Sonos player."""
+    if b"Sonos" not in data:
+        return None
+    headers = {}
+    for line in data.decode("utf-8", errors="replace").splitlines()[1:]:
+        key, _, value = line.partition(":")
+        if key.strip():
+            headers[key.strip().upper()] = value.strip()
+    return headers
+
+
+def parse_ssdp_response(data):
+    """Return the household ID from an SSDP response from a Sonos player,
+    or None if this isn't a Sonos player response."""
+    headers = parse_ssdp_headers(data)
+    if headers is None:
+        return None
+    return headers.get("X-RINCON-HOUSEHOLD")
+
+
+def find_households(timeout=1.0, quiet_time=QUIET_TIME, household=None):
+    """Find Sonos households using SSDP multicast. Unlike SoCo's discover(),
+    this waits for responses from every household, until no more arrive
+    within 'quiet_time' or the timeout is reached. If 'household' is given,
+    this returns as soon as a player in that household responds.
+
+    Returns:
+        dict: Maps each household ID to the list of IP addresses of the
+            players that responded.
+    """
+    sockets = []
+    for address in find_ipv4_addresses():
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+            sock.setsockopt(
+                socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(address)
+            )
+            # UDP is unreliable: send the search more than once
+            for _ in range(3):
+                sock.sendto(PLAYER_SEARCH, (MCAST_GRP, MCAST_PORT))
+            sockets.append(sock)
+        except OSError as e:
+            logging.info("Can't send multicast search from {}: {}".format(address, e))
+
+    households = {}
+    deadline = time.time() + timeout
+    try:
+        while sockets and time.time() < deadline:
+            ready, _, _ = select.select(
+                sockets,
+                [],
+                [],
+                max(0, min(deadline - time.time(), quiet_time if households else 0.1)),
+            )
+            if not ready and households:
+                logging.info("No more multicast responses: stopping")
+                break
+            for sock in ready:
+                data, addr = sock.recvfrom(1024)
+                household_id = parse_ssdp_response(data)
+                if household_id is None:
+                    continue
+                ip_addresses = households.setdefault(household_id, [])
+                if addr[0] not in ip_addresses:
+                    ip_addresses.append(addr[0])
+            if household is not None and household in households:
+                logging.info("Household '{}' responded: stopping".format(household))
+                break
+    finally:
+        for sock in sockets:
+            sock.close()
+
+    logging.info("Households found by multicast: {}".format(households))
+    return households
+
+
+def expand_topology(seed_ips, include_invisible=False):
+    """Read the zone group topology from the seed IP addresses, skipping
+    any seed whose household has already been read.
+
+    Returns:
+        set, list: The set of SoCo instances found, and the list of seed
+            IP addresses that didn't respond and were not found in the
+            topology of another seed.
+    """
+    zones = set()
+    covered = set()
+    failed = []
+    for ip_address in seed_ips:
+        if ip_address in covered:
+            continue
+        try:
+            speaker = soco.SoCo(ip_address)
+            all_zones = speaker.all_zones
+            zones.update(all_zones if include_invisible else speaker.visible_zones)
+            covered.update(zone.ip_address for zone in all_zones)
+            logging.info(
+                "Read topology of {} player(s) from {}".format(
+                    len(all_zones), ip_address
+                )
+            )
+        except Exception as e:
+            logging.info("Failed to read topology from {}: {}".format(ip_address, e))
+            failed.append(ip_address)
+    return zones, [ip_address for ip_address in failed if ip_address not in covered]
+
+
+def expand_households(households, include_invisible=False):
+    """Read the zone group topology of each household concurrently, using
+    the first of its IP addresses that responds.
+
+    Args:
+        households (dict): Maps household IDs to lists of IP addresses.
+
+    Returns:
+        set: The set of SoCo instances found.
+    """
+    if not households:
+        return set()
+
+    def expand(ip_addresses):
+        for ip_address in ip_addresses:
+            zones, unreachable = expand_topology([ip_address], include_invisible)
+            if not unreachable:
+                return zones
+        return set()
+
+    zones = set()
+    with ThreadPoolExecutor(max_workers=len(households)) as executor:
+        for household_zones in executor.map(expand, households.values()):
+            zones.update(household_zones)
+    return zones
+
+
+def topology_discover(
+    seed_ips=None, include_invisible=False, timeout=1.0, household=None
+):
+    """Find the players in every household from the zone group topology.
+
+    The seed IP addresses are tried first. A multicast census of households
+    is always taken as well, because the seeds may not cover every
+    household on the network (e.g., if they came from a discovery that
+    only found one household); each household not already covered by the
+    seeds is read from one of the players that responded. If 'household' is
+    given, the census stops once that household has responded.
+
+    Returns:
+        set: A set of SoCo instances, or None if no players were found, in
+            which case the caller should fall back to a network scan.
+    """
+    zones, _ = expand_topology(seed_ips or [], include_invisible)
+    logging.info("Finding households by multicast")
+    households = find_households(timeout=timeout, household=household)
+    known = {zone.ip_address for zone in zones}
+    zones.update(
+        expand_households(
+            {
+                household_id: ip_addresses
+                for household_id, ip_addresses in households.items()
+                if not known.intersection(ip_addresses)
+            },
+            include_invisible,
+        )
+    )
+    if not zones:
+        logging.info("No players found from topology")
+        return None
+    return zones
@@ -1,10 +1,11 @@
 import logging
-import re
+from collections import OrderedDict
 from datetime import datetime, timezone
 
 from soco import SoCo  # type: ignore
 
-from soco_cli.api import run_command
+from soco_cli.api import run_command, run_command_result
+from soco_cli.utils import pretty_print_values
 
 
 def track_follow(
@@ -24,7 +25,7 @@ def track_follow(
 
     This function operates as if 'outside' the main program logic, because
     it needs to output intermediate results as it executes. Hence, the
-    'run_command()' API call is used.
+    'run_command_result()' API call is used.
     """
 
     def timestamp(short=False):
@@ -38,7 +39,7 @@ def track_follow(
     print()
     while True:
         # If stopped, wait for the speaker to start playback
-        _, state, _ = run_command(
+        _, state, _ = run_command_result(
             speaker, "state", use_local_speaker_list=use_local_speaker_list
         )
         if state in [
@@ -68,30 +69,32 @@ def track_follow(
             logging.info("Speaker has started playback")
 
         # Print the track info
-        exit_code, output, error_msg = run_command(
+        exit_code, track, error_msg = run_command_result(
             speaker, "track", use_local_speaker_list=use_local_speaker_list
         )
         if exit_code == 0:
-            # Manipulate output
-            if "Using Line In" in output:
-                line_in = True
-                output = "   Playing from Line In\n"
-            else:
-                line_in = False
-                output = output.split("\n ", 1)[1]
+            line_in = track["line_in"]
+            details = track["details"]
             if not compact:
-                # Remove some of the line entries
-                output = re.sub(".*Playback.*\\n", "", output)
-                # output = re.sub(".*Elapsed.*\\n", "", output)
-                output = re.sub(".*URI.*\\n", "", output)
-                output = re.sub(".*Uri.*\\n", "", output)
-                # Prefix speaker name and timestamp
-                output = (
-                    " [{}] Playing at ".format(speaker.player_name)
-                    + timestamp()
-                    + ":\n"
-                    + output
+                print(
+                    " [{}] Playing at ".format(speaker.player_name) + timestamp() + ":"
                 )
+                if line_in:
+                    print("   Playing from Line In")
+                else:
+                    # Remove some of the entries, keeping the alignment of
+                    # the full list
+                    longest = max((len(key) for key in details), default=0)
+                    details = OrderedDict(
+                        (key, value)
+                        for key, value in details.items()
+                        if "URI" not in key and "Uri" not in key
+                    )
+                    spacing = (
+                        5 + longest - max((len(key) for key in details), default=0)
+                    )
+                    pretty_print_values(details, indent=3, spacing=spacing)
+                print()
             else:  # Compact (one line) output
                 if line_in:
                     output = "{:5d}: [{}] Playing from Line In".format(
@@ -100,30 +103,26 @@ def track_follow(
                 else:
                     # Ordering of keys determines output order
                     keys = [
-                        "Channel:",
-                        "Radio Show:",
-                        "Artist:",
-                        "Creator(s):",
-                        "Book Title:",
-                        "Chapter:",
-                        "Album:",
-                        "Podcast:",
-                        "Title:",
-                        "Episode:",
-                        "Release Date:",
-                        "Narrator(s):",
+                        "Channel",
+                        "Radio Show",
+                        "Artist",
+                        "Creator(s)",
+                        "Book Title",
+                        "Chapter",
+                        "Album",
+                        "Podcast",
+                        "Title",
+                        "Episode",
+                        "Release Date",
+                        "Narrator(s)",
                     ]
-                    elements = {}
-                    for line in output.splitlines():
-                        for key in keys:
-                            if key in line:
-                                elements[key] = line.replace(key, "").lstrip()
+                    elements = {key: details[key] for key in keys if key in details}
                     output = "{:5d}: [{}] ".format(counter, timestamp(short=True))
 
                     # Prune fields for audio books
-                    if "Book Title:" in elements:
-                        elements.pop("Title:", None)
-                        elements.pop("Narrator(s):", None)
+                    if "Book Title" in elements:
+                        elements.pop("Title", None)
+                        elements.pop("Narrator(s)", None)
                     first = True
                     for key in keys:
                         value = elements.pop(key, None)
@@ -132,8 +131,8 @@ def track_follow(
                                 output = output + "| "
                             else:
                                 first = False
-                            output = output + key + " " + value + " "
-            print(output)
+                            output = output + "{}: {} ".format(key, value)
+                print(output)
         else:
             error_out = "{:5d}: [{}] {}".format(
                 counter, timestamp(short=True), error_msg
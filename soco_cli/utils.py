@@ -5,21 +5,39 @@ import logging
 import os
 import pickle
 import signal
+import threading
 
 try:
     import readline
 except ImportError:
     pass
 import sys
+from collections import deque, namedtuple
 from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
 from platform import python_version
-from time import sleep
+from time import monotonic, sleep
 
 import soco  # type: ignore
+from requests.exceptions import RequestException  # type: ignore
+from soco.exceptions import SoCoException  # type: ignore
 
 from soco_cli.__init__ import __version__  # type: ignore
-from soco_cli.match_speaker_names import speaker_name_matches
-from soco_cli.speakers import Speakers
+from soco_cli.capabilities import has_capability
+from soco_cli.discovery_cache import DiscoveryCache
+from soco_cli.match_speaker_names import SpeakerNameIndex, normalise_speaker_name
+from soco_cli.neighbours import order_by_neighbours
+from soco_cli.output_capture import release_output
+from soco_cli.scan_timing import ScanTimings
+from soco_cli.speaker_metadata import hydrate, invalidate
+from soco_cli.speakers import (
+    Speakers,
+    find_ipv4_networks,
+    iter_open_ports,
+    iter_open_ports_adaptive,
+)
+from soco_cli.topology_discovery import topology_discover
 
 
 def event_unsubscribe(sub):
@@ -297,10 +315,9 @@ def sig_handler(signal_received, frame):
         logging.info("Signal handling suspended ... ignoring")
         return
 
-    # Restore stdout and stderr ... these have been redirected if
-    # api.run_command() was used
-    sys.stdout = sys.__stdout__
-    sys.stderr = sys.__stderr__
+    # Release stdout and stderr ... these are captured if api.run_command()
+    # was used
+    release_output()
 
     # Prevent SIGINT (CTRL-C) exit: untidy exit from readline can leave
     # some terminals in a broken state
@@ -431,29 +448,186 @@ def set_speaker_list(s):
     speaker_list = s
 
 
+# The maximum number of speakers whose household IDs are read at once
+HOUSEHOLD_THREADS = 16
+
+
+def _locked(method):
+    """Run a SpeakerCache method holding the cache's lock."""
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
 class SpeakerCache:
-    def __init__(self, max_threads=256, scan_timeout=0.1, min_netmask=24):
+    def __init__(
+        self,
+        max_threads=256,
+        scan_timeout=0.1,
+        min_netmask=24,
+        disk_cache_ttl=0,
+        neighbours_first=False,
+        stop_early=False,
+        adaptive_timeout=False,
+        negative_lookup_ttl=30.0,
+        household=None,
+    ):
+        # Held while the cache, its indexes or the failed lookups are read or
+        # changed, which can happen in several threads at once, e.g., when
+        # running an action on '_all_' speakers
+        self.lock = threading.RLock()
         # _cache contains (soco_instance, speaker_name) tuples
         self._cache = set()
+        # Name indexes of _cache, and of the visible zones of its households
+        self._index = None
+        self._indirect_index = None
+        # _cache partitioned by household ID, with the _cache object and
+        # size it was built from
+        self._partition = (None, 0, {})
+        # If set, lookups and '_all_' are restricted to this household
+        self._household = household
         self._scan_done = False
         self._discovery_done = False
+        self._topology_done = False
+        self._topology_found = False
         self._max_threads = max_threads
         self._scan_timeout = scan_timeout
         self._min_netmask = min_netmask
+        # Probe hosts in the neighbour table first, optionally stopping
+        # once speakers have been found among them
+        self._neighbours_first = neighbours_first
+        self._stop_early = stop_early
+        # Learn per-subnet timeouts, with 'scan_timeout' as the maximum
+        self._adaptive_timeout = adaptive_timeout
+        # Names that couldn't be found, mapped to the time at which the
+        # failure expires; disabled if the TTL is zero
+        self._negative_lookups = {}
+        self._negative_lookup_ttl = negative_lookup_ttl
+        # The on-disk cache is disabled if the TTL is zero
+        self._disk_cache = (
+            DiscoveryCache(ttl=disk_cache_ttl) if disk_cache_ttl else None
+        )
+        self._disk_cache_loaded = False
 
     @property
     def exists(self):
         return bool(self._cache)
 
+    @property
+    def household(self):
+        return self._household
+
+    @household.setter
+    def household(self, household_id):
+        with self.lock:
+            self._household = household_id
+            self._index = None
+            self._indirect_index = None
+            # The topology may only have been read for the previous household
+            self._topology_done = False
+            self.forget_failed_lookups()
+
+    @_locked
+    def households(self):
+        """Return a dict mapping each household ID to the set of cached
+        (speaker, speaker_name) entries in the household. Household IDs not
+        already known to SoCo are read from the speakers concurrently."""
+        source, size, partition = self._partition
+        if source is self._cache and size == len(self._cache):
+            return partition
+
+        def read_household(entry):
+            speaker, speaker_name = entry
+            try:
+                return speaker.household_id
+            except Exception as e:
+                logging.info("Can't read household of '{}': {}".format(speaker_name, e))
+                return None
+
+        entries = list(self._cache)
+        household_of = {}
+        unknown = []
+        for entry in entries:
+            # SoCo keeps the household ID once it's been read or seeded
+            household_id = getattr(entry[0], "_household_id", None)
+            if isinstance(household_id, str):
+                household_of[entry] = household_id
+            else:
+                unknown.append(entry)
+        if unknown:
+            with ThreadPoolExecutor(
+                max_workers=min(HOUSEHOLD_THREADS, len(unknown))
+            ) as executor:
+                household_of.update(zip(unknown, executor.map(read_household, unknown)))
+        partition = {}
+        for entry in entries:
+            partition.setdefault(household_of[entry], set()).add(entry)
+        logging.info(
+            "Speaker cache households: {}".format(
+                {
+                    household_id: len(members)
+                    for household_id, members in partition.items()
+                }
+            )
+        )
+        self._partition = (self._cache, len(self._cache), partition)
+        return partition
+
+    def members(self):
+        """The cached (speaker, speaker_name) entries in the selected
+        household, or all entries if no household is selected."""
+        if self._household is None:
+            return self._cache
+        return self.households().get(self._household, set())
+
+    @property
+    def negative_lookup_ttl(self):
+        return self._negative_lookup_ttl
+
+    @negative_lookup_ttl.setter
+    def negative_lookup_ttl(self, ttl):
+        self._negative_lookup_ttl = ttl
+
+    @_locked
+    def remember_failed_lookup(self, name):
+        if self._negative_lookup_ttl > 0:
+            self._negative_lookups[normalise_speaker_name(name)] = (
+                monotonic() + self._negative_lookup_ttl
+            )
+
+    @_locked
+    def lookup_recently_failed(self, name):
+        """Check whether a lookup of this name failed within the TTL."""
+        key = normalise_speaker_name(name)
+        expiry = self._negative_lookups.get(key)
+        if expiry is None:
+            return False
+        if monotonic() >= expiry:
+            del self._negative_lookups[key]
+            return False
+        return True
+
+    @_locked
+    def forget_failed_lookups(self):
+        self._negative_lookups = {}
+
+    @_locked
     def cache_speakers(self, speakers):
         logging.info("Adding speakers to cache: {}".format(speakers))
         for speaker in speakers:
             self._cache.add((speaker, speaker.player_name))
 
+    @_locked
     def discover(self, reset=False):
         if not self._discovery_done or reset:
             # Clear the current cache
             self._cache = set()
+            self.forget_failed_lookups()
+            invalidate()
             speakers = soco.discovery.discover(
                 allow_network_scan=True,
                 max_threads=self._max_threads,
@@ -462,17 +636,25 @@ class SpeakerCache:
             )
             if speakers:
                 self.cache_speakers(speakers)
+                self.save_disk_cache()
             else:
                 logging.info("No speakers found to cache")
             self._discovery_done = True
 
+    @_locked
     def scan(self, reset=False, scan_timeout_override=None):
         if not self._scan_done or reset:
             # Clear the current cache
             self._cache = set()
+            self.forget_failed_lookups()
+            invalidate()
             scan_timeout = (
                 scan_timeout_override if scan_timeout_override else self._scan_timeout
             )
+            if self._neighbours_first or self._adaptive_timeout:
+                for _ in self.iter_scan(scan_timeout_override=scan_timeout):
+                    pass
+                return
             logging.info(
                 "Performing full discovery scan with timeout = {}s".format(scan_timeout)
             )
@@ -484,81 +666,275 @@ class SpeakerCache:
             )
             if speakers:
                 self.cache_speakers(speakers)
+                self.save_disk_cache()
                 self._scan_done = True
             else:
                 logging.info("No speakers found to cache")
         else:
             logging.info("Full discovery scan already done, and reset not requested")
 
+    def iter_scan(self, scan_timeout_override=None):
+        """Scan the network, adding the visible speakers in each household to
+        the cache and yielding them as soon as a device in the household
+        responds. If the generator runs to completion the scan is marked as
+        done; if it's closed early, the cache holds what was found so far."""
+        self._cache = set()
+        scan_timeout = (
+            scan_timeout_override if scan_timeout_override else self._scan_timeout
+        )
+        ip_addresses = sorted(
+            str(ip_address)
+            for network in find_ipv4_networks(self._min_netmask)
+            for ip_address in network
+        )
+        logging.info(
+            "Performing streaming discovery scan of {} address(es) with timeout = {}s".format(
+                len(ip_addresses), scan_timeout
+            )
+        )
+        timings = ScanTimings()
+        if self._adaptive_timeout:
+            timings.load()
+        phases = [ip_addresses]
+        if self._neighbours_first:
+            phases = list(order_by_neighbours(ip_addresses))
+        covered = set()
+        for phase, phase_ip_addresses in enumerate(phases):
+            if phase > 0 and self._stop_early and self._cache:
+                logging.info("Speakers found among neighbours: stopping scan")
+                break
+            if self._adaptive_timeout:
+                open_ip_addresses = iter_open_ports_adaptive(
+                    phase_ip_addresses,
+                    timings,
+                    max_timeout=scan_timeout,
+                    max_threads=self._max_threads,
+                )
+            else:
+                open_ip_addresses = iter_open_ports(
+                    phase_ip_addresses,
+                    timeout=scan_timeout,
+                    max_threads=self._max_threads,
+                )
+            for ip_address in open_ip_addresses:
+                if ip_address in covered:
+                    continue
+                try:
+                    device = soco.SoCo(ip_address)
+                    covered.update(zone.ip_address for zone in device.all_zones)
+                    zones = device.visible_zones
+                except Exception as e:
+                    logging.info(
+                        "Device at {} is not a Sonos player: {}".format(ip_address, e)
+                    )
+                    continue
+                for zone in zones:
+                    if (zone, zone.player_name) not in self._cache:
+                        self.add(zone)
+                        yield zone
+        if self._adaptive_timeout:
+            timings.save()
+        if self._cache:
+            self.save_disk_cache()
+            self._scan_done = True
+        else:
+            logging.info("No speakers found to cache")
+
+    @_locked
+    def scan_for(self, name):
+        """Scan the network for a speaker by name, stopping as soon as an
+        exact match is found. If there's no exact match, the name is matched
+        against all the speakers found."""
+        if self._scan_done:
+            logging.info("Full discovery scan already done")
+            return self.find(name)
+        target = normalise_speaker_name(name)
+        speakers = self.iter_scan()
+        try:
+            for speaker in speakers:
+                if normalise_speaker_name(speaker.player_name) == target:
+                    logging.info(
+                        "Found '{}' at {}: stopping scan".format(
+                            speaker.player_name, speaker.ip_address
+                        )
+                    )
+                    return speaker
+        finally:
+            speakers.close()
+        return self.find(name)
+
+    @_locked
+    def discover_topology(self, reset=False):
+        """Find the speakers in all households from the zone group topology,
+        seeded by the speakers already in the cache (including the on-disk
+        cache) and by multicast. Returns False if no speakers were found."""
+        if not self._topology_done or reset:
+            self.load_disk_cache()
+            seed_ips = sorted(speaker.ip_address for speaker, _ in self._cache)
+            # A selected household's members are all that's needed
+            speakers = topology_discover(seed_ips=seed_ips, household=self._household)
+            if speakers:
+                self._cache = set()
+                self.cache_speakers(speakers)
+                self.save_disk_cache()
+            else:
+                logging.info("No speakers found from topology")
+            self._topology_done = True
+            self._topology_found = bool(speakers)
+        return self._topology_found
+
+    def discover_all(self):
+        """Find the speakers in all households, using the topology if
+        possible and falling back to a full network scan."""
+        if not self.discover_topology():
+            self.scan()
+
+    @_locked
     def add(self, speaker):
         logging.info("Adding speaker to cache")
         self._cache.add((speaker, speaker.player_name))
 
+    @_locked
+    def load_disk_cache(self):
+        """Populate the cache from the on-disk discovery cache, if it's
+        enabled and fresh. Only attempted once. Every cached speaker is
+        verified first, and if any is no longer at its cached IP address
+        the on-disk cache is discarded, keeping only the verified speakers.
+        Returns True if any speakers were loaded."""
+        if self._disk_cache is None or self._disk_cache_loaded:
+            return False
+        self._disk_cache_loaded = True
+        records = self._disk_cache.load()
+        if not records:
+            return False
+        verified = self._disk_cache.verify(records)
+        if len(verified) < len(records):
+            logging.info(
+                "{} of {} cached speaker(s) failed verification".format(
+                    len(records) - len(verified), len(records)
+                )
+            )
+            self._disk_cache.remove()
+        for ip_address, speaker_name, uid in verified:
+            speaker = hydrate(soco.SoCo(ip_address), player_name=speaker_name, uid=uid)
+            self._cache.add((speaker, speaker_name))
+        return bool(verified)
+
+    @_locked
+    def save_disk_cache(self):
+        if self._disk_cache is None or not self._cache:
+            return False
+        records = []
+        for speaker, speaker_name in self._cache:
+            try:
+                records.append((speaker.ip_address, speaker_name, speaker.uid))
+            except Exception as e:
+                logging.info("Can't read UID of '{}': {}".format(speaker_name, e))
+        return self._disk_cache.save(records)
+
+    @_locked
+    def _name_index(self):
+        if self._index is None or not self._index.indexes(self._cache):
+            self._index = SpeakerNameIndex(
+                ((speaker_name, speaker) for speaker, speaker_name in self.members()),
+                source=self._cache,
+            )
+        return self._index
+
+    @_locked
+    def _indirect_name_index(self):
+        """Index the visible zones of the households of the cached speakers,
+        reading the topology once per household."""
+        if self._indirect_index is None or not self._indirect_index.indexes(
+            self._cache
+        ):
+            zones = set()
+            for cached, speaker_name in self.members():
+                if cached in zones:
+                    continue
+                try:
+                    zones.update(cached.visible_zones)
+                except (RequestException, SoCoException, OSError) as e:
+                    logging.info(
+                        "Can't read topology from '{}': {}".format(speaker_name, e)
+                    )
+            self._indirect_index = SpeakerNameIndex(
+                ((zone.player_name, zone) for zone in zones), source=self._cache
+            )
+        return self._indirect_index
+
+    @_locked
     def find_indirect(self, name):
-        speakers_found = set()
-        speakers_found_names = set()
-        for cached, _ in self._cache:
-            for speaker in cached.visible_zones:
-                match, exact = speaker_name_matches(name, speaker.player_name)
-                if match and exact:
-                    return speaker
-                if match and not exact:
-                    speakers_found.add(speaker)
-                    speakers_found_names.add(speaker.player_name)
+        matches, exact = self._indirect_name_index().match(name)
+        if exact:
+            return matches[0][1]
 
+        speakers_found = {speaker for _, speaker in matches}
         if len(speakers_found) == 1:
             return speakers_found.pop()
 
         if len(speakers_found) > 1:
-            error_report("'{}' is ambiguous: {}".format(name, speakers_found_names))
+            error_report(
+                "'{}' is ambiguous: {}".format(
+                    name, {speaker_name for speaker_name, _ in matches}
+                )
+            )
 
         return None
 
+    @_locked
     def find(self, name):
-        speakers_found = set()
-        speakers_found_names = set()
-        for speaker, speaker_name in self._cache:
-            match, exact = speaker_name_matches(name, speaker_name)
-            if match and exact:
-                return speaker
-            if match and not exact:
-                speakers_found.add(speaker)
-                speakers_found_names.add(speaker_name)
+        matches, exact = self._name_index().match(name)
+        if exact:
+            return hydrate(matches[0][1], player_name=matches[0][0])
 
+        speakers_found = {speaker for _, speaker in matches}
         if len(speakers_found) == 1:
-            return speakers_found.pop()
+            return hydrate(matches[0][1], player_name=matches[0][0])
 
         if len(speakers_found) > 1:
             error_report(
                 "Speaker name '{}' is ambiguous within {}".format(
-                    name, speakers_found_names
+                    name, {speaker_name for speaker_name, _ in matches}
                 )
             )
 
         return None
 
+    @_locked
     def get_all_speakers(self, use_scan=False):
         if use_scan:
-            self.scan()
+            self.discover_all()
         else:
             self.discover()
-        return self._cache
+        # A copy, which other threads can't change while it's in use
+        members = set(self.members())
+        for speaker, speaker_name in members:
+            hydrate(speaker, player_name=speaker_name)
+        return members
 
+    @_locked
     def get_all_speaker_names(self, use_scan=False):
         if use_scan:
-            self.scan()
+            self.discover_all()
         else:
             self.discover()
-        names = [speaker[1] for speaker in self._cache]
+        names = [speaker[1] for speaker in self.members()]
         names.sort()
         return names
 
+    @_locked
     def rename_speaker(self, old_name, new_name):
         for speaker in self._cache:
             if speaker[1] == old_name:
                 logging.info("Updating speaker cache with new name")
                 self._cache.remove(speaker)
                 self._cache.add((speaker[0], new_name))
+                invalidate(speaker[0].ip_address)
+                self._index = None
+                self._indirect_index = None
+                self._partition = (None, 0, {})
+                self.save_disk_cache()
                 return True
         logging.info("Speaker with name '{}' not found".format(old_name))
         return False
@@ -568,10 +944,28 @@ SPKR_CACHE = None
 
 
 # Single instance of the speaker cache
-def create_speaker_cache(max_threads=256, scan_timeout=1.0, min_netmask=24):
+def create_speaker_cache(
+    max_threads=256,
+    scan_timeout=1.0,
+    min_netmask=24,
+    disk_cache_ttl=0,
+    neighbours_first=False,
+    stop_early=False,
+    adaptive_timeout=False,
+    negative_lookup_ttl=30.0,
+    household=None,
+):
     global SPKR_CACHE
     SPKR_CACHE = SpeakerCache(
-        max_threads=max_threads, scan_timeout=scan_timeout, min_netmask=min_netmask
+        max_threads=max_threads,
+        scan_timeout=scan_timeout,
+        min_netmask=min_netmask,
+        disk_cache_ttl=disk_cache_ttl,
+        neighbours_first=neighbours_first,
+        stop_early=stop_early,
+        adaptive_timeout=adaptive_timeout,
+        negative_lookup_ttl=negative_lookup_ttl,
+        household=household,
     )
 
 
@@ -585,39 +979,164 @@ def local_speaker_list():
     return speaker_list
 
 
+# Strategies used by get_speaker(), recorded in SpeakerLookup records
+LOOKUP_IP_ADDRESS = "ip_address"
+LOOKUP_LOCAL_LIST = "local_list"
+LOOKUP_NEGATIVE_CACHE = "negative_cache"
+LOOKUP_DIRECT = "direct"
+LOOKUP_DISK_CACHE = "disk_cache"
+LOOKUP_INDIRECT = "indirect"
+LOOKUP_DISCOVERY = "discovery"
+LOOKUP_TOPOLOGY = "topology"
+LOOKUP_SCAN = "scan"
+
+# Record of a speaker lookup: the strategy that found the speaker (None if
+# it wasn't found), the total time taken, and a list of (strategy, seconds)
+# tuples for each strategy tried
+SpeakerLookup = namedtuple(
+    "SpeakerLookup", ["name", "strategy", "duration", "timings"], rename=False
+)
+
+# The most recent speaker lookups
+speaker_lookups = deque(maxlen=100)
+
+
+def get_speaker_lookups():
+    """Return a list of SpeakerLookup records for recent lookups, oldest
+    first."""
+    return list(speaker_lookups)
+
+
+def clear_speaker_lookups():
+    speaker_lookups.clear()
+
+
+def _disk_cache_lookup(name):
+    # The speakers loaded from the disk cache have all been verified
+    if not SPKR_CACHE.load_disk_cache():
+        return None
+    return SPKR_CACHE.find(name)
+
+
+def _discovery_lookup(name):
+    SPKR_CACHE.discover()
+    return SPKR_CACHE.find(name)
+
+
+def _topology_lookup(name):
+    if SPKR_CACHE.discover_topology():
+        return SPKR_CACHE.find(name)
+    return None
+
+
+# Discovery lookup strategies, in order of expense
+LOOKUP_STRATEGIES = [
+    (LOOKUP_DIRECT, "Trying direct cache lookup", lambda name: SPKR_CACHE.find(name)),
+    (
+        LOOKUP_DISK_CACHE,
+        "Trying on-disk discovery cache lookup",
+        _disk_cache_lookup,
+    ),
+    (
+        LOOKUP_INDIRECT,
+        "Trying indirect cache lookup",
+        lambda name: SPKR_CACHE.find_indirect(name),
+    ),
+    (
+        LOOKUP_DISCOVERY,
+        "Trying standard discovery with network scan fallback",
+        _discovery_lookup,
+    ),
+    (
+        LOOKUP_TOPOLOGY,
+        "Trying topology discovery across all households",
+        _topology_lookup,
+    ),
+    (
+        LOOKUP_SCAN,
+        "Trying streaming network scan discovery",
+        lambda name: SPKR_CACHE.scan_for(name),
+    ),
+]
+
+
+def _record_lookup(name, strategy, start, timings):
+    lookup = SpeakerLookup(name, strategy, monotonic() - start, timings)
+    speaker_lookups.append(lookup)
+    logging.info(
+        "Lookup of '{}' {} in {:.3f}s: {}".format(
+            name,
+            "resolved by '{}'".format(strategy) if strategy else "failed",
+            lookup.duration,
+            ", ".join(
+                "{} {:.3f}s".format(strategy, seconds) for strategy, seconds in timings
+            ),
+        )
+    )
+
+
 def get_speaker(name, local=False):
+    start = monotonic()
+
     # Use an IP address
     # (Allow the use of an IP address even if 'local' is specified)
     if Speakers.is_ipv4_address(name):
         logging.info("Using IP address instead of speaker name")
+        _record_lookup(name, LOOKUP_IP_ADDRESS, start, [])
         return soco.SoCo(name)
 
     # Use the local speaker list
     if local:
         logging.info("Using local speaker list")
-        return speaker_list.find(name)
+        speaker = speaker_list.find(name)
+        _record_lookup(
+            name,
+            LOOKUP_LOCAL_LIST if speaker else None,
+            start,
+            [(LOOKUP_LOCAL_LIST, monotonic() - start)],
+        )
+        return speaker
+
+    # Lookups in concurrent threads take turns, so that each sees the
+    # speakers found by the others rather than repeating the search
+    with SPKR_CACHE.lock:
+        return _cache_lookup(name, start)
+
+
+def _cache_lookup(name, start):
+    # Don't repeat all the strategies for a name that recently failed
+    if SPKR_CACHE.lookup_recently_failed(name):
+        logging.info("Lookup of '{}' failed recently: not retrying".format(name))
+        _record_lookup(name, None, start, [(LOOKUP_NEGATIVE_CACHE, 0.0)])
+        return None
 
     # Use discovery
     # Try various lookup methods in order of expense,
     # and cache results where possible
-    logging.info("Trying direct cache lookup")
-    speaker = SPKR_CACHE.find(name)
-    if not speaker:
-        logging.info("Trying indirect cache lookup")
-        speaker = SPKR_CACHE.find_indirect(name)
-    if not speaker:
-        logging.info("Trying standard discovery with network scan fallback")
-        SPKR_CACHE.discover()
-        speaker = SPKR_CACHE.find(name)
-    if not speaker:
-        logging.info("Trying network scan discovery")
-        SPKR_CACHE.scan()
-        speaker = SPKR_CACHE.find(name)
-    if speaker:
-        logging.info("Successful speaker discovery")
-    else:
-        logging.info("Failed to discover speaker")
-    return speaker
+    timings = []
+    for strategy, message, lookup in LOOKUP_STRATEGIES:
+        logging.info(message)
+        strategy_start = monotonic()
+        speaker = lookup(name)
+        timings.append((strategy, monotonic() - strategy_start))
+        if speaker:
+            logging.info("Successful speaker discovery")
+            _record_lookup(name, strategy, start, timings)
+            return speaker
+
+    logging.info("Failed to discover speaker")
+    SPKR_CACHE.remember_failed_lookup(name)
+    _record_lookup(name, None, start, timings)
+    return None
+
+
+def is_sub(speaker):
+    """Check whether a speaker is a Sub, using its capability profile if
+    available."""
+    sub = has_capability(speaker, "is_sub")
+    if sub is None:
+        sub = "sub" in speaker.get_speaker_info()["model_name"].lower()
+    return sub
 
 
 def get_right_hand_speaker(left_hand_speaker):
@@ -629,12 +1148,13 @@ def get_right_hand_speaker(left_hand_speaker):
         return None
 
     # Find the speaker which is not visible, for which the
-    # left-hand speaker is the coordinator, and not a Sub
+    # left-hand speaker is the coordinator, and not a Sub (using the cached
+    # capability profile, to avoid fetching each zone's speaker info)
     for rh_speaker in left_hand_speaker.all_zones:
         if (
             rh_speaker.group.coordinator.ip_address == left_hand_speaker.ip_address
             and not rh_speaker.is_visible
-            and "sub" not in rh_speaker.get_speaker_info()["model_name"].lower()
+            and not is_sub(rh_speaker)
         ):
             logging.info(
                 "Found right-hand speaker: {} / {}".format(
@@ -677,6 +1197,36 @@ def configure_common_args(parser):
         default=24,
         help="Minimum netmask for Sonos device scan (integer 0-32)",
     )
+    parser.add_argument(
+        "--neighbours-first",
+        "--neighbours_first",
+        action="store_true",
+        default=False,
+        help=(
+            "When scanning the network, probe hosts in the neighbour (ARP) table"
+            " first, starting with those with Sonos MAC addresses (Linux only)"
+        ),
+    )
+    parser.add_argument(
+        "--stop-early",
+        "--stop_early",
+        action="store_true",
+        default=False,
+        help=(
+            "With '--neighbours-first', stop scanning if speakers are found among"
+            " the neighbours"
+        ),
+    )
+    parser.add_argument(
+        "--adaptive-timeout",
+        "--adaptive_timeout",
+        action="store_true",
+        default=False,
+        help=(
+            "Learn network scan timeouts for each subnet from the responses received,"
+            " using the network discovery timeout as the maximum"
+        ),
+    )
     parser.add_argument(
         "--version",
         "-v",
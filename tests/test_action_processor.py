@@ -5,7 +5,7 @@ that can be exercised without a live Sonos network.
 """
 
 from collections import OrderedDict
-from unittest.mock import MagicMock, call, patch
+from unittest.mock import MagicMock, PropertyMock, call, patch
 
 import pytest
 
@@ -15,9 +15,12 @@ from soco_cli.action_processor import (
     _is_queue_position,
     add_favourite_to_queue,
     audio_format,
+    battery,
     filter_track_info,
     get_actions,
     get_current_queue_position,
+    info,
+    line_in,
     list_queue,
     mic_enabled,
     on_off_action,
@@ -32,11 +35,14 @@ from soco_cli.action_processor import (
     set_queue_position,
     shuffle,
     sleep_timer,
+    speaker_parameters,
     surround_volume,
     switch_to_tv,
     tv_audio_delay,
     volume_actions,
 )
+from soco_cli.output_capture import capture_result
+from soco_cli.read_cache import read_cache_scope
 
 # ---------------------------------------------------------------------------
 # Autouse fixture: run every test in API mode so error_report never calls
@@ -1168,3 +1174,288 @@ class TestProcessAction:
             process_action(speaker, "coord_action", [])
         called_speaker = mock_fn.call_args[0][0]
         assert called_speaker is speaker
+
+
+# ===========================================================================
+# Capability checks
+# ===========================================================================
+
+
+class TestCapabilityChecks:
+    def test_battery_not_fitted(self, capsys):
+        speaker = _make_speaker(player_name="Kitchen")
+        with patch("soco_cli.action_processor.has_capability", return_value=False):
+            assert _call(battery, speaker, []) is False
+        speaker.get_battery_info.assert_not_called()
+        assert "not supported" in capsys.readouterr().err
+
+    def test_battery_unknown_capability_tries_speaker(self, capsys):
+        speaker = _make_speaker(player_name="Kitchen")
+        speaker.get_battery_info.return_value = {"Level": 50}
+        with patch("soco_cli.action_processor.has_capability", return_value=None):
+            assert _call(battery, speaker, []) is True
+        assert "50%" in capsys.readouterr().out
+
+    def test_line_in_not_fitted(self, capsys):
+        speaker = _make_speaker(player_name="Kitchen")
+        with patch("soco_cli.action_processor.has_capability", return_value=False):
+            assert _call(line_in, speaker, ["on"]) is False
+        speaker.switch_to_line_in.assert_not_called()
+        assert "no Line-In" in capsys.readouterr().err
+
+
+class TestCapabilityCheckCalls:
+    """Capability prechecks mustn't add a round trip to a cold speaker."""
+
+    @pytest.fixture
+    def cold_speaker(self):
+        # Reading anything not listed here fails the test
+        speaker = MagicMock(
+            spec=[
+                "_uid",
+                "player_name",
+                "get_battery_info",
+                "get_speaker_info",
+                "switch_to_line_in",
+                "play",
+            ]
+        )
+        speaker._uid = None
+        speaker.player_name = "Kitchen"
+        return speaker
+
+    def test_battery(self, cold_speaker):
+        cold_speaker.get_battery_info.return_value = {"Level": 50}
+        assert _call(battery, cold_speaker, []) is True
+        assert cold_speaker.mock_calls == [call.get_battery_info()]
+
+    def test_line_in(self, cold_speaker):
+        assert _call(line_in, cold_speaker, ["on"]) is True
+        assert cold_speaker.mock_calls == [call.switch_to_line_in(), call.play()]
+
+    def test_info(self, cold_speaker):
+        cold_speaker.get_speaker_info.return_value = {
+            "uid": "RINCON_1",
+            "model_name": "Sonos Boost",
+        }
+        with patch("soco_cli.action_processor.read_properties") as read_properties:
+            assert _call(info, cold_speaker, []) is True
+        assert cold_speaker.mock_calls == [call.get_speaker_info(refresh=True)]
+        read_properties.assert_not_called()
+
+
+# ===========================================================================
+# Structured results
+# ===========================================================================
+
+
+class TestStructuredResults:
+    def test_volume_value(self, capsys):
+        speaker = _make_speaker(volume=25)
+        with capture_result() as result:
+            assert volume_actions(speaker, "volume", [], "volume", False) is True
+        assert result.value == 25
+        assert capsys.readouterr().out == ""
+
+    def test_volume_text_when_not_capturing(self, capsys):
+        speaker = _make_speaker(volume=25)
+        volume_actions(speaker, "volume", [], "volume", False)
+        assert capsys.readouterr().out == "25\n"
+
+    def test_on_off_value(self):
+        speaker = _make_speaker(mute=True)
+        with capture_result() as result:
+            on_off_action(speaker, "mute", [], "mute", False)
+        assert result.value is True
+
+    def test_transport_state_value(self):
+        speaker = _make_speaker()
+        speaker.get_current_transport_info.return_value = {
+            "current_transport_state": "PLAYING"
+        }
+        with capture_result() as result:
+            process_action(speaker, "state", [])
+        assert result.value == "PLAYING"
+
+    def test_list_queue_value(self, capsys):
+        speaker = _make_speaker()
+        speaker.get_queue.return_value = [
+            _make_track("One", "Bach", "Organ Works"),
+            _make_track("Two", "Bach", "Organ Works"),
+        ]
+        with patch(
+            "soco_cli.action_processor.get_current_queue_position",
+            return_value=(2, True),
+        ):
+            with capture_result() as result:
+                list_queue(speaker, "list_queue", [], "", False)
+        assert [track["title"] for track in result.value] == ["One", "Two"]
+        assert result.value[0]["artist"] == "Bach"
+        assert result.value[1]["current"] is True
+        assert result.value[1]["playing"] is True
+        assert result.value[0]["current"] is False
+        assert capsys.readouterr().out == ""
+
+    def test_empty_queue_value(self):
+        speaker = _make_speaker()
+        speaker.get_queue.return_value = []
+        with capture_result() as result:
+            list_queue(speaker, "list_queue", [], "", False)
+        assert result.value == []
+
+    def test_single_queue_track_numbered(self):
+        speaker = _make_speaker()
+        speaker.get_queue.return_value = [_make_track("T{}".format(i)) for i in "123"]
+        with patch(
+            "soco_cli.action_processor.get_current_queue_position",
+            return_value=(1, False),
+        ):
+            with capture_result() as result:
+                list_queue(speaker, "list_queue", ["3"], "", False)
+        assert len(result.value) == 1
+        assert result.value[0]["number"] == 3
+        assert result.value[0]["title"] == "T3"
+
+    def test_track_line_in_value(self):
+        speaker = _make_speaker(is_playing_line_in=True)
+        speaker.get_current_transport_info.return_value = {
+            "current_transport_state": "PLAYING"
+        }
+        with capture_result() as result:
+            process_action(speaker, "track", [])
+        assert result.value["line_in"] is True
+        assert result.value["state"] == "PLAYING"
+
+    def test_track_line_in_text(self, capsys):
+        speaker = _make_speaker(is_playing_line_in=True)
+        speaker.get_current_transport_info.return_value = {
+            "current_transport_state": "PLAYING"
+        }
+        process_action(speaker, "track", [])
+        assert capsys.readouterr().out == "Using Line In (state: PLAYING)\n"
+
+    def test_text_capture_inside_structured_capture(self, capsys):
+        speaker = _make_speaker(volume=25)
+        with capture_result() as outer:
+            with capture_result(structured=False):
+                volume_actions(speaker, "volume", [], "volume", False)
+        assert not outer.emitted
+        assert capsys.readouterr().out == "25\n"
+
+
+# ===========================================================================
+# get
+# ===========================================================================
+
+
+class TestGetProperties:
+    def _speaker(self):
+        speaker = _make_speaker(volume=30, mute=True, is_coordinator=True)
+        speaker.get_current_transport_info.return_value = {
+            "current_transport_state": "PLAYING"
+        }
+        return speaker
+
+    def test_single_property(self, capsys):
+        assert process_action(self._speaker(), "get", ["volume"]) is True
+        assert capsys.readouterr().out == "30\n"
+
+    def test_multiple_properties(self, capsys):
+        assert process_action(self._speaker(), "get", ["volume,mute,state"]) is True
+        assert capsys.readouterr().out == (
+            "  volume = 30\n  mute = True\n  state = PLAYING\n"
+        )
+
+    def test_structured_result(self):
+        with capture_result() as result:
+            process_action(self._speaker(), "get", ["volume", "STATE,volume"])
+        assert list(result.value.items()) == [("volume", 30), ("state", "PLAYING")]
+
+    def test_unknown_property(self, capsys):
+        assert process_action(self._speaker(), "get", ["volume,colour"]) is False
+        assert "colour" in capsys.readouterr().err
+
+    def test_no_parameters(self):
+        assert process_action(self._speaker(), "get", []) is False
+
+
+# ===========================================================================
+# Read caching
+# ===========================================================================
+
+
+class TestReadCaching:
+    def _speaker(self):
+        speaker = _make_speaker(ip_address="192.168.1.10")
+        is_coordinator = PropertyMock(return_value=True)
+        type(speaker).is_coordinator = is_coordinator
+        speaker.get_current_transport_info.return_value = {
+            "current_transport_state": "PLAYING"
+        }
+        return speaker, is_coordinator
+
+    def test_coordinator_cached_across_read_only_actions(self):
+        speaker, is_coordinator = self._speaker()
+        with read_cache_scope():
+            process_action(speaker, "state", [])
+            process_action(speaker, "state", [])
+        assert is_coordinator.call_count == 1
+
+    def test_coordinator_reread_after_write(self):
+        speaker, is_coordinator = self._speaker()
+        with read_cache_scope():
+            process_action(speaker, "state", [])
+            process_action(speaker, "pause", [])
+            process_action(speaker, "state", [])
+        # 'pause' reuses the cached value, then clears the cache
+        assert is_coordinator.call_count == 2
+
+    def test_queue_search_results_reads_queue_size_once_per_item(self, capsys):
+        speaker, _ = self._speaker()
+        sizes = iter([0, 10, 20, 30])
+        queue_size = PropertyMock(side_effect=lambda: next(sizes))
+        type(speaker).queue_size = queue_size
+        items = [MagicMock() for _ in range(3)]
+        with patch("soco_cli.action_processor.read_search", return_value=items):
+            assert process_action(speaker, "queue_search_results", ["1-3"]) is True
+        assert queue_size.call_count == 3
+        positions = [c[0][1] for c in speaker.add_to_queue.call_args_list]
+        assert positions == [1, 11, 21]
+        assert capsys.readouterr().out == "1\n"
+
+
+# ===========================================================================
+# Speaker names in action parameters
+# ===========================================================================
+
+
+class TestSpeakerParameters:
+    @pytest.mark.parametrize(
+        "action, args, names",
+        [
+            ("group", ["Kitchen"], ["Kitchen"]),
+            ("pair", ["Right"], ["Right"]),
+            ("transfer", ["Study"], ["Study"]),
+            ("multi_group", ["Study", "Lounge"], ["Study", "Lounge"]),
+            ("add_satellites", ["Left", "Right"], ["Left", "Right"]),
+            ("line_in", ["Lounge", "right_input"], ["Lounge"]),
+            ("cue_line_in", ["Lounge"], ["Lounge"]),
+        ],
+    )
+    def test_speaker_names_found(self, action, args, names):
+        assert speaker_parameters(action, args) == names
+
+    @pytest.mark.parametrize(
+        "action, args",
+        [
+            ("line_in", []),
+            ("line_in", ["on"]),
+            ("line_in", ["right_input"]),
+            ("cue_line_in", ["OFF"]),
+            ("group", []),
+            ("volume", ["30"]),
+            ("no_such_action", ["Kitchen"]),
+        ],
+    )
+    def test_no_speaker_names(self, action, args):
+        assert speaker_parameters(action, args) == []
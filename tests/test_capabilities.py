@@ -0,0 +1,171 @@
+"""Tests for capabilities.py."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+import soco_cli.capabilities as capabilities
+from soco_cli.capabilities import (
+    CapabilityCache,
+    create_profile,
+    get_capabilities,
+    has_capability,
+)
+
+
+def _speaker_info(model_name, uid="RINCON_1"):
+    return {
+        "uid": uid,
+        "zone_name": "Kitchen",
+        "model_name": model_name,
+        "model_number": "S1",
+        "hardware_version": "1.0",
+        "software_version": "80.1",
+        "display_version": "16.0",
+    }
+
+
+@pytest.fixture
+def cache(tmp_path):
+    original = capabilities.CAPABILITY_CACHE
+    cache = CapabilityCache(save_directory=str(tmp_path) + "/")
+    capabilities.set_capability_cache(cache)
+    yield cache
+    capabilities.set_capability_cache(original)
+
+
+def _make_speaker(model_name="Sonos One", uid="RINCON_1"):
+    speaker = MagicMock()
+    speaker.uid = uid
+    speaker.speaker_info = {}
+    speaker._is_soundbar = None
+    speaker.get_speaker_info.return_value = _speaker_info(model_name, uid)
+    return speaker
+
+
+# ----------------------------------------------------------------------------
+# Profiles
+
+
+class TestCreateProfile:
+    def test_soundbar(self):
+        profile = create_profile(_speaker_info("Sonos Arc"))
+        assert profile.is_soundbar and profile.has_tv and profile.supports_satellites
+        assert not profile.has_line_in
+        assert not profile.is_sub
+
+    def test_sub(self):
+        profile = create_profile(_speaker_info("Sonos Sub Mini"))
+        assert profile.is_sub
+        assert not profile.is_soundbar
+
+    def test_battery(self):
+        assert create_profile(_speaker_info("Sonos Roam")).has_battery
+        assert not create_profile(_speaker_info("Sonos Five")).has_battery
+
+    def test_line_in(self):
+        assert create_profile(_speaker_info("Sonos Five")).has_line_in
+        assert not create_profile(_speaker_info("Sonos One")).has_line_in
+
+    def test_unknown_model_assumed_to_have_line_in(self):
+        assert create_profile(_speaker_info("Sonos Future")).has_line_in
+
+    def test_infrastructure(self):
+        assert create_profile(_speaker_info("Sonos Boost")).is_infrastructure
+        assert not create_profile(_speaker_info("Sonos One")).is_infrastructure
+
+    def test_no_model_name(self):
+        with pytest.raises(ValueError):
+            create_profile({"uid": "RINCON_1", "model_name": None})
+
+
+# ----------------------------------------------------------------------------
+# Cache
+
+
+class TestCapabilityCache:
+    def test_record_and_get(self, cache):
+        profile = cache.record(_speaker_info("Sonos One"))
+        assert cache.get("RINCON_1") == profile
+        assert cache.get("RINCON_2") is None
+
+    def test_save_and_load(self, cache, tmp_path):
+        cache.record(_speaker_info("Sonos One"))
+        assert cache.save()
+        reloaded = CapabilityCache(save_directory=str(tmp_path) + "/")
+        assert reloaded.get("RINCON_1").model_name == "Sonos One"
+
+    def test_save_only_when_changed(self, cache):
+        assert not cache.save()
+        cache.record(_speaker_info("Sonos One"))
+        assert cache.save()
+        cache.record(_speaker_info("Sonos One"))
+        assert not cache.save()
+
+    def test_forget(self, cache):
+        cache.record(_speaker_info("Sonos One"))
+        cache.forget("RINCON_1")
+        assert cache.get("RINCON_1") is None
+
+
+# ----------------------------------------------------------------------------
+# Applying profiles to SoCo instances
+
+
+class TestGetCapabilities:
+    def test_profiled_once(self, cache):
+        speaker = _make_speaker("Sonos Arc")
+        assert get_capabilities(speaker).is_soundbar
+        other = _make_speaker("Sonos Arc")
+        assert get_capabilities(other).is_soundbar
+        other.get_speaker_info.assert_not_called()
+
+    def test_soundbar_check_prepopulated(self, cache):
+        cache.record(_speaker_info("Sonos Arc"))
+        speaker = _make_speaker("Sonos Arc")
+        get_capabilities(speaker)
+        assert speaker._is_soundbar is True
+        speaker.get_speaker_info.assert_not_called()
+
+    def test_changeable_details_not_saved(self, cache):
+        profile = cache.record(_speaker_info("Sonos Arc"))
+        speaker = _make_speaker("Sonos Arc")
+        get_capabilities(speaker)
+        assert speaker.speaker_info == {}
+        assert not hasattr(profile, "speaker_info")
+
+    def test_existing_speaker_info_kept(self, cache):
+        cache.record(_speaker_info("Sonos Arc"))
+        speaker = _make_speaker("Sonos Arc")
+        speaker.speaker_info = {"model_name": "Sonos Arc", "zone_name": "Lounge"}
+        get_capabilities(speaker)
+        assert speaker.speaker_info["zone_name"] == "Lounge"
+
+    def test_unreachable_speaker(self, cache):
+        speaker = _make_speaker()
+        speaker.get_speaker_info.side_effect = OSError()
+        assert get_capabilities(speaker) is None
+        assert has_capability(speaker, "has_battery") is None
+
+    def test_has_capability(self, cache):
+        assert has_capability(_make_speaker("Sonos Move"), "has_battery") is True
+
+    def test_local_only_uses_known_uid(self, cache):
+        cache.record(_speaker_info("Sonos Move"))
+        speaker = _make_speaker("Sonos Move")
+        speaker._uid = "RINCON_1"
+        assert has_capability(speaker, "has_battery", local_only=True) is True
+        speaker.get_speaker_info.assert_not_called()
+
+    def test_local_only_unknown_uid(self, cache):
+        cache.record(_speaker_info("Sonos Move"))
+        speaker = MagicMock(spec=["_uid", "get_speaker_info"])
+        speaker._uid = None
+        assert get_capabilities(speaker, local_only=True) is None
+        speaker.get_speaker_info.assert_not_called()
+
+    def test_local_only_unknown_profile(self, cache):
+        speaker = _make_speaker("Sonos Move")
+        speaker._uid = "RINCON_1"
+        assert has_capability(speaker, "has_battery", local_only=True) is None
+        speaker.get_speaker_info.assert_not_called()
@@ -1,6 +1,8 @@
 """Tests for cmd_parser.py."""
 
-from soco_cli.cmd_parser import CLIParser
+import pytest
+
+from soco_cli.cmd_parser import CLIParser, ParallelBlock, group_parallel_blocks
 
 
 class TestCLIParser:
@@ -67,3 +69,54 @@ class TestCLIParser:
         p.parse(["play"])
         p.parse(["volume", "50"])
         assert p.get_sequences() == [["volume", "50"]]
+
+
+def _grouped(args, excluded=()):
+    p = CLIParser()
+    p.parse(args)
+    return group_parallel_blocks(p.get_sequences(), excluded=excluded)
+
+
+class TestGroupParallelBlocks:
+    def test_no_blocks(self):
+        assert _grouped(["K", "play", ":", "L", "stop"]) == [
+            ["K", "play"],
+            ["L", "stop"],
+        ]
+
+    def test_block_grouped(self):
+        sequences = _grouped(
+            ["parallel", ":", "K", "volume", "30", ":", "L", "volume", "20", ":"]
+            + ["end_parallel", ":", "wait", "10"]
+        )
+        assert sequences == [
+            [["K", "volume", "30"], ["L", "volume", "20"]],
+            ["wait", "10"],
+        ]
+        assert isinstance(sequences[0], ParallelBlock)
+        assert not isinstance(sequences[1], ParallelBlock)
+
+    def test_keywords_case_insensitive(self):
+        sequences = _grouped(["Parallel", ":", "K", "play", ":", "END_PARALLEL"])
+        assert sequences == [[["K", "play"]]]
+
+    @pytest.mark.parametrize(
+        "args, message",
+        [
+            (["parallel", "now", ":", "K", "play", ":", "end_parallel"], "takes no"),
+            (["K", "play", ":", "end_parallel"], "without a matching"),
+            (["parallel", ":", "K", "play"], "Missing 'end_parallel'"),
+            (["parallel", ":", "parallel", ":", "end_parallel"], "nested"),
+            (["parallel", ":", "end_parallel"], "Empty parallel block"),
+        ],
+    )
+    def test_invalid_blocks(self, args, message):
+        with pytest.raises(ValueError, match=message):
+            _grouped(args)
+
+    def test_excluded_sequences(self):
+        with pytest.raises(ValueError, match="'wait' can't be used"):
+            _grouped(
+                ["parallel", ":", "wait", "5", ":", "end_parallel"], excluded=["wait"]
+            )
+        assert _grouped(["wait", "5"], excluded=["wait"]) == [["wait", "5"]]
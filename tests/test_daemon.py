@@ -0,0 +1,223 @@
+"""Tests for daemon.py and daemon_client.py."""
+
+import os
+import signal
+import socket
+import sys
+import time
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import pytest
+
+from soco_cli.daemon import DaemonServer, exit_code_from_status, peer_uid
+from soco_cli.daemon_client import (
+    LOCAL_OPTIONS,
+    daemon_supported,
+    forward,
+    receive_int,
+    send_int,
+    send_request,
+    use_daemon,
+)
+
+pytestmark = pytest.mark.skipif(
+    not daemon_supported() or not hasattr(os, "fork"),
+    reason="The daemon requires Unix domain sockets and fork()",
+)
+
+
+def _run(argv):
+    """Stand-in for running a 'sonos' command."""
+    command = argv[0]
+    if command == "echo":
+        print(" ".join(argv[1:]))
+        print("to stderr", file=sys.stderr)
+    elif command == "exit":
+        sys.exit(int(argv[1]))
+    elif command == "os_exit":
+        os._exit(int(argv[1]))
+    elif command == "raise":
+        raise ValueError("bad value")
+    elif command == "context":
+        print(os.getcwd())
+        print(os.environ.get("SPKR"))
+    elif command == "sleep":
+        time.sleep(30)
+
+
+@contextmanager
+def _serving(socket_path):
+    """Run a daemon in a separate process, as it would be run for real, so
+    that the processes it forks don't inherit the test's client sockets."""
+    server = DaemonServer(socket_path=socket_path, run=_run)
+    assert server.bind()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            signal.signal(signal.SIGTERM, lambda signum, frame: server.stop())
+            server.serve()
+        finally:
+            os._exit(0)
+    try:
+        yield server
+    finally:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+        server.close()
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    with _serving(str(tmp_path / "daemon.sock")) as server:
+        yield server
+
+
+def _forward(daemon, argv):
+    """Forward a command, returning its exit code, stdout and stderr."""
+    stdin = os.open(os.devnull, os.O_RDONLY)
+    out_read, out_write = os.pipe()
+    err_read, err_write = os.pipe()
+    try:
+        exit_code = forward(
+            argv, socket_path=daemon.socket_path, fds=(stdin, out_write, err_write)
+        )
+    finally:
+        for fd in (stdin, out_write, err_write):
+            os.close(fd)
+    with os.fdopen(out_read) as out, os.fdopen(err_read) as err:
+        return exit_code, out.read(), err.read()
+
+
+# ----------------------------------------------------------------------------
+# Running commands
+
+
+class TestForward:
+    def test_output_and_exit_code(self, daemon):
+        assert _forward(daemon, ["echo", "Kitchen", "volume"]) == (
+            0,
+            "Kitchen volume\n",
+            "to stderr\n",
+        )
+
+    def test_exit_code_from_sys_exit(self, daemon):
+        assert _forward(daemon, ["exit", "3"])[0] == 3
+
+    def test_exit_code_from_os_exit(self, daemon):
+        assert _forward(daemon, ["os_exit", "4"])[0] == 4
+
+    def test_exception_reported(self, daemon):
+        exit_code, _, err = _forward(daemon, ["raise"])
+        assert exit_code == 1
+        assert err == "Error: bad value\n"
+
+    def test_working_directory_and_environment(self, daemon, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("SPKR", "Bedroom")
+        assert _forward(daemon, ["context"])[1] == "{}\nBedroom\n".format(os.getcwd())
+
+    def test_consecutive_commands(self, daemon):
+        for i in range(3):
+            assert _forward(daemon, ["echo", str(i)])[1] == "{}\n".format(i)
+
+    def test_no_daemon(self, tmp_path):
+        assert forward(["echo"], socket_path=str(tmp_path / "missing.sock")) is None
+
+
+# ----------------------------------------------------------------------------
+# Signals
+
+
+class TestSignals:
+    def test_signal_forwarded(self, daemon):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(daemon.socket_path)
+        stdin = os.open(os.devnull, os.O_RDONLY)
+        stdout = os.open(os.devnull, os.O_WRONLY)
+        try:
+            request = {"argv": ["sleep"], "cwd": os.getcwd(), "env": {}}
+            send_request(sock, request, (stdin, stdout, stdout))
+            time.sleep(0.5)
+            send_int(sock, signal.SIGTERM)
+            assert receive_int(sock) == 128 + signal.SIGTERM
+        finally:
+            os.close(stdin)
+            os.close(stdout)
+            sock.close()
+
+    def test_exit_code_from_status(self):
+        pid = os.fork()
+        if pid == 0:
+            os._exit(7)
+        assert exit_code_from_status(os.waitpid(pid, 0)[1]) == 7
+
+
+# ----------------------------------------------------------------------------
+# The daemon's socket
+
+
+class TestSocket:
+    def test_second_daemon_refused(self, daemon):
+        assert not DaemonServer(socket_path=daemon.socket_path).bind()
+
+    def test_stale_socket_replaced(self, tmp_path):
+        socket_path = str(tmp_path / "daemon.sock")
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(socket_path)
+        stale.close()
+        server = DaemonServer(socket_path=socket_path)
+        assert server.bind()
+        assert os.stat(socket_path).st_mode & 0o777 == 0o600
+        server.close()
+        assert not os.path.exists(socket_path)
+
+    def test_socket_directory_private(self, tmp_path):
+        socket_path = str(tmp_path / "new" / "daemon.sock")
+        server = DaemonServer(socket_path=socket_path)
+        assert server.bind()
+        assert os.stat(os.path.dirname(socket_path)).st_mode & 0o777 == 0o700
+        server.close()
+
+    @pytest.mark.skipif(
+        not hasattr(socket, "SO_PEERCRED"), reason="Requires SO_PEERCRED"
+    )
+    def test_peer_uid(self):
+        client, server = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            assert peer_uid(server) == os.getuid()
+        finally:
+            client.close()
+            server.close()
+
+    def test_other_user_refused(self, tmp_path):
+        with patch("soco_cli.daemon.peer_uid", return_value=os.getuid() + 1):
+            with _serving(str(tmp_path / "daemon.sock")) as server:
+                exit_code, out, err = _forward(server, ["echo", "Kitchen"])
+        assert exit_code == 1
+        assert out == ""
+        assert err == ""
+
+    def test_silent_client_disconnected(self, tmp_path):
+        with patch("soco_cli.daemon.REQUEST_TIMEOUT", 0.2):
+            with _serving(str(tmp_path / "daemon.sock")) as server:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.settimeout(5)
+                try:
+                    sock.connect(server.socket_path)
+                    assert sock.recv(1) == b""
+                finally:
+                    sock.close()
+
+
+# ----------------------------------------------------------------------------
+# Choosing whether to use the daemon
+
+
+class TestUseDaemon:
+    def test_command_forwarded(self):
+        assert use_daemon(["Kitchen", "volume", "30"])
+
+    @pytest.mark.parametrize("option", LOCAL_OPTIONS)
+    def test_local_options_not_forwarded(self, option):
+        assert not use_daemon([option, "Kitchen"])
@@ -0,0 +1,254 @@
+"""Tests for discovery_cache.py — DiscoveryCache class."""
+
+import os
+import pickle
+import tempfile
+import time
+from unittest.mock import MagicMock, PropertyMock, patch
+
+import pytest
+import requests
+
+import soco_cli.utils as utils
+from soco_cli.discovery_cache import DiscoveryCache, probe_device, probe_port
+from soco_cli.utils import SpeakerCache
+
+
+@pytest.fixture
+def tmpdir_path():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield tmpdir + "/"
+
+
+# ---------------------------------------------------------------------------
+# save / load
+# ---------------------------------------------------------------------------
+
+
+class TestSaveLoad:
+    def test_load_returns_none_when_no_file(self, tmpdir_path):
+        dc = DiscoveryCache(save_directory=tmpdir_path)
+        assert dc.load() is None
+
+    def test_save_and_load_round_trip(self, tmpdir_path):
+        dc = DiscoveryCache(save_directory=tmpdir_path)
+        assert dc.save([("192.168.1.10", "Kitchen", "RINCON_1")]) is True
+        assert dc.load() == [("192.168.1.10", "Kitchen", "RINCON_1")]
+
+    def test_save_empty_returns_false(self, tmpdir_path):
+        dc = DiscoveryCache(save_directory=tmpdir_path)
+        assert dc.save([]) is False
+        assert not os.path.exists(dc.save_pathname)
+
+    def test_stale_cache_not_loaded(self, tmpdir_path):
+        dc = DiscoveryCache(save_directory=tmpdir_path, ttl=60)
+        with open(dc.save_pathname, "wb") as f:
+            pickle.dump(
+                {
+                    "timestamp": time.time() - 120,
+                    "speakers": [("1.2.3.4", "Den", "RINCON_3")],
+                },
+                f,
+            )
+        assert dc.load() is None
+
+    def test_corrupt_cache_not_loaded(self, tmpdir_path):
+        dc = DiscoveryCache(save_directory=tmpdir_path)
+        with open(dc.save_pathname, "wb") as f:
+            f.write(b"not a pickle")
+        assert dc.load() is None
+
+    def test_unexpected_format_not_loaded(self, tmpdir_path):
+        dc = DiscoveryCache(save_directory=tmpdir_path)
+        with open(dc.save_pathname, "wb") as f:
+            pickle.dump(["unexpected"], f)
+        assert dc.load() is None
+
+    def test_records_without_uid_not_loaded(self, tmpdir_path):
+        dc = DiscoveryCache(save_directory=tmpdir_path)
+        with open(dc.save_pathname, "wb") as f:
+            pickle.dump({"timestamp": time.time(), "speakers": [("1.2.3.4", "Den")]}, f)
+        assert dc.load() is None
+
+    def test_save_leaves_no_temporary_files(self, tmpdir_path):
+        dc = DiscoveryCache(save_directory=tmpdir_path)
+        dc.save([("192.168.1.10", "Kitchen", "RINCON_1")])
+        assert os.listdir(tmpdir_path) == ["discovery_cache.pickle"]
+
+    def test_remove(self, tmpdir_path):
+        dc = DiscoveryCache(save_directory=tmpdir_path)
+        dc.save([("192.168.1.10", "Kitchen", "RINCON_1")])
+        dc.remove()
+        assert not os.path.exists(dc.save_pathname)
+        dc.remove()  # No error if already removed
+
+
+# ---------------------------------------------------------------------------
+# probe_port
+# ---------------------------------------------------------------------------
+
+
+class TestProbePort:
+    def test_probe_success(self):
+        with patch("soco_cli.discovery_cache.socket.create_connection") as conn:
+            assert probe_port("192.168.1.10") is True
+        conn.assert_called_once_with(("192.168.1.10", 1400), timeout=0.5)
+
+    def test_probe_failure(self):
+        with patch(
+            "soco_cli.discovery_cache.socket.create_connection",
+            side_effect=OSError,
+        ):
+            assert probe_port("192.168.1.10") is False
+
+
+# ---------------------------------------------------------------------------
+# probe_device
+# ---------------------------------------------------------------------------
+
+DEVICE_DESCRIPTION = (
+    b'<?xml version="1.0" encoding="utf-8" ?><root><device>'
+    b"<UDN>uuid:RINCON_1</UDN></device></root>"
+)
+
+
+def _urlopen(description):
+    response = MagicMock()
+    response.__enter__.return_value.read.return_value = description
+    return response
+
+
+class TestProbeDevice:
+    def test_same_device(self):
+        with patch(
+            "soco_cli.discovery_cache.urlopen",
+            return_value=_urlopen(DEVICE_DESCRIPTION),
+        ) as urlopen:
+            assert probe_device("192.168.1.10", "RINCON_1") is True
+        urlopen.assert_called_once_with(
+            "http://192.168.1.10:1400/xml/device_description.xml", timeout=0.5
+        )
+
+    def test_different_device_at_address(self):
+        with patch(
+            "soco_cli.discovery_cache.urlopen",
+            return_value=_urlopen(DEVICE_DESCRIPTION),
+        ):
+            assert probe_device("192.168.1.10", "RINCON_2") is False
+
+    def test_no_response(self):
+        with patch("soco_cli.discovery_cache.urlopen", side_effect=OSError):
+            assert probe_device("192.168.1.10", "RINCON_1") is False
+
+
+# ---------------------------------------------------------------------------
+# SpeakerCache / get_speaker integration
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def disk_speaker_cache(tmpdir_path):
+    original_api = utils.API
+    original_cache = utils.SPKR_CACHE
+    utils.API = True
+    sc = SpeakerCache(disk_cache_ttl=60)
+    sc._disk_cache = DiscoveryCache(save_directory=tmpdir_path, ttl=60)
+    utils.SPKR_CACHE = sc
+    yield sc
+    utils.SPKR_CACHE = original_cache
+    utils.API = original_api
+
+
+class TestSpeakerCacheDiskCache:
+    def test_disabled_by_default(self):
+        sc = SpeakerCache()
+        assert sc.load_disk_cache() is False
+        assert sc.save_disk_cache() is False
+
+    def test_load_populates_cache(self, disk_speaker_cache):
+        disk_speaker_cache._disk_cache.save([("192.168.1.10", "Kitchen", "RINCON_1")])
+        with patch("soco_cli.discovery_cache.probe_device", return_value=True):
+            assert disk_speaker_cache.load_disk_cache() is True
+        names = [name for _, name in disk_speaker_cache._cache]
+        assert names == ["Kitchen"]
+        assert [speaker.uid for speaker, _ in disk_speaker_cache._cache] == ["RINCON_1"]
+        # Only loaded once
+        assert disk_speaker_cache.load_disk_cache() is False
+
+    def test_discover_saves_to_disk(self, disk_speaker_cache):
+        spk = MagicMock()
+        spk.player_name = "Kitchen"
+        spk.ip_address = "192.168.1.10"
+        spk.uid = "RINCON_1"
+        with patch("soco_cli.utils.soco.discovery.discover", return_value={spk}):
+            disk_speaker_cache.discover()
+        assert disk_speaker_cache._disk_cache.load() == [
+            ("192.168.1.10", "Kitchen", "RINCON_1")
+        ]
+
+    def test_get_speaker_uses_disk_cache_when_probe_succeeds(self, disk_speaker_cache):
+        disk_speaker_cache._disk_cache.save([("192.168.1.10", "Kitchen", "RINCON_1")])
+        with patch("soco_cli.discovery_cache.probe_device", return_value=True), patch(
+            "soco_cli.utils.soco.discovery.discover"
+        ) as discover:
+            speaker = utils.get_speaker("Kitchen")
+        assert speaker.ip_address == "192.168.1.10"
+        discover.assert_not_called()
+
+    def test_get_speaker_falls_back_when_probe_fails(self, disk_speaker_cache):
+        disk_speaker_cache._disk_cache.save([("192.168.1.10", "Kitchen", "RINCON_1")])
+        spk = MagicMock()
+        spk.player_name = "Kitchen"
+        spk.ip_address = "192.168.1.20"
+        spk.uid = "RINCON_2"
+        with patch("soco_cli.discovery_cache.probe_device", return_value=False), patch(
+            "soco_cli.utils.soco.discovery.discover", return_value={spk}
+        ):
+            speaker = utils.get_speaker("Kitchen")
+        assert speaker is spk
+        # The cache file has been rewritten with the newly discovered speaker
+        assert disk_speaker_cache._disk_cache.load() == [
+            ("192.168.1.20", "Kitchen", "RINCON_2")
+        ]
+
+    def test_unverified_speakers_not_used_as_seeds(self, disk_speaker_cache):
+        # Nothing is listening at this address, and it's not the speaker
+        # being looked up
+        disk_speaker_cache._disk_cache.save([("127.0.0.9", "Kitchen", "RINCON_1")])
+        spk = MagicMock()
+        spk.player_name = "Bedroom"
+        spk.ip_address = "192.168.1.20"
+        spk.uid = "RINCON_2"
+        with patch(
+            "soco_cli.utils.soco.discovery.discover", return_value={spk}
+        ) as discover:
+            speaker = utils.get_speaker("Bedroom")
+        assert speaker is spk
+        discover.assert_called_once()
+
+    def test_partially_verified_cache_discarded(self, disk_speaker_cache):
+        disk_speaker_cache._disk_cache.save(
+            [
+                ("192.168.1.10", "Kitchen", "RINCON_1"),
+                ("192.168.1.11", "Den", "RINCON_2"),
+            ]
+        )
+        with patch(
+            "soco_cli.discovery_cache.probe_device",
+            side_effect=lambda ip_address, uid, timeout: uid == "RINCON_1",
+        ):
+            assert disk_speaker_cache.load_disk_cache() is True
+        assert [name for _, name in disk_speaker_cache._cache] == ["Kitchen"]
+        assert disk_speaker_cache._disk_cache.load() is None
+
+    def test_unreachable_seed_skipped_by_indirect_lookup(self, disk_speaker_cache):
+        dead = MagicMock()
+        type(dead).visible_zones = PropertyMock(
+            side_effect=requests.exceptions.ConnectionError("refused")
+        )
+        zone = MagicMock()
+        zone.player_name = "Bedroom"
+        live = MagicMock()
+        live.visible_zones = {zone}
+        disk_speaker_cache._cache = {(dead, "Kitchen"), (live, "Den")}
+        assert disk_speaker_cache.find_indirect("Bedroom") is zone
@@ -0,0 +1,154 @@
+"""Tests for health.py."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from soco_cli.health import (
+    health_summary,
+    percentile,
+    print_health_json,
+    print_health_table,
+    probe_devices,
+    probe_status,
+)
+from soco_cli.speakers import SonosDevice
+
+
+def _make_device(name, ip):
+    return SonosDevice("HH1", ip, name, True, "Sonos One", "16.0", "RINCON_" + name)
+
+
+DEVICES = [
+    _make_device("Kitchen", "192.168.1.10"),
+    _make_device("Study", "192.168.1.11"),
+]
+
+
+# ----------------------------------------------------------------------------
+# Percentiles
+
+
+class TestPercentile:
+    def test_empty(self):
+        assert percentile([], 0.5) is None
+
+    def test_nearest_rank(self):
+        values = [0.5, 0.1, 0.4, 0.2, 0.3]
+        assert percentile(values, 0.5) == 0.3
+        assert percentile(values, 0.95) == 0.5
+        assert percentile(values, 0.0) == 0.1
+
+
+# ----------------------------------------------------------------------------
+# Probing
+
+
+class TestProbeDevices:
+    def test_latencies_and_errors_collected(self):
+        def status(ip_address, timeout):
+            if ip_address == "192.168.1.11":
+                raise OSError("Timed out")
+            return 0.01, "80.1-12345"
+
+        with patch("soco_cli.health.probe_status", side_effect=status), patch(
+            "soco_cli.health.probe_soap", return_value=0.02
+        ):
+            kitchen, study = probe_devices(DEVICES, rounds=3)
+        assert kitchen.status_latencies == [0.01, 0.01, 0.01]
+        assert kitchen.soap_latencies == [0.02, 0.02, 0.02]
+        assert kitchen.firmware == "80.1-12345"
+        assert study.status_errors == 3
+        assert study.status_latencies == []
+        # Falls back to the version in the speaker list
+        assert study.firmware == "16.0"
+
+    def test_devices_probed_concurrently(self):
+        devices = [
+            _make_device(str(i), "192.168.1.{}".format(i)) for i in range(10, 30)
+        ]
+
+        def slow(ip_address, timeout):
+            time.sleep(0.2)
+            return 0.2
+
+        start = time.time()
+        with patch(
+            "soco_cli.health.probe_status",
+            side_effect=lambda ip, t: (slow(ip, t), None),
+        ), patch("soco_cli.health.probe_soap", side_effect=slow):
+            probe_devices(devices, rounds=2, max_threads=64)
+        assert time.time() - start < 1.0
+
+    def test_no_devices(self):
+        assert probe_devices([]) == []
+
+
+class _StatusHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps({"device": {"softwareVersion": "80.1-12345"}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def status_server():
+    server = HTTPServer(("127.0.0.1", 0), _StatusHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestProbeStatus:
+    def test_firmware_read(self, status_server):
+        with patch("soco_cli.health.SONOS_PORT", status_server.server_port):
+            latency, firmware = probe_status("127.0.0.1", timeout=2.0)
+        assert latency >= 0
+        assert firmware == "80.1-12345"
+
+
+# ----------------------------------------------------------------------------
+# Reporting
+
+
+def _reports():
+    with patch(
+        "soco_cli.health.probe_status", return_value=(0.01, "80.1-12345")
+    ), patch("soco_cli.health.probe_soap", side_effect=[0.02, OSError()] * 2):
+        return probe_devices(DEVICES, rounds=2, max_threads=1)
+
+
+class TestReporting:
+    def test_summary(self):
+        kitchen = health_summary(_reports())[0]
+        assert kitchen["speaker_name"] == "Kitchen"
+        assert kitchen["status"]["p50_ms"] == 10.0
+        assert kitchen["status"]["error_rate"] == 0.0
+        assert kitchen["soap"]["errors"] == 0
+        assert health_summary(_reports())[1]["soap"]["error_rate"] == 1.0
+
+    def test_json(self, capsys):
+        print_health_json(_reports())
+        output = json.loads(capsys.readouterr().out)
+        assert [entry["ip_address"] for entry in output] == [
+            "192.168.1.10",
+            "192.168.1.11",
+        ]
+
+    def test_table(self, capsys):
+        print_health_table(_reports())
+        output = capsys.readouterr().out
+        assert "Kitchen" in output
+        assert "80.1-12345" in output
+        assert "2/4" in output
@@ -490,6 +490,17 @@ class TestCommandCore:
         assert result["speaker"] == "Kitchen"
         mock_run.assert_called_once()
 
+    def test_structured_results(self):
+        device = self._make_device()
+        with patch("soco_cli.http_api.get_speaker", return_value=(device, "")):
+            with patch("soco_cli.http_api.STRUCTURED", True):
+                with patch(
+                    "soco_cli.http_api.sc_run_result", return_value=(0, 30, "")
+                ) as mock_run:
+                    result = command_core("Kitchen", "volume")
+        assert result["result"] == 30
+        mock_run.assert_called_once()
+
     def test_sync_action_failure(self):
         device = self._make_device()
         with patch("soco_cli.http_api.get_speaker", return_value=(device, "")):
@@ -0,0 +1,104 @@
+"""Tests for the start-up cost of importing the 'sonos' command."""
+
+import re
+import subprocess
+import sys
+
+from soco_cli.action_processor import SonosFunction
+
+# Modules that are only needed by particular actions, and should not be
+# loaded when the 'sonos' command starts
+DEFERRED_MODULES = [
+    "soco_cli.alarms",
+    "soco_cli.interactive",
+    "soco_cli.play_local_file",
+    "soco_cli.play_local_file_lists",
+    "soco_cli.track_follow",
+    "RangeHTTPServer",
+    "multiprocessing",
+    "tabulate",
+]
+
+# Modules that the 'sonos' entry point must not load before deciding
+# whether to forward the command to the daemon
+CLIENT_EXCLUDED_MODULES = ["ifaddr", "requests", "soco", "soco_cli.sonos"]
+
+
+# Import time allowed for soco_cli's own modules, relative to the import
+# time of the SoCo library. Comparing the two rather than using a fixed
+# budget means the check doesn't depend on the speed of the machine.
+IMPORT_TIME_RATIO = 1.0
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)$")
+
+
+def _run_python(code, *options):
+    return subprocess.run(
+        [sys.executable] + list(options) + ["-c", code],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+
+
+# ----------------------------------------------------------------------------
+# Deferred imports
+
+
+class TestDeferredImports:
+    def test_heavy_modules_not_loaded_at_startup(self):
+        result = _run_python(
+            "import sys, soco_cli.sonos\n"
+            "print('\\n'.join(m for m in {} if m in sys.modules))".format(
+                DEFERRED_MODULES
+            )
+        )
+        assert result.stdout.split() == []
+
+    def test_import_time_within_budget(self):
+        # The first run writes any missing bytecode, which isn't counted
+        _run_python("import soco_cli.sonos")
+        result = _run_python("import soco_cli.sonos", "-X", "importtime")
+        own_time = 0
+        cumulative = {}
+        for line in result.stderr.splitlines():
+            match = IMPORT_TIME_LINE.match(line)
+            if match:
+                module = match.group(4)
+                cumulative[module] = int(match.group(2))
+                if module == "soco_cli" or module.startswith("soco_cli."):
+                    own_time += int(match.group(1))
+        assert own_time < cumulative["soco"] * IMPORT_TIME_RATIO
+
+    def test_daemon_client_loads_only_standard_library(self):
+        result = _run_python(
+            "import sys, soco_cli.daemon_client\n"
+            "print('\\n'.join(m for m in {} if m in sys.modules))".format(
+                CLIENT_EXCLUDED_MODULES
+            )
+        )
+        assert result.stdout.split() == []
+
+
+# ----------------------------------------------------------------------------
+# Lazily loaded action functions
+
+
+class TestSonosFunction:
+    def test_function_used_directly(self):
+        def handler():
+            pass
+
+        assert SonosFunction(handler).processing_function is handler
+
+    def test_function_loaded_from_module(self):
+        from soco_cli import alarms
+
+        sonos_function = SonosFunction("soco_cli.alarms:list_alarms", "get_alarms")
+        assert sonos_function.processing_function is alarms.list_alarms
+        assert sonos_function.soco_function == "get_alarms"
+
+    def test_function_loaded_once(self):
+        sonos_function = SonosFunction("soco_cli.alarms:list_alarms")
+        assert sonos_function.processing_function is sonos_function.processing_function
@@ -1,6 +1,6 @@
 """Tests for match_speaker_names.py."""
 
-from soco_cli.match_speaker_names import speaker_name_matches
+from soco_cli.match_speaker_names import SpeakerNameIndex, speaker_name_matches
 
 
 class TestSpeakerNameMatches:
@@ -105,3 +105,58 @@ class TestSpeakerNameMatches:
         match, exact = speaker_name_matches("K", "K")
         assert match is True
         assert exact is True
+
+
+class TestSpeakerNameIndex:
+    NAMES = ["Kitchen", "Kitchen Front", "Bob’s Room", "Living Room"]
+
+    def _index(self):
+        return SpeakerNameIndex((name, name) for name in self.NAMES)
+
+    def test_exact_match(self):
+        assert self._index().match("Kitchen") == ([("Kitchen", "Kitchen")], True)
+
+    def test_case_insensitive_match(self):
+        assert self._index().match("KITCHEN FRONT") == (
+            [("Kitchen Front", "Kitchen Front")],
+            True,
+        )
+
+    def test_apostrophe_normalised_match(self):
+        assert self._index().match("bob's room") == (
+            [("Bob’s Room", "Bob’s Room")],
+            True,
+        )
+
+    def test_partial_matches_in_supplied_order(self):
+        matches, exact = self._index().match("room")
+        assert exact is False
+        assert [name for name, _ in matches] == ["Bob’s Room", "Living Room"]
+
+    def test_prefix_match(self):
+        matches, exact = self._index().match("liv")
+        assert matches == [("Living Room", "Living Room")]
+        assert exact is False
+
+    def test_no_match(self):
+        assert self._index().match("Bedroom") == ([], False)
+
+    def test_agrees_with_speaker_name_matches(self):
+        index = self._index()
+        for supplied in ["k", "kitchen f", "'s", "ROOM", "x", "Living Room", ""]:
+            matches, exact = index.match(supplied)
+            expected = [
+                name for name in self.NAMES if speaker_name_matches(supplied, name)[0]
+            ]
+            if exact:
+                assert speaker_name_matches(supplied, matches[0][0]) == (True, True)
+            else:
+                assert [name for name, _ in matches] == expected
+
+    def test_indexes_source(self):
+        source = list(self.NAMES)
+        index = SpeakerNameIndex(((name, name) for name in source), source=source)
+        assert index.indexes(source)
+        assert not index.indexes(list(source))
+        source.append("Bedroom")
+        assert not index.indexes(source)
@@ -0,0 +1,79 @@
+"""Tests for neighbours.py."""
+
+from unittest.mock import patch
+
+from soco_cli.neighbours import (
+    is_sonos_mac,
+    order_by_neighbours,
+    parse_ip_neigh,
+    parse_proc_net_arp,
+    read_neighbour_table,
+)
+
+PROC_NET_ARP = (
+    "IP address       HW type     Flags       HW address            Mask     Device\n"
+    "192.168.1.20     0x1         0x2         b8:e9:37:aa:bb:cc     *        eth0\n"
+    "192.168.1.1      0x1         0x2         00:11:22:33:44:55     *        eth0\n"
+    "192.168.1.30     0x1         0x0         00:00:00:00:00:00     *        eth0\n"
+)
+
+IP_NEIGH = (
+    "192.168.1.20 dev eth0 lladdr B8:E9:37:AA:BB:CC REACHABLE\n"
+    "192.168.1.1 dev eth0 lladdr 00:11:22:33:44:55 STALE\n"
+    "192.168.1.30 dev eth0  FAILED\n"
+    "192.168.1.40 dev eth0 lladdr 00:11:22:33:44:66 INCOMPLETE\n"
+)
+
+NEIGHBOURS = {
+    "192.168.1.20": "b8:e9:37:aa:bb:cc",
+    "192.168.1.1": "00:11:22:33:44:55",
+}
+
+
+# ----------------------------------------------------------------------------
+# Neighbour table parsing
+
+
+class TestParsing:
+    def test_proc_net_arp(self):
+        assert parse_proc_net_arp(PROC_NET_ARP) == NEIGHBOURS
+
+    def test_proc_net_arp_header_only(self):
+        assert parse_proc_net_arp(PROC_NET_ARP.splitlines()[0]) == {}
+
+    def test_ip_neigh(self):
+        assert parse_ip_neigh(IP_NEIGH) == NEIGHBOURS
+
+    def test_falls_back_to_ip_neigh(self):
+        with patch("soco_cli.neighbours.open", side_effect=FileNotFoundError()), patch(
+            "soco_cli.neighbours.subprocess.run"
+        ) as run:
+            run.return_value.stdout = IP_NEIGH.encode("utf-8")
+            assert read_neighbour_table() == NEIGHBOURS
+
+    def test_no_neighbour_table(self):
+        with patch("soco_cli.neighbours.open", side_effect=FileNotFoundError()), patch(
+            "soco_cli.neighbours.subprocess.run", side_effect=OSError()
+        ):
+            assert read_neighbour_table() == {}
+
+
+# ----------------------------------------------------------------------------
+# Ordering
+
+
+class TestOrderByNeighbours:
+    def test_is_sonos_mac(self):
+        assert is_sonos_mac("B8:E9:37:AA:BB:CC")
+        assert not is_sonos_mac("00:11:22:33:44:55")
+
+    def test_sonos_then_alive_then_rest(self):
+        ip_addresses = ["192.168.1.{}".format(i) for i in range(1, 25)]
+        first, rest = order_by_neighbours(ip_addresses, NEIGHBOURS)
+        assert first == ["192.168.1.20", "192.168.1.1"]
+        assert rest == [ip for ip in ip_addresses if ip not in first]
+
+    def test_neighbours_outside_scan_ignored(self):
+        first, rest = order_by_neighbours(["10.0.0.1", "10.0.0.2"], NEIGHBOURS)
+        assert first == []
+        assert rest == ["10.0.0.1", "10.0.0.2"]
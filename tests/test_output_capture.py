@@ -0,0 +1,223 @@
+"""Tests for output_capture.py."""
+
+import asyncio
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+from soco import SoCo  # type: ignore
+
+from soco_cli.api import run_command, run_command_result
+from soco_cli.context_local import ContextVar
+from soco_cli.output_capture import (
+    capture_output,
+    capture_result,
+    emit_result,
+    release_output,
+    result_requested,
+)
+
+# ----------------------------------------------------------------------------
+# Capturing output
+
+
+class TestCaptureOutput:
+    def test_captures_stdout_and_stderr(self):
+        with capture_output() as (output, error):
+            print("out")
+            print("err", file=sys.stderr)
+        assert output.getvalue() == "out\n"
+        assert error.getvalue() == "err\n"
+
+    def test_output_passes_through_when_not_capturing(self, capsys):
+        with capture_output():
+            pass
+        print("visible")
+        assert capsys.readouterr().out == "visible\n"
+
+    def test_nested_captures_restore_outer_buffers(self):
+        with capture_output() as (outer, _):
+            print("one")
+            with capture_output() as (inner, _):
+                print("two")
+            print("three")
+        assert outer.getvalue() == "one\nthree\n"
+        assert inner.getvalue() == "two\n"
+
+    def test_threads_capture_separately(self):
+        barrier = threading.Barrier(8)
+        results = {}
+
+        def worker(index):
+            with capture_output() as (output, _):
+                barrier.wait()
+                for _ in range(50):
+                    print(index)
+            results[index] = output.getvalue()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for index in range(8):
+            assert results[index] == "{}\n".format(index) * 50
+
+    def test_other_threads_not_captured(self, capsys):
+        started = threading.Event()
+        finish = threading.Event()
+
+        def capturing():
+            with capture_output():
+                started.set()
+                finish.wait()
+
+        thread = threading.Thread(target=capturing)
+        thread.start()
+        started.wait()
+        print("main thread")
+        finish.set()
+        thread.join()
+        assert capsys.readouterr().out == "main thread\n"
+
+    def test_release_output(self, capsys):
+        with capture_output() as (output, _):
+            print("captured")
+            release_output()
+            print("released")
+        assert output.getvalue() == "captured\n"
+        assert capsys.readouterr().out == "released\n"
+
+
+# ----------------------------------------------------------------------------
+# Capturing output in asyncio tasks
+
+
+@pytest.mark.skipif(ContextVar is None, reason="Requires contextvars")
+class TestCaptureOutputAsync:
+    def test_tasks_capture_separately(self):
+        async def task(index):
+            with capture_output() as (output, _):
+                for _ in range(20):
+                    print(index)
+                    await asyncio.sleep(0)
+            return output.getvalue()
+
+        async def run_tasks():
+            return await asyncio.gather(*[task(i) for i in range(5)])
+
+        loop = asyncio.new_event_loop()
+        try:
+            results = loop.run_until_complete(run_tasks())
+        finally:
+            loop.close()
+
+        for index, result in enumerate(results):
+            assert result == "{}\n".format(index) * 20
+
+
+# ----------------------------------------------------------------------------
+# Concurrent calls to api.run_command()
+
+
+class TestConcurrentRunCommand:
+    def test_outputs_not_mixed(self):
+        barrier = threading.Barrier(6, timeout=5)
+
+        def process_action(speaker, action, args, use_local_speaker_list=False):
+            barrier.wait()
+            for _ in range(20):
+                print(speaker.player_name)
+            print(speaker.player_name + " error", file=sys.stderr)
+            return True
+
+        speakers = []
+        for index in range(6):
+            speaker = MagicMock(spec=SoCo)
+            speaker.player_name = "Speaker{}".format(index)
+            speakers.append(speaker)
+
+        with patch("soco_cli.api.process_action", side_effect=process_action):
+            with ThreadPoolExecutor(max_workers=6) as executor:
+                results = list(
+                    executor.map(lambda speaker: run_command(speaker, "x"), speakers)
+                )
+
+        for speaker, (exit_code, output, error) in zip(speakers, results):
+            assert exit_code == 0
+            assert output.split() == [speaker.player_name] * 20
+            assert error == speaker.player_name + " error"
+
+
+# ----------------------------------------------------------------------------
+# Structured results
+
+
+class TestCaptureResult:
+    def test_emit_renders_when_not_capturing(self, capsys):
+        assert not result_requested()
+        emit_result(42, print)
+        assert capsys.readouterr().out == "42\n"
+
+    def test_emit_records_when_capturing(self, capsys):
+        with capture_result() as result:
+            assert result_requested()
+            emit_result(42, print)
+        assert result.emitted
+        assert result.value == 42
+        assert capsys.readouterr().out == ""
+        assert not result_requested()
+
+    def test_nothing_emitted(self):
+        with capture_result() as result:
+            pass
+        assert not result.emitted
+        assert result.value is None
+
+    def test_run_command_result(self):
+        speaker = MagicMock(spec=SoCo)
+
+        def process_action(speaker, action, args, use_local_speaker_list=False):
+            emit_result({"volume": 30}, print)
+            return True
+
+        with patch("soco_cli.api.process_action", side_effect=process_action):
+            assert run_command_result(speaker, "x") == (0, {"volume": 30}, "")
+            assert run_command(speaker, "x") == (0, "{'volume': 30}", "")
+
+    def test_run_command_result_falls_back_to_text(self):
+        speaker = MagicMock(spec=SoCo)
+
+        def process_action(speaker, action, args, use_local_speaker_list=False):
+            print("Some text")
+            return True
+
+        with patch("soco_cli.api.process_action", side_effect=process_action):
+            assert run_command_result(speaker, "x") == (0, "Some text", "")
+
+    def test_run_command_result_failure(self):
+        speaker = MagicMock(spec=SoCo)
+        with patch("soco_cli.api.process_action", return_value=False):
+            exit_code, value, error = run_command_result(speaker, "x")
+        assert exit_code == 1
+        assert value is None
+        assert "not recognised" in error
+
+    def test_nested_run_command_renders_text(self):
+        speaker = MagicMock(spec=SoCo)
+        inner_results = []
+
+        def process_action(speaker, action, args, use_local_speaker_list=False):
+            if action == "outer":
+                inner_results.append(run_command(speaker, "inner"))
+                emit_result("outer value", print)
+            else:
+                emit_result("inner value", print)
+            return True
+
+        with patch("soco_cli.api.process_action", side_effect=process_action):
+            assert run_command_result(speaker, "outer") == (0, "outer value", "")
+        assert inner_results == [(0, "inner value", "")]
@@ -0,0 +1,107 @@
+"""Tests for properties.py."""
+
+import threading
+from unittest.mock import MagicMock, PropertyMock
+
+import pytest
+
+from soco_cli.properties import INFO_PROPERTIES, PROPERTIES, read_properties
+
+
+def _speaker(**kwargs):
+    speaker = MagicMock()
+    speaker.is_coordinator = True
+    speaker.get_current_transport_info.return_value = {
+        "current_transport_state": "PLAYING"
+    }
+    speaker.get_current_track_info.return_value = {
+        "title": "Toccata",
+        "artist": "Bach",
+        "album": "Organ Works",
+    }
+    for key, value in kwargs.items():
+        setattr(speaker, key, value)
+    return speaker
+
+
+# ----------------------------------------------------------------------------
+# Reading properties
+
+
+class TestReadProperties:
+    def test_values_in_requested_order(self):
+        speaker = _speaker(volume=30, mute=False, bass=2)
+        values = read_properties(speaker, ["bass", "volume", "state", "mute"])
+        assert list(values.items()) == [
+            ("bass", 2),
+            ("volume", 30),
+            ("state", "PLAYING"),
+            ("mute", False),
+        ]
+
+    def test_no_properties(self):
+        assert read_properties(_speaker(), []) == {}
+
+    def test_source_read_once(self):
+        speaker = _speaker()
+        values = read_properties(speaker, ["title", "artist", "album"])
+        assert values == {
+            "title": "Toccata",
+            "artist": "Bach",
+            "album": "Organ Works",
+        }
+        speaker.get_current_track_info.assert_called_once_with()
+
+    def test_music_source_read_once(self):
+        speaker = _speaker()
+        music_source = PropertyMock(return_value="LINE_IN")
+        type(speaker).music_source = music_source
+        values = read_properties(
+            speaker, ["is_playing_line_in", "is_playing_radio", "is_playing_tv"]
+        )
+        assert values == {
+            "is_playing_line_in": True,
+            "is_playing_radio": False,
+            "is_playing_tv": False,
+        }
+        music_source.assert_called_once_with()
+
+    def test_coordinator_properties(self):
+        coordinator = _speaker(cross_fade=True)
+        coordinator.get_current_transport_info.return_value = {
+            "current_transport_state": "PAUSED_PLAYBACK"
+        }
+        speaker = _speaker(is_coordinator=False, cross_fade=False, volume=10)
+        speaker.group.coordinator = coordinator
+        values = read_properties(speaker, ["state", "cross_fade", "volume"])
+        assert values == {
+            "state": "PAUSED_PLAYBACK",
+            "cross_fade": True,
+            "volume": 10,
+        }
+        speaker.get_current_transport_info.assert_not_called()
+
+    def test_reads_are_concurrent(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def read(value):
+            barrier.wait()
+            return value
+
+        speaker = _speaker()
+        type(speaker).volume = PropertyMock(side_effect=lambda: read(30))
+        type(speaker).bass = PropertyMock(side_effect=lambda: read(2))
+        speaker.get_current_transport_info.side_effect = lambda: read(
+            {"current_transport_state": "STOPPED"}
+        )
+        values = read_properties(speaker, ["volume", "bass", "state"])
+        assert values == {"volume": 30, "bass": 2, "state": "STOPPED"}
+
+    def test_failure_raised(self):
+        speaker = _speaker()
+        speaker.get_current_track_info.side_effect = RuntimeError("No response")
+        with pytest.raises(RuntimeError):
+            read_properties(speaker, ["volume", "title"])
+
+    def test_info_properties_known(self):
+        assert all(name in PROPERTIES for name in INFO_PROPERTIES)
@@ -0,0 +1,166 @@
+"""Tests for read_cache.py."""
+
+import threading
+from unittest.mock import MagicMock, PropertyMock
+
+from soco_cli.read_cache import (
+    cached_read,
+    current_track_info,
+    group_coordinator,
+    invalidate_reads,
+    queue_size,
+    read_cache_scope,
+)
+
+
+def _speaker(ip_address="192.168.1.10"):
+    speaker = MagicMock()
+    speaker.ip_address = ip_address
+    return speaker
+
+
+def _counting_queue_size(speaker, size=5):
+    prop = PropertyMock(return_value=size)
+    type(speaker).queue_size = prop
+    return prop
+
+
+# ----------------------------------------------------------------------------
+# Cached reads
+
+
+class TestCachedRead:
+    def test_no_scope_reads_every_time(self):
+        speaker = _speaker()
+        prop = _counting_queue_size(speaker)
+        assert queue_size(speaker) == 5
+        assert queue_size(speaker) == 5
+        assert prop.call_count == 2
+
+    def test_scope_reads_once(self):
+        speaker = _speaker()
+        prop = _counting_queue_size(speaker)
+        with read_cache_scope():
+            assert queue_size(speaker) == 5
+            assert queue_size(speaker) == 5
+        assert prop.call_count == 1
+
+    def test_speakers_cached_separately(self):
+        with read_cache_scope():
+            assert cached_read(_speaker("10.0.0.1"), "x", lambda: 1) == 1
+            assert cached_read(_speaker("10.0.0.2"), "x", lambda: 2) == 2
+
+    def test_scope_ends(self):
+        speaker = _speaker()
+        prop = _counting_queue_size(speaker)
+        with read_cache_scope():
+            queue_size(speaker)
+        queue_size(speaker)
+        assert prop.call_count == 2
+
+    def test_nested_scope_reuses_outer(self):
+        speaker = _speaker()
+        prop = _counting_queue_size(speaker)
+        with read_cache_scope() as outer:
+            queue_size(speaker)
+            with read_cache_scope() as inner:
+                assert inner is outer
+                queue_size(speaker)
+            queue_size(speaker)
+        assert prop.call_count == 1
+
+    def test_threads_cached_separately(self):
+        speaker = _speaker()
+        prop = _counting_queue_size(speaker)
+
+        def worker():
+            with read_cache_scope():
+                queue_size(speaker)
+
+        with read_cache_scope():
+            queue_size(speaker)
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+            queue_size(speaker)
+        assert prop.call_count == 2
+
+
+# ----------------------------------------------------------------------------
+# Invalidation
+
+
+class TestInvalidation:
+    def test_invalidate_by_name(self):
+        speaker = _speaker()
+        prop = _counting_queue_size(speaker)
+        speaker.get_current_track_info.return_value = {"title": "T"}
+        with read_cache_scope():
+            queue_size(speaker)
+            current_track_info(speaker)
+            invalidate_reads(speaker, "queue_size")
+            queue_size(speaker)
+            current_track_info(speaker)
+        assert prop.call_count == 2
+        speaker.get_current_track_info.assert_called_once_with()
+
+    def test_invalidate_by_speaker(self):
+        first = _speaker("10.0.0.1")
+        second = _speaker("10.0.0.2")
+        first_prop = _counting_queue_size(first)
+        second_prop = _counting_queue_size(second)
+        with read_cache_scope():
+            queue_size(first)
+            queue_size(second)
+            invalidate_reads(first)
+            queue_size(first)
+            queue_size(second)
+        assert first_prop.call_count == 2
+        assert second_prop.call_count == 1
+
+    def test_invalidate_without_scope(self):
+        invalidate_reads()
+
+    def test_write_clears_cache(self):
+        speaker = _speaker()
+        prop = _counting_queue_size(speaker)
+        with read_cache_scope() as cache:
+            queue_size(speaker)
+            cache.end_action(read_only=False)
+            queue_size(speaker)
+        assert prop.call_count == 2
+
+    def test_read_only_action_keeps_cache(self):
+        speaker = _speaker()
+        prop = _counting_queue_size(speaker)
+        with read_cache_scope() as cache:
+            queue_size(speaker)
+            cache.end_action(read_only=True)
+            queue_size(speaker)
+        assert prop.call_count == 1
+
+    def test_per_action_values_dropped(self):
+        speaker = _speaker()
+        speaker.get_current_track_info.return_value = {"title": "T"}
+        with read_cache_scope() as cache:
+            current_track_info(speaker)
+            current_track_info(speaker)
+            cache.end_action(read_only=True)
+            current_track_info(speaker)
+        assert speaker.get_current_track_info.call_count == 2
+
+
+# ----------------------------------------------------------------------------
+# Group coordinator
+
+
+class TestGroupCoordinator:
+    def test_coordinator_is_speaker(self):
+        speaker = _speaker()
+        speaker.is_coordinator = True
+        assert group_coordinator(speaker) is speaker
+
+    def test_coordinator_of_group(self):
+        speaker = _speaker()
+        speaker.is_coordinator = False
+        assert group_coordinator(speaker) is speaker.group.coordinator
@@ -0,0 +1,94 @@
+"""Tests for scan_timing.py."""
+
+import socket
+
+import pytest
+
+from soco_cli.scan_timing import (
+    DEFAULT_FIRST_TIMEOUT,
+    MIN_TIMEOUT,
+    ScanTimings,
+    timed_probe,
+)
+
+
+@pytest.fixture
+def timings(tmp_path):
+    return ScanTimings(save_directory=str(tmp_path) + "/")
+
+
+# ----------------------------------------------------------------------------
+# RTT estimates and timeouts
+
+
+class TestScanTimings:
+    def test_subnet(self):
+        assert ScanTimings.subnet("192.168.1.77") == "192.168.1.0/24"
+
+    def test_default_timeout_for_unknown_subnet(self, timings):
+        assert timings.timeout("192.168.1.1", 1.0) == DEFAULT_FIRST_TIMEOUT
+
+    def test_timeout_capped_at_maximum(self, timings):
+        assert timings.timeout("192.168.1.1", 0.1) == 0.1
+
+    def test_first_sample(self, timings):
+        timings.record("192.168.1.10", 0.01)
+        assert timings.estimates == {"192.168.1.0/24": (0.01, 0.005)}
+        assert timings.timeout("192.168.1.99", 1.0) == pytest.approx(0.03)
+
+    def test_timeout_has_minimum(self, timings):
+        timings.record("192.168.1.10", 0.0001)
+        assert timings.timeout("192.168.1.10", 1.0) == MIN_TIMEOUT
+
+    def test_variable_subnet_gets_longer_timeout(self, timings):
+        for rtt in [0.01, 0.01, 0.01, 0.01]:
+            timings.record("192.168.1.10", rtt)
+        for rtt in [0.01, 0.2, 0.01, 0.2]:
+            timings.record("192.168.2.10", rtt)
+        assert timings.timeout("192.168.2.1", 1.0) > timings.timeout("192.168.1.1", 1.0)
+
+    def test_subnets_are_independent(self, timings):
+        timings.record("192.168.1.10", 0.01)
+        assert timings.timeout("192.168.2.10", 1.0) == DEFAULT_FIRST_TIMEOUT
+
+    def test_save_and_load(self, timings, tmp_path):
+        timings.record("192.168.1.10", 0.01)
+        assert timings.save()
+        reloaded = ScanTimings(save_directory=str(tmp_path) + "/")
+        assert reloaded.load()
+        assert reloaded.estimates == timings.estimates
+
+    def test_nothing_to_save(self, timings):
+        assert not timings.save()
+
+    def test_load_missing_file(self, timings):
+        assert not timings.load()
+        assert timings.estimates == {}
+
+
+# ----------------------------------------------------------------------------
+# Timed probes
+
+
+class TestTimedProbe:
+    def test_open_port(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(1)
+        try:
+            is_open, rtt = timed_probe(
+                "127.0.0.1", listener.getsockname()[1], timeout=1.0
+            )
+        finally:
+            listener.close()
+        assert is_open is True
+        assert rtt >= 0
+
+    def test_refused_port_gives_rtt(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        is_open, rtt = timed_probe("127.0.0.1", port, timeout=1.0)
+        assert is_open is False
+        assert rtt is not None
@@ -0,0 +1,350 @@
+"""Tests for sonos.py."""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from soco_cli.cmd_parser import ParallelBlock
+from soco_cli.sonos import (
+    main,
+    resolve_speakers,
+    run_on_all_speakers,
+    run_parallel_block,
+    sequence_speakers,
+)
+
+
+def _speaker(name, ip, visible=True):
+    speaker = MagicMock()
+    speaker.player_name = name
+    speaker.ip_address = ip
+    speaker.is_visible = visible
+    return speaker
+
+
+# ----------------------------------------------------------------------------
+# Running actions on all speakers
+
+
+class TestRunOnAllSpeakers:
+    def test_results_in_name_order(self):
+        speakers = [
+            _speaker("Study", "192.168.1.11"),
+            _speaker("Kitchen", "192.168.1.10"),
+        ]
+
+        def run_command(speaker, action, *args, **kwargs):
+            if speaker.player_name == "Kitchen":
+                time.sleep(0.1)
+            return 0, speaker.player_name, ""
+
+        with patch("soco_cli.sonos.run_command", side_effect=run_command):
+            results = list(run_on_all_speakers(speakers, "volume", [], False))
+
+        assert results == [
+            ("Kitchen", (0, "Kitchen", "")),
+            ("Study", (0, "Study", "")),
+        ]
+
+    def test_invisible_speakers_skipped(self):
+        speakers = [
+            _speaker("Kitchen", "192.168.1.10"),
+            _speaker("Sub", "192.168.1.12", visible=False),
+        ]
+        with patch(
+            "soco_cli.sonos.run_command", return_value=(0, "", "")
+        ) as run_command:
+            results = list(run_on_all_speakers(speakers, "mute", ["on"], False))
+
+        assert [name for name, _ in results] == ["Kitchen"]
+        run_command.assert_called_once_with(
+            speakers[0], "mute", "on", use_local_speaker_list=False
+        )
+
+    def test_runs_concurrently(self):
+        speakers = [_speaker("S{}".format(i), "10.0.0.{}".format(i)) for i in range(4)]
+        barrier = threading.Barrier(4, timeout=5)
+
+        def run_command(speaker, action, *args, **kwargs):
+            barrier.wait()
+            return 0, "", ""
+
+        with patch("soco_cli.sonos.run_command", side_effect=run_command):
+            results = list(run_on_all_speakers(speakers, "stop", [], False))
+
+        assert len(results) == 4
+
+    def test_no_speakers(self):
+        assert list(run_on_all_speakers([], "stop", [], False)) == []
+
+
+# ----------------------------------------------------------------------------
+# Parallel blocks
+
+
+def _get_speaker(name, use_local_speaker_list):
+    return None if name == "Nowhere" else _speaker(name, "192.168.1.10")
+
+
+class TestRunParallelBlock:
+    def test_results_in_block_order(self):
+        block = ParallelBlock([["Kitchen", "volume", "30"], ["Study", "volume"]])
+
+        def run_command(speaker, action, *args, **kwargs):
+            if speaker.player_name == "Kitchen":
+                time.sleep(0.1)
+            return 0, " ".join((speaker.player_name, action) + args), ""
+
+        with patch("soco_cli.sonos.get_speaker", side_effect=_get_speaker), patch(
+            "soco_cli.sonos.run_command", side_effect=run_command
+        ):
+            results = list(run_parallel_block(block, False))
+
+        assert results == [(0, "Kitchen volume 30", ""), (0, "Study volume", "")]
+
+    def test_runs_concurrently(self):
+        block = ParallelBlock([["S{}".format(i), "stop"] for i in range(4)])
+        barrier = threading.Barrier(4, timeout=5)
+
+        def run_command(speaker, action, *args, **kwargs):
+            barrier.wait()
+            return 0, "", ""
+
+        with patch("soco_cli.sonos.get_speaker", side_effect=_get_speaker), patch(
+            "soco_cli.sonos.run_command", side_effect=run_command
+        ):
+            results = list(run_parallel_block(block, False))
+
+        assert results == [(0, "", "")] * 4
+
+    def test_errors_reported_in_place(self):
+        block = ParallelBlock(
+            [["Nowhere", "play"], ["Kitchen"], ["Study", "ACTION", "x"]]
+        )
+        with patch("soco_cli.sonos.get_speaker", side_effect=_get_speaker), patch(
+            "soco_cli.sonos.run_command", return_value=(1, "", "Error: failed")
+        ) as run_command:
+            results = list(run_parallel_block(block, True))
+
+        assert [exit_code for exit_code, _, _ in results] == [1, 1, 1]
+        assert results[0][2] == "Error: Speaker 'Nowhere' not found"
+        assert results[1][2].startswith("Error: At least 2 parameters")
+        assert results[2][2] == "Error: failed"
+        run_command.assert_called_once()
+        assert run_command.call_args[0][1:] == ("action", "x")
+        assert run_command.call_args[1] == {"use_local_speaker_list": True}
+
+    def test_planned_speakers_used(self):
+        block = ParallelBlock([["Kitchen", "play"], ["Study", "play"]])
+        kitchen = _speaker("Kitchen", "192.168.1.10")
+        with patch(
+            "soco_cli.sonos.get_speaker", side_effect=_get_speaker
+        ) as get_speaker, patch(
+            "soco_cli.sonos.run_command", return_value=(0, "", "")
+        ) as run_command:
+            list(run_parallel_block(block, False, {"Kitchen": kitchen}))
+
+        get_speaker.assert_called_once_with("Study", False)
+        assert run_command.call_args_list[0][0][0] is kitchen
+
+
+# ----------------------------------------------------------------------------
+# Up-front speaker lookup
+
+
+class TestSequenceSpeakers:
+    def test_speakers_in_order_without_repeats(self):
+        sequences = [
+            ["Kitchen", "volume", "30"],
+            ["Study", "group", "Kitchen"],
+            ["wait", "10s"],
+            ["Lounge", "line_in", "Study", "right_input"],
+            ["Kitchen", "transfer", "Bedroom"],
+            ["loop", "3"],
+        ]
+        assert sequence_speakers(sequences) == [
+            "Kitchen",
+            "Study",
+            "Lounge",
+            "Bedroom",
+        ]
+
+    def test_parallel_blocks_and_all(self):
+        sequences = [
+            ParallelBlock([["Kitchen", "play"], ["Study", "multi_group", "Den"]]),
+            ["_all_", "group", "Lounge"],
+        ]
+        assert sequence_speakers(sequences) == ["Kitchen", "Study", "Den", "Lounge"]
+
+    def test_env_speaker(self):
+        sequences = [["volume", "30"], ["group", "Study"], ["wait", "1s"]]
+        assert sequence_speakers(sequences, env_speaker="Kitchen") == [
+            "Kitchen",
+            "Study",
+        ]
+
+    def test_renamed_speakers_excluded(self):
+        sequences = [
+            ["Kitchen", "rename", "Den"],
+            ParallelBlock([["Study", "rename", "Office"], ["Lounge", "play"]]),
+            ["Den", "volume", "10"],
+            ["office", "group", "Lounge"],
+        ]
+        assert sequence_speakers(sequences) == ["Kitchen", "Study", "Lounge"]
+
+    @pytest.mark.parametrize("sequence", [[], ["Kitchen"], ["LOOP"]])
+    def test_incomplete_sequences_ignored(self, sequence):
+        assert sequence_speakers([sequence]) == []
+
+
+class TestResolveSpeakers:
+    def test_found_and_not_found(self):
+        with patch(
+            "soco_cli.sonos.get_speaker", side_effect=_get_speaker
+        ) as get_speaker:
+            speakers, not_found = resolve_speakers(["Kitchen", "Nowhere"], True)
+
+        assert list(speakers) == ["Kitchen"]
+        assert speakers["Kitchen"].player_name == "Kitchen"
+        assert not_found == ["Nowhere"]
+        get_speaker.assert_any_call("Kitchen", True)
+
+
+# ----------------------------------------------------------------------------
+# Speaker lookups when looping
+
+
+def _run_sonos(
+    monkeypatch,
+    argv,
+    result=(0, "", ""),
+    cache=None,
+    create_speaker_cache=None,
+    lookup=_get_speaker,
+):
+    """Run the 'sonos' command, returning the exit code and the mock
+    get_speaker() and run_command() functions. 'result' is the result of
+    each command, or a list of successive results. 'cache' is the existing
+    speaker cache, as inherited from the daemon."""
+    if isinstance(result, list):
+        run_command_mock = MagicMock(side_effect=result)
+    else:
+        run_command_mock = MagicMock(return_value=result)
+    monkeypatch.setattr("sys.argv", ["sonos"] + argv)
+    monkeypatch.delenv("SPKR", raising=False)
+    monkeypatch.delenv("USE_LOCAL_CACHE", raising=False)
+    with patch("soco_cli.sonos.signal"), patch(
+        "soco_cli.sonos.configure_logging"
+    ), patch("soco_cli.sonos.speaker_cache", return_value=cache), patch(
+        "soco_cli.sonos.create_speaker_cache", new=create_speaker_cache or MagicMock()
+    ), patch(
+        "soco_cli.sonos.get_speaker", side_effect=lookup
+    ) as get_speaker, patch(
+        "soco_cli.sonos.run_command", new=run_command_mock
+    ) as run_command:
+        with pytest.raises(SystemExit) as exit_info:
+            main()
+    return exit_info.value.code, get_speaker, run_command
+
+
+class TestSpeakerPlanning:
+    def test_lookup_error_reported(self, monkeypatch):
+        def lookup(name, use_local_speaker_list):
+            raise ConnectionError("Connection refused")
+
+        with patch(
+            "soco_cli.sonos.error_report", side_effect=SystemExit(1)
+        ) as error_report:
+            exit_code, _, run_command = _run_sonos(
+                monkeypatch, ["Kitchen", "volume"], lookup=lookup
+            )
+        assert exit_code == 1
+        error_report.assert_called_once_with(
+            "Unable to look up speakers: Connection refused"
+        )
+        run_command.assert_not_called()
+
+    def test_renamed_speaker_looked_up_when_used(self, monkeypatch):
+        exit_code, get_speaker, run_command = _run_sonos(
+            monkeypatch, ["Kitchen", "rename", "Den", ":", "Den", "volume", "10"]
+        )
+        assert exit_code == 0
+        assert run_command.call_count == 2
+        assert [c[0][0] for c in get_speaker.call_args_list] == ["Kitchen", "Den"]
+
+
+class TestLoopSpeakerLookups:
+    def test_speaker_looked_up_once(self, monkeypatch):
+        exit_code, get_speaker, run_command = _run_sonos(
+            monkeypatch,
+            ["Kitchen", "volume", ":", "Study", "mute", ":", "Kitchen", "play"]
+            + [":", "loop", "3"],
+        )
+        assert exit_code == 0
+        assert run_command.call_count == 9
+        assert [c[0][0] for c in get_speaker.call_args_list] == ["Kitchen", "Study"]
+
+    def test_speaker_looked_up_again_after_failure(self, monkeypatch):
+        exit_code, get_speaker, _ = _run_sonos(
+            monkeypatch,
+            ["Kitchen", "volume", ":", "loop", "3"],
+            result=(1, "", "Error: timed out"),
+        )
+        assert exit_code == 3
+        # The initial lookup, then one after each of the first two failures
+        assert get_speaker.call_count == 3
+
+    def test_speaker_looked_up_once_after_failure(self, monkeypatch):
+        # Kitchen fails on the first command, then succeeds
+        exit_code, get_speaker, run_command = _run_sonos(
+            monkeypatch,
+            ["Kitchen", "volume", ":", "Study", "mute", ":", "Kitchen", "play"]
+            + [":", "loop", "2"],
+            result=[(1, "", "Error: timed out")] + [(0, "", "")] * 5,
+        )
+        assert exit_code == 1
+        assert run_command.call_count == 6
+        assert [c[0][0] for c in get_speaker.call_args_list] == [
+            "Kitchen",
+            "Study",
+            "Kitchen",
+        ]
+
+
+# ----------------------------------------------------------------------------
+# The speaker cache inherited from the daemon
+
+
+class TestDaemonSpeakerCache:
+    def _create_calls(self, monkeypatch, argv):
+        """Run a command in the daemon, whose speaker cache was created using
+        the default options, returning the calls to create_speaker_cache()."""
+        monkeypatch.setattr("soco_cli.sonos.SPEAKER_CACHE_OPTIONS", None)
+        _run_sonos(monkeypatch, ["Kitchen", "volume"])
+        create_speaker_cache = MagicMock()
+        _run_sonos(
+            monkeypatch,
+            argv,
+            cache=MagicMock(),
+            create_speaker_cache=create_speaker_cache,
+        )
+        return create_speaker_cache.call_args_list
+
+    def test_daemon_cache_used(self, monkeypatch):
+        assert self._create_calls(monkeypatch, ["Kitchen", "volume"]) == []
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            ["--household", "Sonos_ABCDEF"],
+            ["--discovery-cache-ttl", "0"],
+            ["--network-discovery-timeout", "5"],
+            ["--min-netmask", "16"],
+            ["--neighbours-first"],
+        ],
+    )
+    def test_new_cache_for_other_options(self, monkeypatch, options):
+        calls = self._create_calls(monkeypatch, options + ["Kitchen", "volume"])
+        assert len(calls) == 1
@@ -0,0 +1,114 @@
+"""Tests for speaker_metadata.py."""
+
+from unittest.mock import MagicMock, PropertyMock
+
+import pytest
+
+from soco_cli.speaker_metadata import (
+    cached_is_visible,
+    cached_player_name,
+    get_metadata,
+    hydrate,
+    invalidate,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_metadata():
+    invalidate()
+    yield
+    invalidate()
+
+
+def _make_speaker(ip="192.168.1.10"):
+    speaker = MagicMock()
+    speaker.ip_address = ip
+    speaker._uid = None
+    speaker._household_id = None
+    return speaker
+
+
+# ----------------------------------------------------------------------------
+# Hydration
+
+
+class TestHydrate:
+    def test_cached_values_used(self):
+        speaker = _make_speaker()
+        player_name = PropertyMock(return_value="Network Name")
+        is_visible = PropertyMock(return_value=False)
+        type(speaker).player_name = player_name
+        type(speaker).is_visible = is_visible
+        assert hydrate(speaker, player_name="Kitchen", is_visible=True) is speaker
+        assert cached_player_name(speaker) == "Kitchen"
+        assert cached_is_visible(speaker) is True
+        player_name.assert_not_called()
+        is_visible.assert_not_called()
+
+    def test_falls_back_to_speaker(self):
+        speaker = _make_speaker()
+        speaker.player_name = "Kitchen"
+        speaker.is_visible = False
+        assert cached_player_name(speaker) == "Kitchen"
+        assert cached_is_visible(speaker) is False
+
+    def test_unknown_fields_fall_back(self):
+        speaker = _make_speaker()
+        speaker.is_visible = False
+        hydrate(speaker, player_name="Kitchen")
+        assert cached_is_visible(speaker) is False
+
+    def test_uid_and_household_seeded(self):
+        speaker = _make_speaker()
+        hydrate(speaker, uid="RINCON_1", household_id="Sonos_1")
+        assert speaker._uid == "RINCON_1"
+        assert speaker._household_id == "Sonos_1"
+
+    def test_known_uid_not_overwritten(self):
+        speaker = _make_speaker()
+        speaker._uid = "RINCON_2"
+        hydrate(speaker, uid="RINCON_1")
+        assert speaker._uid == "RINCON_2"
+
+    def test_different_instance_at_same_address_ignored(self):
+        hydrate(_make_speaker(), player_name="Kitchen")
+        other = _make_speaker()
+        other.player_name = "Study"
+        assert get_metadata(other) is None
+        assert cached_player_name(other) == "Study"
+
+
+# ----------------------------------------------------------------------------
+# Invalidation
+
+
+class TestInvalidate:
+    def test_invalidate_one(self):
+        kitchen = _make_speaker("192.168.1.10")
+        study = _make_speaker("192.168.1.11")
+        hydrate(kitchen, player_name="Kitchen")
+        hydrate(study, player_name="Study")
+        invalidate("192.168.1.10")
+        assert get_metadata(kitchen) is None
+        assert get_metadata(study).player_name == "Study"
+
+    def test_invalidate_all(self):
+        kitchen = _make_speaker("192.168.1.10")
+        kitchen.player_name = "Renamed"
+        hydrate(kitchen, player_name="Kitchen")
+        invalidate()
+        assert cached_player_name(kitchen) == "Renamed"
+
+    def test_seeded_values_cleared(self):
+        speaker = _make_speaker()
+        hydrate(speaker, uid="RINCON_1", household_id="Sonos_1")
+        invalidate(speaker.ip_address)
+        assert speaker._uid is None
+        assert speaker._household_id is None
+
+    def test_values_not_seeded_are_kept(self):
+        speaker = _make_speaker()
+        speaker._uid = "RINCON_2"
+        hydrate(speaker, uid="RINCON_1")
+        invalidate()
+        assert speaker._uid == "RINCON_2"
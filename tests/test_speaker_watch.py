@@ -0,0 +1,245 @@
+"""Tests for speaker_watch.py."""
+
+import os
+from queue import Queue
+from unittest.mock import MagicMock, patch
+
+from soco_cli.speaker_watch import SpeakerWatcher, parse_ssdp_notify
+from soco_cli.speakers import SonosDevice, SpeakerChanges, Speakers
+
+UID = "RINCON_000E58A0000001400"
+
+
+def _notify(nts, ip="192.168.1.10", uid=UID):
+    return (
+        "NOTIFY * HTTP/1.1\r\n"
+        "HOST: 239.255.255.250:1900\r\n"
+        "LOCATION: http://{}:1400/xml/device_description.xml\r\n"
+        "NT: urn:schemas-upnp-org:device:ZonePlayer:1\r\n"
+        "NTS: {}\r\n"
+        "SERVER: Linux UPnP/1.0 Sonos/26.1-76230 (ZPS3)\r\n"
+        "USN: uuid:{}::urn:schemas-upnp-org:device:ZonePlayer:1\r\n"
+        "X-RINCON-HOUSEHOLD: Sonos_ABCDEF\r\n".format(ip, nts, uid)
+    ).encode("utf-8")
+
+
+def _make_device(ip="192.168.1.10", uid=UID, household_id="Sonos_ABCDEF"):
+    return SonosDevice(household_id, ip, "Kitchen", True, "Sonos One", "15.9", uid)
+
+
+def _make_watcher(devices, debounce=0.0):
+    speaker_list = MagicMock()
+    speaker_list.speakers = devices
+    return SpeakerWatcher(speaker_list, debounce=debounce), speaker_list
+
+
+# ----------------------------------------------------------------------------
+# parse_ssdp_notify
+
+
+class TestParseSsdpNotify:
+    def test_alive(self):
+        assert parse_ssdp_notify(_notify("ssdp:alive")) == (
+            "ssdp:alive",
+            UID,
+            "192.168.1.10",
+        )
+
+    def test_byebye(self):
+        assert parse_ssdp_notify(_notify("ssdp:byebye"))[0] == "ssdp:byebye"
+
+    def test_search_response_ignored(self):
+        data = _notify("ssdp:alive").replace(b"NOTIFY * HTTP/1.1", b"HTTP/1.1 200 OK")
+        assert parse_ssdp_notify(data) is None
+
+    def test_other_device_type_ignored(self):
+        data = _notify("ssdp:alive").replace(
+            b"NT: urn:schemas-upnp-org:device:ZonePlayer:1",
+            b"NT: urn:schemas-upnp-org:device:MediaRenderer:1",
+        )
+        assert parse_ssdp_notify(data) is None
+
+    def test_non_sonos_ignored(self):
+        data = _notify("ssdp:alive").replace(b"Sonos", b"Other")
+        assert parse_ssdp_notify(data) is None
+
+
+# ----------------------------------------------------------------------------
+# Change detection
+
+
+class TestChangeDetection:
+    def test_alive_from_known_speaker_ignored(self):
+        watcher, _ = _make_watcher([_make_device()])
+        watcher.handle_ssdp_message(_notify("ssdp:alive"))
+        assert not watcher.refresh_pending
+
+    def test_alive_from_new_speaker(self):
+        watcher, _ = _make_watcher([_make_device()])
+        watcher.handle_ssdp_message(_notify("ssdp:alive", uid="RINCON_NEW01400"))
+        assert watcher.refresh_pending
+
+    def test_alive_from_moved_speaker(self):
+        watcher, _ = _make_watcher([_make_device()])
+        watcher.handle_ssdp_message(_notify("ssdp:alive", ip="192.168.1.99"))
+        assert watcher.refresh_pending
+
+    def test_byebye_from_known_speaker(self):
+        watcher, _ = _make_watcher([_make_device()])
+        watcher.handle_ssdp_message(_notify("ssdp:byebye"))
+        assert watcher.refresh_pending
+
+    def test_byebye_from_unknown_speaker_ignored(self):
+        watcher, _ = _make_watcher([_make_device()])
+        watcher.handle_ssdp_message(_notify("ssdp:byebye", uid="RINCON_NEW01400"))
+        assert not watcher.refresh_pending
+
+    @patch("soco_cli.speaker_watch.soco.SoCo")
+    def test_alive_from_rejected_speaker_ignored(self, mock_soco):
+        # A player that a refresh doesn't add, e.g., from another household
+        watcher, speaker_list = _make_watcher([_make_device()])
+        speaker_list.refresh.return_value = SpeakerChanges([], [], [], [])
+        other = _notify("ssdp:alive", ip="192.168.1.20", uid="RINCON_OTHER01400")
+        watcher.handle_ssdp_message(other)
+        assert watcher.refresh_pending
+        watcher.refresh()
+        watcher.handle_ssdp_message(other)
+        assert not watcher.refresh_pending
+        speaker_list.refresh.assert_called_once()
+
+    @patch("soco_cli.speaker_watch.soco.SoCo")
+    def test_rejected_speaker_at_new_address(self, mock_soco):
+        watcher, speaker_list = _make_watcher([_make_device()])
+        speaker_list.refresh.return_value = SpeakerChanges([], [], [], [])
+        uid = "RINCON_OTHER01400"
+        watcher.handle_ssdp_message(_notify("ssdp:alive", ip="192.168.1.20", uid=uid))
+        watcher.refresh()
+        watcher.handle_ssdp_message(_notify("ssdp:alive", ip="192.168.1.21", uid=uid))
+        assert watcher.refresh_pending
+
+    def test_topology_event(self):
+        watcher, _ = _make_watcher([_make_device()])
+        sub = MagicMock()
+        sub.events = Queue()
+        sub.events.put("event")
+        watcher._subs["Sonos_ABCDEF"] = sub
+        watcher.check_topology_events()
+        assert watcher.refresh_pending
+        assert sub.events.empty()
+
+
+# ----------------------------------------------------------------------------
+# Refreshing
+
+
+class TestRefresh:
+    def test_refresh_waits_for_debounce(self):
+        watcher, speaker_list = _make_watcher([], debounce=60.0)
+        watcher.change_detected("test")
+        watcher.process()
+        speaker_list.refresh.assert_not_called()
+        assert watcher.refresh_pending
+
+    @patch("soco_cli.speaker_watch.soco.SoCo")
+    def test_changes_saved(self, mock_soco, capsys):
+        watcher, speaker_list = _make_watcher([_make_device()])
+        speaker_list.refresh.return_value = SpeakerChanges([_make_device()], [], [], [])
+        watcher.change_detected("test")
+        watcher.process()
+        speaker_list.refresh.assert_called_once()
+        speaker_list.save.assert_called_once()
+        speaker_list.print_changes.assert_called_once()
+        assert "Speaker list updated" in capsys.readouterr().out
+        assert not watcher.refresh_pending
+
+    @patch("soco_cli.speaker_watch.soco.SoCo")
+    def test_refresh_failure_reported(self, mock_soco, capsys):
+        watcher, speaker_list = _make_watcher([_make_device()])
+        speaker_list.refresh.side_effect = ConnectionError("Network is unreachable")
+        watcher.change_detected("test")
+        watcher.process()
+        assert "refresh failed: Network is unreachable" in capsys.readouterr().err
+        assert not watcher.refresh_pending
+
+    @patch("soco_cli.speaker_watch.soco.SoCo")
+    def test_no_changes_not_saved(self, mock_soco, capsys):
+        watcher, speaker_list = _make_watcher([_make_device()])
+        speaker_list.refresh.return_value = SpeakerChanges([], [], [], [])
+        watcher.refresh()
+        speaker_list.save.assert_not_called()
+        assert capsys.readouterr().out == ""
+
+
+# ----------------------------------------------------------------------------
+# Topology event subscriptions
+
+
+class TestSubscriptions:
+    @patch("soco_cli.speaker_watch.remember_event_sub")
+    @patch("soco_cli.speaker_watch.soco.SoCo")
+    def test_one_subscription_per_household(self, mock_soco, mock_remember):
+        watcher, _ = _make_watcher(
+            [
+                _make_device("192.168.1.10", "RINCON_A"),
+                _make_device("192.168.1.11", "RINCON_B"),
+                _make_device("192.168.2.10", "RINCON_C", "Sonos_OTHER"),
+            ]
+        )
+        watcher.update_subscriptions()
+        assert set(watcher._subs) == {"Sonos_ABCDEF", "Sonos_OTHER"}
+        assert mock_remember.call_count == 2
+
+    @patch("soco_cli.speaker_watch.remember_event_sub")
+    @patch("soco_cli.speaker_watch.soco.SoCo")
+    def test_unreachable_device_skipped(self, mock_soco, mock_remember):
+        good = MagicMock()
+
+        def factory(ip_address):
+            if ip_address == "192.168.1.10":
+                bad = MagicMock()
+                bad.zoneGroupTopology.subscribe.side_effect = ConnectionError()
+                return bad
+            return good
+
+        mock_soco.side_effect = factory
+        watcher, _ = _make_watcher(
+            [
+                _make_device("192.168.1.10", "RINCON_A"),
+                _make_device("192.168.1.11", "RINCON_B"),
+            ]
+        )
+        watcher.update_subscriptions()
+        assert (
+            watcher._subs["Sonos_ABCDEF"]
+            is good.zoneGroupTopology.subscribe.return_value
+        )
+
+    @patch("soco_cli.speaker_watch.forget_event_sub")
+    @patch("soco_cli.speaker_watch.event_unsubscribe")
+    @patch("soco_cli.speaker_watch.remember_event_sub")
+    @patch("soco_cli.speaker_watch.soco.SoCo")
+    def test_departed_household_unsubscribed(
+        self, mock_soco, mock_remember, mock_unsubscribe, mock_forget
+    ):
+        watcher, _ = _make_watcher([])
+        sub = MagicMock()
+        watcher._subs["Sonos_GONE"] = sub
+        watcher.update_subscriptions()
+        assert watcher._subs == {}
+        mock_unsubscribe.assert_called_once_with(sub)
+        mock_forget.assert_called_once_with(sub)
+
+
+# ----------------------------------------------------------------------------
+# Atomic saves
+
+
+class TestAtomicSave:
+    def test_save_leaves_no_temporary_files(self, tmp_path):
+        speakers = Speakers(save_directory=str(tmp_path) + "/", save_file="s.pickle")
+        speakers._speakers = [_make_device()]
+        assert speakers.save()
+        assert os.listdir(str(tmp_path)) == ["s.pickle"]
+        reloaded = Speakers(save_directory=str(tmp_path) + "/", save_file="s.pickle")
+        assert reloaded.load()
+        assert reloaded.speakers == [_make_device()]
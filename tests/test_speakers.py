@@ -1,15 +1,38 @@
 """Tests for speakers.py — Speakers class."""
 
+import asyncio
+import errno
+import ipaddress
 import os
+import socket
 import tempfile
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from soco_cli.speakers import SonosDevice, Speakers
-
-
-def _make_device(name, ip="192.168.1.1", visible=True, household="HH1"):
+from soco_cli.scan_timing import DEFAULT_FIRST_TIMEOUT, ScanTimings
+from soco_cli.speaker_metadata import (
+    cached_is_visible,
+    cached_player_name,
+    get_metadata,
+    invalidate,
+)
+from soco_cli.speakers import (
+    FIRST_WAVE_SIZE,
+    MAX_UNCONFIRMED_STRAGGLERS,
+    SCANNER_ASYNC,
+    SonosDevice,
+    Speakers,
+    compare_speaker_lists,
+    iter_concurrently,
+    iter_open_ports,
+    iter_open_ports_adaptive,
+    scan_for_open_port,
+)
+
+
+def _make_device(name, ip="192.168.1.1", visible=True, household="HH1", uid=None):
     return SonosDevice(
         household_id=household,
         ip_address=ip,
@@ -17,6 +40,7 @@ def _make_device(name, ip="192.168.1.1", visible=True, household="HH1"):
         is_visible=visible,
         model_name="Sonos One",
         display_version="15.0",
+        uid=uid,
     )
 
 
@@ -261,3 +285,700 @@ class TestFind:
             result = s.find("Kitchen")
         assert result is None
         assert "ambiguous" in capsys.readouterr().out
+
+    def test_exact_match_preferred_over_partial(self):
+        s = Speakers()
+        s._speakers = [
+            _make_device("Kitchen Front", ip="192.168.1.10"),
+            _make_device("Kitchen", ip="192.168.1.11"),
+        ]
+        with patch("soco_cli.speakers.soco.SoCo") as mock_soco:
+            s.find("kitchen")
+        mock_soco.assert_called_once_with("192.168.1.11")
+
+    def test_index_rebuilt_when_list_changes(self):
+        s = Speakers()
+        s._speakers = [_make_device("Kitchen", ip="192.168.1.10")]
+        assert s.find("Bedroom") is None
+        s._speakers.append(_make_device("Bedroom", ip="192.168.1.11"))
+        with patch("soco_cli.speakers.soco.SoCo") as mock_soco:
+            s.find("Bedroom")
+        mock_soco.assert_called_once_with("192.168.1.11")
+
+    def test_index_rebuilt_after_rename(self, tmp_path):
+        s = Speakers(save_directory=str(tmp_path) + "/")
+        s._speakers = [_make_device("Kitchen", ip="192.168.1.10")]
+        assert s.find("Bedroom") is None
+        s.rename("Kitchen", "Bedroom")
+        with patch("soco_cli.speakers.soco.SoCo") as mock_soco:
+            s.find("Bedroom")
+        mock_soco.assert_called_once_with("192.168.1.10")
+
+
+# ---------------------------------------------------------------------------
+# get_sonos_devices_data (concurrent device queries — patched)
+# ---------------------------------------------------------------------------
+
+
+class TestGetSonosDevicesData:
+    def test_empty_list(self):
+        s = Speakers()
+        assert s.get_sonos_devices_data([]) == []
+
+    def test_non_sonos_devices_omitted(self):
+        s = Speakers()
+        device = _make_device("Kitchen", ip="192.168.1.10")
+
+        def fake_data(ip_addr, timeout=3.0):
+            return device if ip_addr == "192.168.1.10" else None
+
+        with patch.object(Speakers, "get_sonos_device_data", side_effect=fake_data):
+            result = s.get_sonos_devices_data(["192.168.1.10", "192.168.1.11"])
+        assert result == [device]
+
+    def test_queries_run_concurrently(self):
+        s = Speakers(network_threads=8, device_timeout=2.0)
+
+        def fake_data(ip_addr, timeout=3.0):
+            time.sleep(0.2)
+            return _make_device(ip_addr, ip=ip_addr)
+
+        ips = ["192.168.1.{}".format(i) for i in range(10, 18)]
+        start = time.time()
+        with patch.object(Speakers, "get_sonos_device_data", side_effect=fake_data):
+            result = s.get_sonos_devices_data(ips)
+        assert time.time() - start < 1.0
+        assert sorted(d.ip_address for d in result) == sorted(ips)
+
+    def test_slow_device_omitted(self):
+        s = Speakers(network_threads=4, device_timeout=0.2)
+
+        def fake_data(ip_addr, timeout=3.0):
+            if ip_addr == "192.168.1.11":
+                time.sleep(1.5)
+            return _make_device(ip_addr, ip=ip_addr)
+
+        with patch.object(Speakers, "get_sonos_device_data", side_effect=fake_data):
+            result = s.get_sonos_devices_data(["192.168.1.10", "192.168.1.11"])
+        assert [d.ip_address for d in result] == ["192.168.1.10"]
+
+    def test_queued_devices_get_their_own_allowance(self):
+        # Each query takes most of its allowance, and they run one at a time
+        s = Speakers(network_threads=1, device_timeout=0.1)
+
+        def fake_data(ip_addr, timeout=3.0):
+            time.sleep(0.2)
+            return _make_device(ip_addr, ip=ip_addr)
+
+        ips = ["192.168.1.{}".format(i) for i in range(10, 15)]
+        with patch.object(Speakers, "get_sonos_device_data", side_effect=fake_data):
+            result = s.get_sonos_devices_data(ips)
+        assert [d.ip_address for d in result] == ips
+
+    def test_device_behind_slow_device_not_omitted(self):
+        s = Speakers(network_threads=1, device_timeout=0.1)
+
+        def fake_data(ip_addr, timeout=3.0):
+            if ip_addr == "192.168.1.10":
+                time.sleep(1.0)
+            return _make_device(ip_addr, ip=ip_addr)
+
+        with patch.object(Speakers, "get_sonos_device_data", side_effect=fake_data):
+            result = s.get_sonos_devices_data(["192.168.1.10", "192.168.1.11"])
+        assert [d.ip_address for d in result] == ["192.168.1.11"]
+
+    def test_device_timeout_passed_to_query(self):
+        s = Speakers(device_timeout=1.5)
+        with patch.object(
+            Speakers, "get_sonos_device_data", return_value=None
+        ) as get_data:
+            s.get_sonos_devices_data(["192.168.1.10"])
+        get_data.assert_called_once_with("192.168.1.10", 1.5)
+
+
+# ---------------------------------------------------------------------------
+# asyncio scanner
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def listening_port():
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(16)
+    yield listener.getsockname()[1]
+    listener.close()
+
+
+class TestAsyncScanner:
+    def test_finds_open_port(self, listening_port):
+        ips = ["127.0.0.{}".format(i) for i in range(1, 20)]
+        result = scan_for_open_port(ips, port=listening_port, timeout=0.5)
+        assert result == ["127.0.0.1"]
+
+    def test_empty_address_list(self):
+        assert scan_for_open_port([], timeout=0.1) == []
+
+    def test_concurrency_limited_to_max_connections(self, listening_port):
+        ips = ["127.0.0.1", "127.0.0.2", "127.0.0.3"]
+        result = scan_for_open_port(
+            ips, port=listening_port, timeout=0.5, max_connections=1
+        )
+        assert result == ["127.0.0.1"]
+
+    def test_out_of_file_handles_retried(self, listening_port, monkeypatch):
+        # Every connection attempt fails at first, so every worker runs out
+        # of file handles
+        ips = ["127.0.0.1", "127.0.0.2", "127.0.0.3", "127.0.0.4"]
+        open_connection = asyncio.open_connection
+        attempts = []
+
+        async def fake_open_connection(host, port):
+            attempts.append(host)
+            if len(attempts) <= 2 * len(ips):
+                raise OSError(errno.EMFILE, "Too many open files")
+            return await open_connection(host, port)
+
+        monkeypatch.setattr("soco_cli.speakers.OUT_OF_FILES_BACKOFF", 0.01)
+        monkeypatch.setattr(
+            "soco_cli.speakers.asyncio.open_connection", fake_open_connection
+        )
+        result = scan_for_open_port(ips, port=listening_port, timeout=0.5)
+        assert result == ["127.0.0.1"]
+        assert sorted(set(attempts)) == ips
+
+    def test_invalid_scanner_rejected(self):
+        with pytest.raises(ValueError):
+            Speakers(scanner="bogus")
+
+    def test_networks_to_scan_uses_subnets(self):
+        s = Speakers(subnets=["192.168.1.0/30"])
+        assert s.networks_to_scan() == [ipaddress.IPv4Network("192.168.1.0/30")]
+
+    def test_discover_uses_async_scanner(self):
+        s = Speakers(subnets=["192.168.1.0/30"], scanner=SCANNER_ASYNC)
+        device = _make_device("Kitchen", ip="192.168.1.2")
+        with patch(
+            "soco_cli.speakers.scan_for_open_port", return_value=["192.168.1.2"]
+        ) as scan, patch(
+            "soco_cli.speakers.soco.discovery.scan_network"
+        ) as scan_network, patch.object(
+            Speakers, "get_sonos_device_data", return_value=device
+        ):
+            s.discover()
+        scan_network.assert_not_called()
+        assert scan.call_args[0][0] == [
+            "192.168.1.0",
+            "192.168.1.1",
+            "192.168.1.2",
+            "192.168.1.3",
+        ]
+        assert s.speakers == [device]
+
+
+# ---------------------------------------------------------------------------
+# Streaming discovery
+# ---------------------------------------------------------------------------
+
+
+class TestStreamingDiscovery:
+    def test_iter_concurrently_skips_none_results(self):
+        results = iter_concurrently(lambda x: x if x % 2 else None, range(10))
+        assert sorted(results) == [1, 3, 5, 7, 9]
+
+    def test_iter_concurrently_yields_results_as_available(self):
+        def slow_unless_first(x):
+            if x != 0:
+                time.sleep(0.5)
+            return x
+
+        start = time.time()
+        results = iter_concurrently(slow_unless_first, range(4), max_threads=4)
+        assert next(results) == 0
+        assert time.time() - start < 0.4
+        results.close()
+
+    def test_iter_concurrently_close_abandons_queued_calls(self):
+        called = []
+
+        def record(x):
+            called.append(x)
+            return x
+
+        results = iter_concurrently(record, range(100), max_threads=1)
+        next(results)
+        results.close()
+        time.sleep(0.1)
+        assert len(called) < 100
+
+    def test_iter_open_ports(self, listening_port):
+        ips = ["127.0.0.{}".format(i) for i in range(1, 5)]
+        assert list(iter_open_ports(ips, port=listening_port, timeout=0.5)) == [
+            "127.0.0.1"
+        ]
+
+    def test_iter_discover_yields_device_records(self):
+        s = Speakers(subnets=["192.168.1.0/30"])
+        device = _make_device("Kitchen", ip="192.168.1.2")
+        with patch(
+            "soco_cli.speakers.port_is_open",
+            side_effect=lambda ip, timeout: ip == "192.168.1.2",
+        ), patch.object(
+            Speakers, "get_sonos_device_data", return_value=device
+        ) as get_data:
+            assert list(s.iter_discover()) == [device]
+        get_data.assert_called_once_with("192.168.1.2", s.device_timeout)
+        assert s.speakers == []
+
+    def test_iter_discover_no_valid_subnets(self):
+        s = Speakers(subnets=["bogus"])
+        assert list(s.iter_discover()) == []
+
+
+# ---------------------------------------------------------------------------
+# Neighbour-table-prioritised scanning
+# ---------------------------------------------------------------------------
+
+
+class TestNeighboursFirstScan:
+    def _speakers(self, stop_early):
+        return Speakers(
+            subnets=["192.168.1.0/28"], neighbours_first=True, stop_early=stop_early
+        )
+
+    def test_neighbours_probed_first(self):
+        s = self._speakers(stop_early=False)
+        probed = []
+
+        def probe(ip_addresses):
+            probed.append(list(ip_addresses))
+            return [ip for ip in ip_addresses if ip in ["192.168.1.5", "192.168.1.9"]]
+
+        with patch(
+            "soco_cli.speakers.order_by_neighbours",
+            side_effect=lambda ips: (["192.168.1.5"], ips[:5] + ips[6:]),
+        ), patch.object(Speakers, "probe_addresses", side_effect=probe):
+            assert s.scan_network() == ["192.168.1.5", "192.168.1.9"]
+        assert probed[0] == ["192.168.1.5"]
+        assert len(probed[1]) == 15
+
+    def test_stop_early_uses_topology(self):
+        s = self._speakers(stop_early=True)
+        with patch(
+            "soco_cli.speakers.order_by_neighbours",
+            return_value=(["192.168.1.5"], ["192.168.1.6"]),
+        ), patch.object(
+            Speakers, "probe_addresses", return_value=["192.168.1.5"]
+        ) as probe, patch.object(
+            Speakers, "topology_scan", return_value=["192.168.1.5", "192.168.1.9"]
+        ):
+            assert s.scan_network() == ["192.168.1.5", "192.168.1.9"]
+        probe.assert_called_once_with(["192.168.1.5"])
+
+    def test_stop_early_scans_rest_if_no_neighbours_found(self):
+        s = self._speakers(stop_early=True)
+        with patch(
+            "soco_cli.speakers.order_by_neighbours",
+            return_value=(["192.168.1.5"], ["192.168.1.6"]),
+        ), patch.object(
+            Speakers,
+            "probe_addresses",
+            side_effect=lambda ips: ["192.168.1.6"] if "192.168.1.6" in ips else [],
+        ):
+            assert s.scan_network() == ["192.168.1.6"]
+
+    def test_probe_addresses(self):
+        s = Speakers(network_timeout=0.5)
+        with patch(
+            "soco_cli.speakers.port_is_open",
+            side_effect=lambda ip, port, timeout: ip == "127.0.0.1",
+        ):
+            assert s.probe_addresses(["127.0.0.1", "127.0.0.2"]) == ["127.0.0.1"]
+
+
+# ---------------------------------------------------------------------------
+# Adaptive scan timeouts
+# ---------------------------------------------------------------------------
+
+
+class TestAdaptiveTimeouts:
+    def _timings(self, timeout):
+        timings = MagicMock()
+        timings.timeout.return_value = timeout
+        return timings
+
+    def test_learns_from_responses(self):
+        timings = self._timings(0.25)
+        results = {"192.168.1.2": (True, 0.01), "192.168.1.3": (False, 0.02)}
+        with patch(
+            "soco_cli.speakers.timed_probe",
+            side_effect=lambda ip, port, timeout: results[ip],
+        ):
+            found = list(
+                iter_open_ports_adaptive(list(results), timings, max_timeout=1.0)
+            )
+        assert found == ["192.168.1.2"]
+        assert sorted(call[0] for call in timings.record.call_args_list) == [
+            ("192.168.1.2", 0.01),
+            ("192.168.1.3", 0.02),
+        ]
+
+    def test_retries_stragglers_in_neighbour_table(self):
+        timings = self._timings(0.25)
+        attempts = []
+
+        def probe(ip, port, timeout):
+            attempts.append((ip, timeout))
+            if ip == "192.168.1.2" and timeout == 1.0:
+                return True, 0.5
+            return None, None
+
+        with patch("soco_cli.speakers.timed_probe", side_effect=probe), patch(
+            "soco_cli.speakers.read_neighbour_table",
+            return_value={"192.168.1.2": "b8:e9:37:aa:bb:cc"},
+        ):
+            found = list(
+                iter_open_ports_adaptive(
+                    ["192.168.1.2", "192.168.1.3"], timings, max_timeout=1.0
+                )
+            )
+        assert found == ["192.168.1.2"]
+        assert ("192.168.1.2", 1.0) in attempts
+        assert ("192.168.1.3", 1.0) not in attempts
+
+    def test_retries_all_stragglers_without_neighbour_table(self):
+        timings = self._timings(0.25)
+        attempts = []
+
+        def probe(ip, port, timeout):
+            attempts.append((ip, timeout))
+            return None, None
+
+        with patch("soco_cli.speakers.timed_probe", side_effect=probe), patch(
+            "soco_cli.speakers.read_neighbour_table", return_value={}
+        ):
+            list(
+                iter_open_ports_adaptive(
+                    ["192.168.1.2", "192.168.1.3"], timings, max_timeout=1.0
+                )
+            )
+        assert len(attempts) == 4
+
+    def test_stragglers_capped_without_neighbour_table(self):
+        timings = self._timings(0.25)
+        ip_addresses = ["192.168.1.{}".format(host) for host in range(1, 41)]
+        attempts = []
+
+        def probe(ip, port, timeout):
+            attempts.append((ip, timeout))
+            return None, None
+
+        with patch("soco_cli.speakers.timed_probe", side_effect=probe), patch(
+            "soco_cli.speakers.read_neighbour_table", return_value={}
+        ):
+            list(iter_open_ports_adaptive(ip_addresses, timings, max_timeout=1.0))
+        retried = [ip for ip, timeout in attempts if timeout == 1.0]
+        assert retried == ip_addresses[:MAX_UNCONFIRMED_STRAGGLERS]
+
+    def test_timeouts_adapt_between_waves(self):
+        timings = ScanTimings(save_directory="/nonexistent/")
+        ip_addresses = ["192.168.1.{}".format(host) for host in range(1, 101)]
+        timeouts = {}
+
+        def probe(ip, port, timeout):
+            timeouts[ip] = timeout
+            return False, 0.001
+
+        with patch("soco_cli.speakers.timed_probe", side_effect=probe):
+            list(iter_open_ports_adaptive(ip_addresses, timings, max_timeout=1.0))
+        assert timeouts[ip_addresses[0]] == DEFAULT_FIRST_TIMEOUT
+        # Every address after the first wave uses the learned timeout
+        later = ip_addresses[FIRST_WAVE_SIZE:]
+        assert max(timeouts[ip] for ip in later) < DEFAULT_FIRST_TIMEOUT
+
+    def test_no_retry_at_maximum_timeout(self):
+        timings = self._timings(1.0)
+        with patch(
+            "soco_cli.speakers.timed_probe", return_value=(None, None)
+        ) as probe, patch("soco_cli.speakers.read_neighbour_table") as neighbours:
+            list(iter_open_ports_adaptive(["192.168.1.2"], timings, max_timeout=1.0))
+        assert probe.call_count == 1
+        neighbours.assert_not_called()
+
+    def test_scan_network_saves_timings(self, tmp_path):
+        s = Speakers(
+            save_directory=str(tmp_path) + "/",
+            subnets=["192.168.1.2"],
+            network_timeout=1.0,
+            adaptive_timeout=True,
+        )
+        with patch("soco_cli.speakers.timed_probe", return_value=(True, 0.01)):
+            assert s.scan_network() == ["192.168.1.2"]
+        assert os.path.exists(str(tmp_path) + "/scan_timing.pickle")
+
+
+# ---------------------------------------------------------------------------
+# Hydrated SoCo instances
+# ---------------------------------------------------------------------------
+
+
+class TestHydratedSoco:
+    def setup_method(self):
+        invalidate()
+
+    def teardown_method(self):
+        invalidate()
+
+    def test_find_hydrates_metadata(self):
+        s = Speakers()
+        s._speakers = [_make_device("Kitchen", ip="192.168.1.10", uid="RINCON_1")]
+        mock_soco = MagicMock()
+        mock_soco.ip_address = "192.168.1.10"
+        mock_soco._uid = None
+        mock_soco._household_id = None
+        with patch("soco_cli.speakers.soco.SoCo", return_value=mock_soco):
+            speaker = s.find("Kitchen")
+        assert cached_player_name(speaker) == "Kitchen"
+        assert cached_is_visible(speaker) is True
+        assert speaker._uid == "RINCON_1"
+        assert speaker._household_id == "HH1"
+
+    def test_rename_invalidates_metadata(self, tmp_path):
+        s = Speakers(save_directory=str(tmp_path) + "/")
+        s._speakers = [_make_device("Kitchen", ip="192.168.1.10")]
+        mock_soco = MagicMock()
+        mock_soco.ip_address = "192.168.1.10"
+        with patch("soco_cli.speakers.soco.SoCo", return_value=mock_soco):
+            speaker = s.find("Kitchen")
+        s.rename("Kitchen", "Bedroom")
+        assert get_metadata(speaker) is None
+
+    def test_clear_invalidates_metadata(self):
+        s = Speakers()
+        s._speakers = [_make_device("Kitchen", ip="192.168.1.10")]
+        mock_soco = MagicMock()
+        mock_soco.ip_address = "192.168.1.10"
+        with patch("soco_cli.speakers.soco.SoCo", return_value=mock_soco):
+            speaker = s.get_all_speakers()[0]
+        s.clear()
+        assert get_metadata(speaker) is None
+
+
+# ---------------------------------------------------------------------------
+# Household selection
+# ---------------------------------------------------------------------------
+
+
+def _two_households():
+    s = Speakers()
+    s._speakers = [
+        _make_device("Kitchen", ip="192.168.1.10", household="HH1"),
+        _make_device("Study", ip="192.168.1.11", household="HH1"),
+        _make_device("Kitchen", ip="192.168.2.10", household="HH2"),
+    ]
+    return s
+
+
+class TestHouseholds:
+    def test_households(self):
+        s = _two_households()
+        households = s.households()
+        assert sorted(households) == ["HH1", "HH2"]
+        assert [d.ip_address for d in households["HH1"]] == [
+            "192.168.1.10",
+            "192.168.1.11",
+        ]
+
+    def test_all_households_by_default(self):
+        s = _two_households()
+        assert s.members() == s.speakers
+        assert s.get_all_speaker_names() == ["Kitchen", "Kitchen", "Study"]
+
+    def test_members_restricted_to_household(self):
+        s = _two_households()
+        s.household = "HH2"
+        assert [d.ip_address for d in s.members()] == ["192.168.2.10"]
+        assert s.get_all_speaker_names() == ["Kitchen"]
+
+    def test_find_in_household(self):
+        s = _two_households()
+        s.household = "HH2"
+        with patch("soco_cli.speakers.soco.SoCo") as mock_soco:
+            s.find("Kitchen")
+        mock_soco.assert_called_once_with("192.168.2.10")
+        assert s.find("Study") is None
+
+    def test_index_rebuilt_when_household_changes(self):
+        s = _two_households()
+        s.household = "HH2"
+        assert s.find("Study") is None
+        s.household = "HH1"
+        with patch("soco_cli.speakers.soco.SoCo") as mock_soco:
+            s.find("Study")
+        mock_soco.assert_called_once_with("192.168.1.11")
+
+    def test_get_all_speakers_in_household(self):
+        s = _two_households()
+        s.household = "HH1"
+        with patch("soco_cli.speakers.soco.SoCo") as mock_soco:
+            s.get_all_speakers()
+        assert sorted(call[0][0] for call in mock_soco.call_args_list) == [
+            "192.168.1.10",
+            "192.168.1.11",
+        ]
+
+    def test_unknown_household_has_no_members(self):
+        s = _two_households()
+        s.household = "HH3"
+        assert s.members() == []
+        assert s.get_all_speakers() is None
+
+
+# ---------------------------------------------------------------------------
+# compare_speaker_lists / refresh (incremental, UID-keyed)
+# ---------------------------------------------------------------------------
+
+
+def _make_zone(uid, ip, name, visible=True):
+    zone = MagicMock()
+    zone.uid = uid
+    zone.ip_address = ip
+    zone.player_name = name
+    zone.is_visible = visible
+    return zone
+
+
+class TestCompareSpeakerLists:
+    def test_uid_defaults_to_none(self):
+        device = SonosDevice("HH1", "192.168.1.10", "Kitchen", True, "One", "15.0")
+        assert device.uid is None
+
+    def test_no_changes(self):
+        devices = [_make_device("Kitchen", uid="RINCON_1")]
+        assert not any(compare_speaker_lists(devices, list(devices)))
+
+    def test_added_removed_moved_renamed(self):
+        old = [
+            _make_device("Kitchen", ip="192.168.1.10", uid="RINCON_1"),
+            _make_device("Study", ip="192.168.1.11", uid="RINCON_2"),
+            _make_device("Den", ip="192.168.1.12", uid="RINCON_3"),
+        ]
+        new = [
+            _make_device("Kitchen", ip="192.168.1.20", uid="RINCON_1"),
+            _make_device("Office", ip="192.168.1.11", uid="RINCON_2"),
+            _make_device("Lounge", ip="192.168.1.13", uid="RINCON_4"),
+        ]
+        changes = compare_speaker_lists(old, new)
+        assert [d.speaker_name for d in changes.added] == ["Lounge"]
+        assert [d.speaker_name for d in changes.removed] == ["Den"]
+        assert [(o.ip_address, n.ip_address) for o, n in changes.moved] == [
+            ("192.168.1.10", "192.168.1.20")
+        ]
+        assert [(o.speaker_name, n.speaker_name) for o, n in changes.renamed] == [
+            ("Study", "Office")
+        ]
+
+    def test_print_changes(self, capsys):
+        Speakers.print_changes(compare_speaker_lists([], []))
+        assert "No changes" in capsys.readouterr().out
+
+
+class TestRefresh:
+    def test_full_discovery_when_no_uids(self):
+        s = Speakers()
+        s._speakers = [_make_device("Kitchen")]
+        with patch.object(Speakers, "discover") as discover:
+            s.refresh()
+        discover.assert_called_once()
+
+    def test_incremental_refresh_uses_topology(self):
+        s = Speakers()
+        s._speakers = [
+            _make_device("Kitchen", ip="192.168.1.10", uid="RINCON_1"),
+            _make_device("Study", ip="192.168.1.11", uid="RINCON_2"),
+        ]
+        zones = {
+            _make_zone("RINCON_1", "192.168.1.10", "Kitchen"),
+            _make_zone("RINCON_2", "192.168.1.21", "Office"),
+            _make_zone("RINCON_3", "192.168.1.22", "Lounge"),
+        }
+        new_device = _make_device("Lounge", ip="192.168.1.22", uid="RINCON_3")
+        with patch(
+            "soco_cli.speakers.scan_for_open_port", return_value=["192.168.1.10"]
+        ), patch.object(
+            Speakers, "get_household_zones", return_value=zones
+        ), patch.object(
+            Speakers, "get_sonos_devices_data", return_value=[new_device]
+        ) as get_data, patch.object(
+            Speakers, "scan_network"
+        ) as scan_network:
+            changes = s.refresh()
+        # Only the new device is queried, and no network scan is needed
+        get_data.assert_called_once_with(["192.168.1.22"])
+        scan_network.assert_not_called()
+        assert [d.speaker_name for d in changes.added] == ["Lounge"]
+        assert [n.ip_address for _, n in changes.moved] == ["192.168.1.21"]
+        assert [n.speaker_name for _, n in changes.renamed] == ["Office"]
+        assert changes.removed == []
+        assert sorted(d.speaker_name for d in s.speakers) == [
+            "Kitchen",
+            "Lounge",
+            "Office",
+        ]
+
+    def test_unreachable_household_triggers_scan(self):
+        s = Speakers()
+        s._speakers = [_make_device("Kitchen", ip="192.168.1.10", uid="RINCON_1")]
+        moved = _make_device("Kitchen", ip="192.168.1.30", uid="RINCON_1")
+        with patch(
+            "soco_cli.speakers.scan_for_open_port", return_value=[]
+        ), patch.object(
+            Speakers, "scan_network", return_value=["192.168.1.30"]
+        ), patch.object(
+            Speakers, "get_sonos_devices_data", return_value=[moved]
+        ) as get_data:
+            changes = s.refresh()
+        get_data.assert_called_once_with(["192.168.1.30"])
+        assert [n.ip_address for _, n in changes.moved] == ["192.168.1.30"]
+        assert changes.removed == []
+
+    def test_unreachable_device_removed(self):
+        s = Speakers()
+        s._speakers = [_make_device("Kitchen", ip="192.168.1.10", uid="RINCON_1")]
+        with patch(
+            "soco_cli.speakers.scan_for_open_port", return_value=[]
+        ), patch.object(Speakers, "scan_network", return_value=[]):
+            changes = s.refresh()
+        assert [d.speaker_name for d in changes.removed] == ["Kitchen"]
+        assert s.speakers == []
+
+    def test_households_read_separately(self):
+        s = Speakers()
+        s._speakers = [
+            _make_device("Kitchen", ip="192.168.1.10", household="HH1", uid="R1"),
+            _make_device("Study", ip="192.168.1.11", household="HH1", uid="R2"),
+            _make_device("Office", ip="192.168.2.10", household="HH2", uid="R3"),
+        ]
+        zones = {
+            "192.168.1.10": {_make_zone("R1", "192.168.1.10", "Kitchen")},
+            "192.168.2.10": {_make_zone("R3", "192.168.2.10", "Office")},
+        }
+
+        def get_household_zones(ip_addresses):
+            return zones[ip_addresses[0]] if ip_addresses else None
+
+        with patch(
+            "soco_cli.speakers.scan_for_open_port",
+            return_value=["192.168.1.10", "192.168.2.10"],
+        ), patch.object(
+            Speakers, "get_household_zones", side_effect=get_household_zones
+        ) as get_zones, patch.object(
+            Speakers, "scan_network"
+        ) as scan_network:
+            changes = s.refresh()
+        assert sorted(call[0][0] for call in get_zones.call_args_list) == [
+            ["192.168.1.10"],
+            ["192.168.2.10"],
+        ]
+        scan_network.assert_not_called()
+        assert [d.speaker_name for d in changes.removed] == ["Study"]
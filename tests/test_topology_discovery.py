@@ -0,0 +1,305 @@
+"""Tests for topology_discovery.py."""
+
+from unittest.mock import MagicMock, call, patch
+
+import pytest
+
+import soco_cli.utils as utils
+from soco_cli.topology_discovery import (
+    expand_households,
+    expand_topology,
+    find_households,
+    parse_ssdp_response,
+    topology_discover,
+)
+from soco_cli.utils import SpeakerCache
+
+SSDP_RESPONSE = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"LOCATION: http://192.168.1.10:1400/xml/device_description.xml\r\n"
+    b"SERVER: Linux UPnP/1.0 Sonos/26.1-76230 (ZPS3)\r\n"
+    b"ST: urn:schemas-upnp-org:device:ZonePlayer:1\r\n"
+    b"X-RINCON-HOUSEHOLD: Sonos_ABCDEF\r\n"
+)
+
+
+def _make_zone(ip, name, visible=True):
+    zone = MagicMock()
+    zone.ip_address = ip
+    zone.player_name = name
+    zone.is_visible = visible
+    return zone
+
+
+def _make_household(zones):
+    """Return a fake soco.SoCo() factory for a single household."""
+    visible = {zone for zone in zones if zone.is_visible}
+
+    def factory(ip_address):
+        if ip_address not in [zone.ip_address for zone in zones]:
+            raise ConnectionError("No route to host")
+        speaker = MagicMock()
+        speaker.all_zones = set(zones)
+        speaker.visible_zones = visible
+        return speaker
+
+    return factory
+
+
+# ---------------------------------------------------------------------------
+# parse_ssdp_response
+# ---------------------------------------------------------------------------
+
+
+class TestParseSsdpResponse:
+    def test_household_extracted(self):
+        assert parse_ssdp_response(SSDP_RESPONSE) == "Sonos_ABCDEF"
+
+    def test_non_sonos_response_ignored(self):
+        assert parse_ssdp_response(b"HTTP/1.1 200 OK\r\nSERVER: Other\r\n") is None
+
+    def test_missing_household_header(self):
+        assert parse_ssdp_response(b"HTTP/1.1 200 OK\r\nSERVER: Sonos\r\n") is None
+
+
+# ---------------------------------------------------------------------------
+# expand_topology / topology_discover
+# ---------------------------------------------------------------------------
+
+
+class TestExpandTopology:
+    def test_one_read_per_household(self):
+        zones = [
+            _make_zone("192.168.1.10", "Kitchen"),
+            _make_zone("192.168.1.11", "Den"),
+        ]
+        factory = MagicMock(side_effect=_make_household(zones))
+        with patch("soco_cli.topology_discovery.soco.SoCo", factory):
+            found, unreachable = expand_topology(["192.168.1.10", "192.168.1.11"])
+        assert found == set(zones)
+        assert unreachable == []
+        factory.assert_called_once_with("192.168.1.10")
+
+    def test_invisible_zones_excluded_by_default(self):
+        zones = [
+            _make_zone("192.168.1.10", "Kitchen"),
+            _make_zone("192.168.1.11", "Kitchen", visible=False),
+        ]
+        with patch(
+            "soco_cli.topology_discovery.soco.SoCo", side_effect=_make_household(zones)
+        ):
+            found, _ = expand_topology(["192.168.1.10"])
+            found_all, _ = expand_topology(["192.168.1.10"], include_invisible=True)
+        assert found == {zones[0]}
+        assert found_all == set(zones)
+
+    def test_unreachable_seed_reported(self):
+        zones = [_make_zone("192.168.1.10", "Kitchen")]
+        with patch(
+            "soco_cli.topology_discovery.soco.SoCo",
+            side_effect=_make_household(zones),
+        ):
+            found, unreachable = expand_topology(["192.168.1.99", "192.168.1.10"])
+        assert found == set(zones)
+        assert unreachable == ["192.168.1.99"]
+
+
+class TestExpandHouseholds:
+    def test_first_responding_address_used(self):
+        zones = [_make_zone("192.168.1.10", "Kitchen")]
+        with patch(
+            "soco_cli.topology_discovery.soco.SoCo", side_effect=_make_household(zones)
+        ) as soco_factory:
+            found = expand_households({"HH1": ["192.168.1.99", "192.168.1.10"]})
+        assert found == set(zones)
+        assert soco_factory.call_count == 2
+
+    def test_households_expanded_independently(self):
+        household_1 = [_make_zone("192.168.1.10", "Kitchen")]
+        household_2 = [_make_zone("192.168.2.10", "Office")]
+        factories = {
+            "192.168.1.10": _make_household(household_1),
+            "192.168.2.10": _make_household(household_2),
+        }
+
+        def factory(ip_address):
+            if ip_address not in factories:
+                raise ConnectionError("No route to host")
+            return factories[ip_address](ip_address)
+
+        with patch("soco_cli.topology_discovery.soco.SoCo", side_effect=factory):
+            found = expand_households(
+                {
+                    "HH1": ["192.168.1.10"],
+                    "HH2": ["192.168.2.10"],
+                    "HH3": ["192.168.3.10"],
+                }
+            )
+        assert found == set(household_1 + household_2)
+
+    def test_no_households(self):
+        assert expand_households({}) == set()
+
+
+class TestTopologyDiscover:
+    def test_households_missing_from_seeds_found_by_multicast(self):
+        # The seeds only cover one household, e.g., from a discovery that
+        # stopped after the first household to respond
+        household_1 = [
+            _make_zone("192.168.1.10", "Kitchen"),
+            _make_zone("192.168.1.11", "Den"),
+        ]
+        household_2 = [_make_zone("192.168.2.10", "Office")]
+        factories = {
+            "192.168.1.10": _make_household(household_1),
+            "192.168.2.10": _make_household(household_2),
+        }
+        factory = MagicMock(
+            side_effect=lambda ip_address: factories[ip_address](ip_address)
+        )
+        with patch("soco_cli.topology_discovery.soco.SoCo", factory), patch(
+            "soco_cli.topology_discovery.find_households",
+            return_value={"HH1": ["192.168.1.11"], "HH2": ["192.168.2.10"]},
+        ):
+            assert topology_discover(seed_ips=["192.168.1.10"]) == set(
+                household_1 + household_2
+            )
+        # The seeded household isn't read again
+        assert factory.call_args_list == [call("192.168.1.10"), call("192.168.2.10")]
+
+    def test_multicast_used_for_all_households(self):
+        household_1 = [_make_zone("192.168.1.10", "Kitchen")]
+        household_2 = [_make_zone("192.168.2.10", "Office")]
+        factories = {
+            "192.168.1.10": _make_household(household_1),
+            "192.168.2.10": _make_household(household_2),
+        }
+
+        def factory(ip_address):
+            return factories[ip_address](ip_address)
+
+        with patch("soco_cli.topology_discovery.soco.SoCo", side_effect=factory), patch(
+            "soco_cli.topology_discovery.find_households",
+            return_value={"HH1": ["192.168.1.10"], "HH2": ["192.168.2.10"]},
+        ):
+            assert topology_discover() == set(household_1 + household_2)
+
+    def test_returns_none_when_nothing_found(self):
+        with patch("soco_cli.topology_discovery.find_households", return_value={}):
+            assert topology_discover() is None
+
+
+# ---------------------------------------------------------------------------
+# find_households
+# ---------------------------------------------------------------------------
+
+
+def _ssdp_response(household_id):
+    return SSDP_RESPONSE.replace(b"Sonos_ABCDEF", household_id.encode())
+
+
+def _find_households(responses, **kwargs):
+    """Run find_households() against a fake socket, which receives each of
+    the (delay, household_id, ip_address) responses in turn. Returns the
+    households found and the time taken."""
+    sock = MagicMock()
+    pending = list(responses)
+    clock = [0.0]
+
+    def select(readable, writable, errors, timeout):
+        if pending and pending[0][0] <= clock[0] + timeout:
+            clock[0] = max(clock[0], pending[0][0])
+            return [sock], [], []
+        clock[0] += timeout
+        return [], [], []
+
+    def recvfrom(size):
+        _, household_id, ip_address = pending.pop(0)
+        return _ssdp_response(household_id), (ip_address, 1400)
+
+    sock.recvfrom.side_effect = recvfrom
+    with patch(
+        "soco_cli.topology_discovery.find_ipv4_addresses",
+        return_value={"192.168.1.2"},
+    ), patch("soco_cli.topology_discovery.socket.socket", return_value=sock), patch(
+        "soco_cli.topology_discovery.select.select", side_effect=select
+    ), patch(
+        "soco_cli.topology_discovery.time.time", side_effect=lambda: clock[0]
+    ):
+        households = find_households(**kwargs)
+    return households, clock[0]
+
+
+class TestFindHouseholds:
+    def test_stops_when_responses_stop(self):
+        households, elapsed = _find_households(
+            [(0.05, "HH1", "192.168.1.10"), (0.1, "HH2", "192.168.2.10")],
+            timeout=1.0,
+            quiet_time=0.25,
+        )
+        assert households == {"HH1": ["192.168.1.10"], "HH2": ["192.168.2.10"]}
+        assert elapsed == pytest.approx(0.35)
+
+    def test_stops_when_household_responds(self):
+        households, elapsed = _find_households(
+            [(0.05, "HH1", "192.168.1.10"), (0.1, "HH2", "192.168.2.10")],
+            timeout=1.0,
+            household="HH1",
+        )
+        assert households == {"HH1": ["192.168.1.10"]}
+        assert elapsed == pytest.approx(0.05)
+
+    def test_waits_for_timeout_without_responses(self):
+        households, elapsed = _find_households([], timeout=1.0)
+        assert households == {}
+        assert elapsed == pytest.approx(1.0)
+
+
+# ---------------------------------------------------------------------------
+# SpeakerCache integration
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def api_mode():
+    original = utils.API
+    utils.API = True
+    yield
+    utils.API = original
+
+
+class TestSpeakerCacheTopology:
+    def test_get_all_speakers_uses_topology(self, api_mode):
+        sc = SpeakerCache()
+        zone = _make_zone("192.168.1.10", "Kitchen")
+        with patch(
+            "soco_cli.utils.topology_discover", return_value={zone}
+        ), patch.object(SpeakerCache, "scan") as scan:
+            result = sc.get_all_speakers(use_scan=True)
+        assert result == {(zone, "Kitchen")}
+        scan.assert_not_called()
+
+    def test_get_all_speakers_falls_back_to_scan(self, api_mode):
+        sc = SpeakerCache()
+        with patch("soco_cli.utils.topology_discover", return_value=None), patch.object(
+            SpeakerCache, "scan"
+        ) as scan:
+            sc.get_all_speakers(use_scan=True)
+            sc.get_all_speakers(use_scan=True)
+        assert scan.call_count == 2
+
+    def test_topology_only_attempted_once(self, api_mode):
+        sc = SpeakerCache()
+        zone = _make_zone("192.168.1.10", "Kitchen")
+        with patch("soco_cli.utils.topology_discover", return_value={zone}) as discover:
+            sc.discover_topology()
+            sc.discover_topology()
+        discover.assert_called_once()
+
+    def test_selected_household_passed_to_topology(self, api_mode):
+        sc = SpeakerCache(household="HH1")
+        with patch("soco_cli.utils.topology_discover", return_value=None) as discover:
+            sc.discover_topology()
+            sc.household = "HH2"
+            sc.discover_topology()
+        assert [c[1]["household"] for c in discover.call_args_list] == ["HH1", "HH2"]
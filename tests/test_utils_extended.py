@@ -2,11 +2,15 @@
 
 import argparse
 import datetime as real_datetime
-from unittest.mock import MagicMock, patch
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, PropertyMock, patch
 
 import pytest
 
 import soco_cli.utils as utils
+from soco_cli.speaker_metadata import cached_player_name, get_metadata, invalidate
 from soco_cli.utils import (
     RewindableList,
     SpeakerCache,
@@ -655,3 +659,397 @@ class TestSpeakerCache:
         outer.visible_zones = [inner]
         sc._cache.add((outer, "GroupName"))
         assert sc.find_indirect("Bedroom") is None
+
+    def _streaming_household(self, names):
+        """Return zones for a fake household, and a SoCo factory for it."""
+        zones = []
+        for index, name in enumerate(names):
+            zone = MagicMock()
+            zone.player_name = name
+            zone.ip_address = "192.168.1.{}".format(index + 10)
+            zone.all_zones = zones
+            zone.visible_zones = zones
+            zones.append(zone)
+        by_ip = {zone.ip_address: zone for zone in zones}
+        return zones, lambda ip_address: by_ip[ip_address]
+
+    def test_scan_for_stops_on_exact_match(self):
+        sc = SpeakerCache()
+        zones, factory = self._streaming_household(["Kitchen", "Bedroom"])
+        consumed = []
+
+        def open_ports(ip_addresses, timeout, max_threads):
+            for zone in zones:
+                consumed.append(zone.ip_address)
+                yield zone.ip_address
+
+        with patch("soco_cli.utils.iter_open_ports", side_effect=open_ports), patch(
+            "soco_cli.utils.find_ipv4_networks", return_value=[]
+        ), patch("soco_cli.utils.soco.SoCo", side_effect=factory):
+            assert sc.scan_for("bedroom") is zones[1]
+        assert consumed == ["192.168.1.10"]
+        assert sc._scan_done is False
+
+    def test_scan_for_partial_match_after_full_scan(self):
+        sc = SpeakerCache()
+        zones, factory = self._streaming_household(["Kitchen", "Bedroom"])
+        with patch(
+            "soco_cli.utils.iter_open_ports",
+            return_value=iter([zone.ip_address for zone in zones]),
+        ), patch("soco_cli.utils.find_ipv4_networks", return_value=[]), patch(
+            "soco_cli.utils.soco.SoCo", side_effect=factory
+        ):
+            assert sc.scan_for("Bed") is zones[1]
+        assert sc._scan_done is True
+        assert len(sc._cache) == 2
+
+    def test_neighbours_first_scan_stops_early(self):
+        sc = SpeakerCache(neighbours_first=True, stop_early=True)
+        zones, factory = self._streaming_household(["Kitchen", "Bedroom"])
+        probed = []
+
+        def open_ports(ip_addresses, timeout, max_threads):
+            probed.append(list(ip_addresses))
+            return iter(ip_addresses)
+
+        with patch("soco_cli.utils.iter_open_ports", side_effect=open_ports), patch(
+            "soco_cli.utils.find_ipv4_networks", return_value=[]
+        ), patch(
+            "soco_cli.utils.order_by_neighbours",
+            return_value=(["192.168.1.10"], ["192.168.1.1"]),
+        ), patch(
+            "soco_cli.utils.soco.SoCo", side_effect=factory
+        ):
+            sc.scan()
+        assert probed == [["192.168.1.10"]]
+        assert {name for _, name in sc._cache} == {"Kitchen", "Bedroom"}
+        assert sc._scan_done is True
+
+    def test_scan_for_uses_completed_scan(self):
+        sc = SpeakerCache()
+        speaker = MagicMock()
+        sc._cache.add((speaker, "Kitchen"))
+        sc._scan_done = True
+        with patch("soco_cli.utils.iter_open_ports") as open_ports:
+            assert sc.scan_for("Kitchen") is speaker
+        open_ports.assert_not_called()
+
+    def test_find_indirect_reads_household_topology_once(self):
+        sc = SpeakerCache()
+        kitchen = MagicMock()
+        kitchen.player_name = "Kitchen"
+        bedroom = MagicMock()
+        bedroom.player_name = "Bedroom"
+        kitchen_zones = PropertyMock(return_value=[kitchen, bedroom])
+        bedroom_zones = PropertyMock(return_value=[kitchen, bedroom])
+        type(kitchen).visible_zones = kitchen_zones
+        type(bedroom).visible_zones = bedroom_zones
+        sc._cache.add((kitchen, "Kitchen"))
+        sc._cache.add((bedroom, "Bedroom"))
+        assert sc.find_indirect("Bed") is bedroom
+        assert sc.find_indirect("Kit") is kitchen
+        assert kitchen_zones.call_count + bedroom_zones.call_count == 1
+
+
+# ---------------------------------------------------------------------------
+# SpeakerCache — household partitioning
+# ---------------------------------------------------------------------------
+
+
+def _household_cache(household=None):
+    """Return a SpeakerCache holding two households, both with a 'Kitchen',
+    and the per-speaker household_id PropertyMocks."""
+    sc = SpeakerCache(household=household)
+    household_reads = []
+    for household_id, names in [("HH1", ["Kitchen", "Study"]), ("HH2", ["Kitchen"])]:
+        zones = []
+        for name in names:
+            zone = MagicMock()
+            zone.player_name = name
+            zone.all_zones = zones
+            zone.visible_zones = zones
+            read = PropertyMock(return_value=household_id)
+            type(zone).household_id = read
+            household_reads.append(read)
+            zones.append(zone)
+            sc._cache.add((zone, name))
+    return sc, household_reads
+
+
+class TestSpeakerCacheHouseholds:
+    def test_households_partition(self):
+        sc, _ = _household_cache()
+        households = sc.households()
+        assert sorted(households) == ["HH1", "HH2"]
+        assert sorted(name for _, name in households["HH1"]) == ["Kitchen", "Study"]
+        assert [name for _, name in households["HH2"]] == ["Kitchen"]
+
+    def test_household_id_read_once_per_speaker(self):
+        sc, reads = _household_cache()
+        sc.households()
+        sc.households()
+        assert [read.call_count for read in reads] == [1, 1, 1]
+
+    def test_known_household_id_not_read(self):
+        sc = SpeakerCache()
+        speaker = MagicMock()
+        speaker._household_id = "HH1"
+        read = PropertyMock()
+        type(speaker).household_id = read
+        sc._cache.add((speaker, "Kitchen"))
+        assert sc.households() == {"HH1": {(speaker, "Kitchen")}}
+        read.assert_not_called()
+
+    def test_household_ids_read_concurrently(self):
+        sc = SpeakerCache()
+        barrier = threading.Barrier(3, timeout=5)
+
+        def read_household_id():
+            # Each read waits for the others to start
+            barrier.wait()
+            return "HH1"
+
+        for name in ["Kitchen", "Study", "Den"]:
+            speaker = MagicMock()
+            type(speaker).household_id = PropertyMock(side_effect=read_household_id)
+            sc._cache.add((speaker, name))
+        assert sorted(name for _, name in sc.households()["HH1"]) == [
+            "Den",
+            "Kitchen",
+            "Study",
+        ]
+
+    def test_partition_rebuilt_when_cache_changes(self):
+        sc, _ = _household_cache()
+        sc.households()
+        extra = MagicMock()
+        extra.household_id = "HH3"
+        extra.all_zones = [extra]
+        sc._cache.add((extra, "Den"))
+        assert sorted(sc.households()) == ["HH1", "HH2", "HH3"]
+
+    def test_unreadable_household(self):
+        sc = SpeakerCache()
+        speaker = MagicMock()
+        type(speaker).household_id = PropertyMock(side_effect=OSError())
+        sc._cache.add((speaker, "Kitchen"))
+        assert sc.households() == {None: {(speaker, "Kitchen")}}
+
+    def test_all_households_by_default(self, api_mode):
+        sc, _ = _household_cache()
+        sc._discovery_done = True
+        assert sc.members() is sc._cache
+        assert sc.get_all_speaker_names() == ["Kitchen", "Kitchen", "Study"]
+
+    def test_find_in_household(self):
+        sc, _ = _household_cache(household="HH2")
+        speaker = sc.find("Kitchen")
+        assert speaker is not None
+        assert speaker.household_id == "HH2"
+        assert sc.find("Study") is None
+
+    def test_get_all_speaker_names_in_household(self, api_mode):
+        sc, _ = _household_cache(household="HH1")
+        sc._discovery_done = True
+        assert sc.get_all_speaker_names() == ["Kitchen", "Study"]
+
+    def test_changing_household_rebuilds_index(self):
+        sc, _ = _household_cache(household="HH2")
+        assert sc.find("Study") is None
+        sc.household = "HH1"
+        assert sc.find("Study").player_name == "Study"
+
+
+class TestSpeakerCacheHydration:
+    def teardown_method(self):
+        invalidate()
+
+    def test_find_hydrates_player_name(self):
+        sc = SpeakerCache()
+        speaker = MagicMock()
+        player_name = PropertyMock(return_value="Kitchen")
+        type(speaker).player_name = player_name
+        sc._cache.add((speaker, "Kitchen"))
+        assert cached_player_name(sc.find("Kit")) == "Kitchen"
+        player_name.assert_not_called()
+
+    def test_get_all_speakers_hydrates_player_names(self, api_mode):
+        sc, _ = _household_cache()
+        sc._discovery_done = True
+        for speaker, speaker_name in sc.get_all_speakers():
+            assert get_metadata(speaker).player_name == speaker_name
+
+    def test_rename_invalidates(self):
+        sc = SpeakerCache()
+        speaker = MagicMock()
+        sc._cache.add((speaker, "Kitchen"))
+        sc.find("Kitchen")
+        sc.rename_speaker("Kitchen", "Study")
+        assert get_metadata(speaker) is None
+        assert cached_player_name(sc.find("Study")) == "Study"
+
+
+# ---------------------------------------------------------------------------
+# get_right_hand_speaker
+# ---------------------------------------------------------------------------
+
+
+class TestGetRightHandSpeaker:
+    def _pair_with_sub(self):
+        left = MagicMock()
+        left.ip_address = "192.168.1.10"
+        left.is_visible = True
+        right = MagicMock()
+        right.is_visible = False
+        sub = MagicMock()
+        sub.is_visible = False
+        for zone in (left, right, sub):
+            zone.group.coordinator = left
+        left.all_zones = [left, sub, right]
+        return left, right, sub
+
+    def test_sub_skipped_using_capabilities(self):
+        left, right, sub = self._pair_with_sub()
+        with patch(
+            "soco_cli.utils.has_capability",
+            side_effect=lambda speaker, capability: speaker is sub,
+        ):
+            assert utils.get_right_hand_speaker(left) is right
+        sub.get_speaker_info.assert_not_called()
+
+    def test_falls_back_to_speaker_info(self):
+        left, right, sub = self._pair_with_sub()
+        sub.get_speaker_info.return_value = {"model_name": "Sonos Sub"}
+        right.get_speaker_info.return_value = {"model_name": "Sonos One"}
+        with patch("soco_cli.utils.has_capability", return_value=None):
+            assert utils.get_right_hand_speaker(left) is right
+
+
+# ---------------------------------------------------------------------------
+# get_speaker: negative lookup cache and strategy telemetry
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def lookup_cache():
+    original_api = utils.API
+    original_cache = utils.SPKR_CACHE
+    utils.API = True
+    utils.SPKR_CACHE = SpeakerCache()
+    utils.clear_speaker_lookups()
+    yield utils.SPKR_CACHE
+    utils.SPKR_CACHE = original_cache
+    utils.API = original_api
+    utils.clear_speaker_lookups()
+
+
+def _strategies(results):
+    """Return a fake strategy list, and a list recording the calls made."""
+    calls = []
+
+    def make_lookup(strategy, result):
+        def lookup(name):
+            calls.append(strategy)
+            return result
+
+        return lookup
+
+    return [
+        (strategy, "Trying {}".format(strategy), make_lookup(strategy, result))
+        for strategy, result in results
+    ], calls
+
+
+class TestGetSpeakerLookups:
+    def test_records_resolving_strategy(self, lookup_cache):
+        speaker = MagicMock()
+        strategies, calls = _strategies(
+            [(utils.LOOKUP_DIRECT, None), (utils.LOOKUP_INDIRECT, speaker)]
+        )
+        with patch("soco_cli.utils.LOOKUP_STRATEGIES", strategies):
+            assert utils.get_speaker("Kitchen") is speaker
+        lookup = utils.get_speaker_lookups()[-1]
+        assert lookup.name == "Kitchen"
+        assert lookup.strategy == utils.LOOKUP_INDIRECT
+        assert [strategy for strategy, _ in lookup.timings] == [
+            utils.LOOKUP_DIRECT,
+            utils.LOOKUP_INDIRECT,
+        ]
+        assert lookup.duration >= 0
+
+    def test_ip_address_lookup_recorded(self, lookup_cache):
+        with patch("soco_cli.utils.soco.SoCo"):
+            utils.get_speaker("192.168.1.10")
+        assert utils.get_speaker_lookups()[-1].strategy == utils.LOOKUP_IP_ADDRESS
+
+    def test_failed_lookup_not_repeated(self, lookup_cache):
+        strategies, calls = _strategies([(utils.LOOKUP_DIRECT, None)])
+        with patch("soco_cli.utils.LOOKUP_STRATEGIES", strategies):
+            assert utils.get_speaker("Kitchn") is None
+            assert utils.get_speaker("kitchn") is None
+        assert calls == [utils.LOOKUP_DIRECT]
+        lookup = utils.get_speaker_lookups()[-1]
+        assert lookup.strategy is None
+        assert lookup.timings == [(utils.LOOKUP_NEGATIVE_CACHE, 0.0)]
+
+    def test_failed_lookup_expires(self, lookup_cache):
+        strategies, calls = _strategies([(utils.LOOKUP_DIRECT, None)])
+        clock = [0.0]
+        with patch("soco_cli.utils.LOOKUP_STRATEGIES", strategies), patch(
+            "soco_cli.utils.monotonic", side_effect=lambda: clock[0]
+        ):
+            utils.get_speaker("Kitchn")
+            clock[0] = lookup_cache.negative_lookup_ttl + 1
+            utils.get_speaker("Kitchn")
+        assert calls == [utils.LOOKUP_DIRECT, utils.LOOKUP_DIRECT]
+
+    def test_negative_cache_disabled(self, lookup_cache):
+        lookup_cache.negative_lookup_ttl = 0
+        strategies, calls = _strategies([(utils.LOOKUP_DIRECT, None)])
+        with patch("soco_cli.utils.LOOKUP_STRATEGIES", strategies):
+            utils.get_speaker("Kitchn")
+            utils.get_speaker("Kitchn")
+        assert len(calls) == 2
+
+    def test_rescan_forgets_failed_lookups(self, lookup_cache):
+        lookup_cache.remember_failed_lookup("Kitchen")
+        with patch("soco_cli.utils.soco.discovery.scan_network", return_value=None):
+            lookup_cache.scan(reset=True)
+        assert not lookup_cache.lookup_recently_failed("Kitchen")
+
+
+class TestConcurrentLookups:
+    def test_lookups_take_turns(self, lookup_cache):
+        speaker = MagicMock()
+        speaker.player_name = "Kitchen"
+        active = []
+        overlaps = []
+
+        def discover(name):
+            if lookup_cache.find(name):
+                return lookup_cache.find(name)
+            active.append(name)
+            overlaps.append(len(active) > 1)
+            time.sleep(0.01)
+            lookup_cache.add(speaker)
+            active.remove(name)
+            return speaker
+
+        strategies = [(utils.LOOKUP_DISCOVERY, "Trying discovery", discover)]
+        with patch("soco_cli.utils.LOOKUP_STRATEGIES", strategies), patch(
+            "soco_cli.utils.hydrate", side_effect=lambda speaker, **kwargs: speaker
+        ):
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                found = list(executor.map(utils.get_speaker, ["Kitchen"] * 8))
+        assert found == [speaker] * 8
+        # Only the first lookup searched; the others used its result
+        assert overlaps == [False]
+
+    def test_all_speakers_not_changed_by_lookups(self):
+        cache = SpeakerCache()
+        cache._discovery_done = True
+        cache._cache.add((MagicMock(), "Kitchen"))
+        with patch("soco_cli.utils.hydrate"):
+            speakers = cache.get_all_speakers()
+        cache.add(MagicMock(player_name="Den"))
+        assert {speaker_name for _, speaker_name in speakers} == {"Kitchen"}